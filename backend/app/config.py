@@ -15,6 +15,8 @@ class Settings(BaseSettings):
     # Firebase
     FIREBASE_CREDENTIALS_PATH: str = "./firebase-credentials.json"
     FIREBASE_PROJECT_ID: str = ""
+    FIRESTORE_BACKEND: str = "firebase"  # firebase, memory (in-process, lost on restart), sqlite (in-process, persisted)
+    FIRESTORE_SQLITE_PATH: str = "./local_firestore.sqlite"  # used when FIRESTORE_BACKEND is sqlite
     
     # Pinecone Vector DB
     PINECONE_API_KEY: str = ""
@@ -27,14 +29,78 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = ""
     LLM_PROVIDER: str = "google"  # openai, anthropic, google (google has free tier)
     LLM_MODEL: str = "gemini-2.5-flash"  # Free tier model (gemini-2.0-flash is available in google.genai)
+    LLM_CONTEXT_TOKENS: int = 24000  # document text per question-generation prompt, estimated (can be ~1/3 over); keep well under the model's window
     
     # Embeddings (required for Pinecone)
     EMBEDDING_PROVIDER: str = "google"  # google has free tier embeddings
     EMBEDDING_MODEL: str = "text-embedding-004"  # Google embedding model
     
+    # Uploads
+    MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024  # Larger request bodies are rejected with 413 while being received
+    UPLOAD_SPOOL_BYTES: int = 1024 * 1024  # Uploaded files above this size are spooled to a temporary file
+    PROCESSING_TIMEOUT_SECONDS: int = 3600  # a document processing this long is taken to be abandoned (worker died) and can be deleted or replaced
+    
+    # Text extraction
+    PDF_EXTRACTOR: str = "pypdf2"  # pypdf2, pypdfium2 (fastest, requires pypdfium2), pdfminer (layout analysis, requires pdfminer.six)
+    
     # Chunking
     CHUNK_SIZE: int = 500  # tokens
     CHUNK_OVERLAP: float = 0.15  # 15% overlap
+    TOKENIZER_ENCODING: str = "cl100k_base"
+    TOKENIZER_CACHE_DIR: str = "./tokenizer_cache"  # Pre-seeded BPE files (see seed_tokenizer.py)
+    
+    # Upload deduplication (reuse extraction, chunking and embeddings of identical files)
+    INGEST_DEDUP_ENABLED: bool = True
+    INGEST_DEDUP_SCOPE: str = "user"  # user (same user only), global (identical uploads of any user; upload timing reveals whether another user has the file)
+    
+    # Startup warm-up
+    OCR_WARMUP: bool = False  # Load the EasyOCR models at startup (slow, memory heavy)
+    
+    # Image OCR (see app/services/image_ocr.py)
+    OCR_TILE_SIZE: int = 2000  # px; images are decoded at most this large and recognized in one pass unless their text is too small
+    OCR_MAX_DIMENSION: int = 4000  # px; dense pages are decoded again at most this large and recognized in tiles of OCR_TILE_SIZE
+    OCR_TILE_OVERLAP: int = 200  # px shared by neighboring tiles; more than a line of text
+    OCR_MIN_TEXT_HEIGHT: int = 20  # px; a page whose text lines are smaller at OCR_TILE_SIZE is dense
+    OCR_BATCH_SIZE: int = 4  # Tiles per batched recognition call
+    
+    # Extracted text storage (kept outside Firestore)
+    TEXT_STORAGE_BACKEND: str = "local"  # local, cloud (Firebase Cloud Storage)
+    TEXT_STORAGE_PATH: str = "./storage"  # Root directory for the local backend
+    TEXT_STORAGE_BUCKET: str = ""  # Cloud Storage bucket (defaults to the Firebase project bucket)
+    TEXT_STORAGE_PREFIX: str = "learnlens"  # Object name prefix for the cloud backend
+    TEXT_COMPRESSION: str = "gzip"  # gzip, zstd (requires zstandard)
+    TEXT_FRAME_CHARS: int = 65536  # Characters per independently compressed frame
+    
+    # Analytics response cache
+    ANALYTICS_CACHE_BACKEND: str = "memory"  # memory (per worker LRU), redis (shared), none
+    ANALYTICS_CACHE_TTL: int = 300  # seconds
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 10000  # memory backend only
+    REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # Firebase ID-token verification
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_TOKEN_CACHE_MARGIN: int = 60  # seconds before "exp" when a cached token is dropped
+    AUTH_CERT_REFRESH_INTERVAL: int = 3600  # max seconds between background certificate refreshes
+    
+    # Document ownership cache (per worker)
+    OWNERSHIP_CACHE_MAX_ENTRIES: int = 100000
+    OWNERSHIP_CACHE_NEGATIVE_TTL: int = 30  # seconds a missing document stays cached
+    
+    # Background document deletion
+    DELETION_CONCURRENCY: int = 4  # delete batches committed in parallel per worker
+    DELETION_LEASE_SECONDS: int = 120  # a deletion job without progress for this long is taken over
+    
+    # Metrics (served on /metrics)
+    EVENT_LOOP_LAG_INTERVAL: float = 0.1  # seconds between event-loop lag probes
+    
+    # Tracing (ingestion stage spans) and on-demand profiling
+    TRACING_ENABLED: bool = True
+    TRACE_FILE: str = "./traces/spans.jsonl"  # JSONL span sink; empty to disable
+    TRACE_OTEL: bool = False  # Also export spans through OpenTelemetry (needs opentelemetry-api)
+    PROFILING_ENABLED: bool = False  # Profile requests sent with an X-Profile header
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_SAMPLE_INTERVAL: float = 0.005  # seconds between stack samples
+    PROFILE_MIN_SECONDS: float = 0.0  # only keep profiles of requests at least this slow
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:8080"
@@ -0,0 +1,156 @@
+"""Per-worker service container.
+
+Long-lived services (Firestore client, vector index handle, embedding and
+LLM clients, tokenizer, optionally the OCR reader) are built once when the
+worker starts and shared by all requests through FastAPI dependencies.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+from fastapi import Depends, HTTPException, Request
+from app.config import settings
+from app.database import initialize_firebase, get_firestore
+
+
+def _build_firestore():
+    initialize_firebase()
+    return get_firestore()
+
+
+def _build_vector_store():
+    from app.services.vector_store import VectorStore
+    return VectorStore()
+
+
+def _build_embedding_service():
+    from app.services.embedding_service import EmbeddingService
+    return EmbeddingService()
+
+
+def _build_llm_service():
+    from app.services.llm_service import LLMService
+    return LLMService()
+
+
+def _build_chunker():
+    from app.services.text_chunker import TextChunker
+    return TextChunker()
+
+
+def _build_ocr_reader():
+    from app.services.document_processor import EASYOCR_AVAILABLE, create_ocr_reader
+    if not EASYOCR_AVAILABLE:
+        raise RuntimeError("EasyOCR is not installed")
+    return create_ocr_reader()
+
+
+# Component name -> factory. Factories may block (network, model loading),
+# so they run in worker threads.
+COMPONENTS: Dict[str, Callable[[], Any]] = {
+    "firestore": _build_firestore,
+    "vector_store": _build_vector_store,
+    "embeddings": _build_embedding_service,
+    "llm": _build_llm_service,
+    "tokenizer": _build_chunker,
+    "ocr": _build_ocr_reader,
+}
+
+
+class ServiceContainer:
+    """Services shared by all requests of a worker."""
+
+    def __init__(self, warm_ocr: Optional[bool] = None):
+        self.warm_ocr = settings.OCR_WARMUP if warm_ocr is None else warm_ocr
+        self._services: Dict[str, Any] = {}
+        # Component -> {"ready": bool, "seconds": float, "error": str | None}
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def required(self):
+        """Components the worker needs before it is ready to serve."""
+        return [name for name in COMPONENTS if name != "ocr" or self.warm_ocr]
+
+    async def _build(self, name: str) -> Any:
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self._services:
+                return self._services[name]
+            start = time.perf_counter()
+            try:
+                service = await asyncio.to_thread(COMPONENTS[name])
+            except Exception as e:
+                seconds = time.perf_counter() - start
+                self.status[name] = {"ready": False, "seconds": round(seconds, 3), "error": str(e)}
+                print(f"Warm-up {name}: failed after {seconds * 1000:.0f} ms: {e}")
+                raise
+            seconds = time.perf_counter() - start
+            self._services[name] = service
+            self.status[name] = {"ready": True, "seconds": round(seconds, 3), "error": None}
+            print(f"Warm-up {name}: {seconds * 1000:.0f} ms")
+            return service
+
+    async def start(self) -> None:
+        """Build all required components concurrently, recording their warm-up time."""
+        start = time.perf_counter()
+        await asyncio.gather(*(self._build(name) for name in self.required), return_exceptions=True)
+        print(f"Service warm-up finished in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    async def get(self, name: str) -> Any:
+        """Get a component, building it now if startup did not (or failed to)."""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+        try:
+            return await self._build(name)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Service unavailable ({name}): {str(e)}")
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Get a component if it has been built, without building it."""
+        return self._services.get(name)
+
+    @property
+    def ready(self) -> bool:
+        return all(self.status.get(name, {}).get("ready") for name in self.required)
+
+    def readiness(self) -> Dict[str, Any]:
+        """Readiness summary with each component's warm-up result."""
+        return {
+            "ready": self.ready,
+            "components": {
+                name: self.status.get(name, {"ready": False, "seconds": None, "error": "not started"})
+                for name in self.required
+            },
+        }
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """FastAPI dependency: the worker's service container."""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        # App served without its lifespan (e.g. an in-process test client):
+        # components are built on first use
+        services = ServiceContainer()
+        request.app.state.services = services
+    return services
+
+
+async def get_llm_service(services: ServiceContainer = Depends(get_services)):
+    return await services.get("llm")
+
+
+async def get_vector_store(services: ServiceContainer = Depends(get_services)):
+    return await services.get("vector_store")
+
+
+async def get_document_processor(services: ServiceContainer = Depends(get_services)):
+    """A DocumentProcessor wired to the shared services."""
+    from app.services.document_processor import DocumentProcessor
+    return DocumentProcessor(
+        chunker=await services.get("tokenizer"),
+        vector_store=await services.get("vector_store"),
+        embedding_service=await services.get("embeddings"),
+        db=await services.get("firestore"),
+        ocr_reader=services.peek("ocr"),
+    )
@@ -1,16 +1,49 @@
 """Firebase Firestore database configuration."""
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore_async
 from app.config import settings
+from app.metrics import instrument_firestore
 import os
+import time
 
 
+# Seconds before a failed initialization is retried with unchanged credentials
+# (transient errors); missing credentials are only retried once the file appears
+INIT_RETRY_INTERVAL = 60
+
 _firebase_app = None
 _db = None
+_initialized = False
+# (credentials file state, time.monotonic()) of the last failed initialization
+_failed_attempt = None
+
+
+def _credentials_state():
+    """Identity of the credentials file (None if missing), to notice when it changes."""
+    try:
+        stat = os.stat(settings.FIREBASE_CREDENTIALS_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
 
 def initialize_firebase():
-    """Initialize Firebase Admin (only once)."""
-    global _firebase_app, _db
+    """Initialize Firebase Admin and the Firestore client (once per process).
+    
+    A failed attempt is retried once the credentials file is created or
+    changed, or after INIT_RETRY_INTERVAL if it exists (e.g. a transient
+    error), so calls in between return without repeating the warnings.
+    """
+    global _firebase_app, _db, _initialized, _failed_attempt
+    if _initialized:
+        return
+    credentials_state = _credentials_state()
+    if _failed_attempt is not None:
+        failed_state, failed_at = _failed_attempt
+        if credentials_state == failed_state and (
+            credentials_state is None or time.monotonic() - failed_at < INIT_RETRY_INTERVAL
+        ):
+            return
     try:
         # Check if Firebase is already initialized
         _firebase_app = firebase_admin.get_app()
@@ -31,29 +64,61 @@ def initialize_firebase():
             _firebase_app = None
     
     # Initialize Firestore client if Firebase is initialized
-    if _firebase_app is not None:
+    # The async client keeps Firestore round trips off the event loop
+    if settings.FIRESTORE_BACKEND != "firebase":
+        # Local stand-in; Firebase Admin above is still used for authentication if configured
+        _db = instrument_firestore(_create_local_firestore())
+    elif _firebase_app is not None:
         try:
-            _db = firestore.client()
-            print("Firestore client initialized.")
+            # Wrapped so every round trip is recorded in the Prometheus metrics
+            _db = instrument_firestore(firestore_async.client())
+            print("Firestore async client initialized.")
         except Exception as e:
             print(f"Error initializing Firestore client: {e}")
             _db = None
     else:
         _db = None
+    _initialized = _db is not None
+    _failed_attempt = None if _initialized else (credentials_state, time.monotonic())
 
 
-# Initialize Firebase
-initialize_firebase()
+def _create_local_firestore():
+    """The LocalFirestore stand-in selected by FIRESTORE_BACKEND."""
+    from app.local_firestore import LocalFirestore
+    
+    if settings.FIRESTORE_BACKEND == "memory":
+        print("Using the in-memory Firestore stand-in (data is lost on restart).")
+        return LocalFirestore()
+    if settings.FIRESTORE_BACKEND == "sqlite":
+        print(f"Using the local Firestore stand-in persisted to {settings.FIRESTORE_SQLITE_PATH}.")
+        return LocalFirestore(path=settings.FIRESTORE_SQLITE_PATH)
+    raise ValueError(
+        f"Unknown FIRESTORE_BACKEND: {settings.FIRESTORE_BACKEND}. Supported: 'firebase', 'memory', 'sqlite'"
+    )
 
-# Get Firestore client
-db = _db if _db is not None else None
+
+def use_firestore_client(client):
+    """Serve ``client`` from get_firestore() instead of the Firebase client.
+    
+    For load tests and local runs with a stand-in such as LocalFirestore;
+    Firebase Admin is not initialized.
+    """
+    global _db, _initialized
+    _db = instrument_firestore(client)
+    _initialized = True
 
 
 def get_firestore():
-    """Get Firestore database client."""
-    if db is None:
+    """Get the async Firestore database client.
+    
+    The app initializes Firebase in its lifespan hook; scripts that import
+    services directly are initialized on first use.
+    """
+    initialize_firebase()
+    if _db is None:
         raise RuntimeError(
             "Firestore is not initialized. Please ensure firebase-credentials.json exists "
-            "in the backend directory and contains valid Firebase Admin SDK credentials."
+            "in the backend directory and contains valid Firebase Admin SDK credentials, "
+            "or set FIRESTORE_BACKEND=memory or sqlite to use the local stand-in."
         )
-    return db
+    return _db
@@ -0,0 +1,529 @@
+"""In-process stand-in for the async Firestore client.
+
+Implements the part of the ``firestore_async`` API the app uses, over plain
+dicts: collection/document references with get, create, set (including merge and
+``Increment``), update and delete; ``where`` queries with ``order_by``,
+``limit`` and ``select``; ``get_all``; and write batches. Values are copied on every read
+and write, as they would be by a round trip to the server, and datetimes
+come back timezone-aware (UTC) like Firestore timestamps. Snapshots carry
+an ``update_time``, and ``update`` accepts a ``write_option(last_update_time=...)``
+precondition, failing with FailedPrecondition when the document has been
+written since.
+
+Equality and ``in`` filters are answered from secondary indexes (field ->
+value -> document IDs), built the first time a field is queried and kept
+up to date on every write, so filtered queries don't scan the collection.
+With a ``path`` the documents are also written through to SQLite and
+loaded back on start.
+
+Used for load tests and local runs without Firebase credentials
+(FIRESTORE_BACKEND=memory or sqlite).
+"""
+import asyncio
+import base64
+import copy
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1 import transforms
+
+_MISSING = object()
+
+
+def _normalize(value: Any) -> Any:
+    """Copy a value as Firestore would store it."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return copy.copy(value)
+
+
+def _get_path(data: Dict[str, Any], path: str) -> Any:
+    value: Any = data
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply(target: Dict[str, Any], key: str, value: Any) -> None:
+    """Write one field, resolving transforms and sentinels."""
+    if value is transforms.DELETE_FIELD:
+        target.pop(key, None)
+    elif value is transforms.SERVER_TIMESTAMP:
+        target[key] = datetime.now(timezone.utc)
+    elif isinstance(value, transforms.Increment):
+        current = target.get(key)
+        target[key] = (current if isinstance(current, (int, float)) else 0) + value.value
+    elif isinstance(value, transforms.ArrayUnion):
+        current = list(target.get(key) or [])
+        target[key] = current + [_normalize(item) for item in value.values if item not in current]
+    elif isinstance(value, transforms.ArrayRemove):
+        target[key] = [item for item in target.get(key) or [] if item not in value.values]
+    else:
+        target[key] = _normalize(value)
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """Deep-merge ``data`` into ``target`` (``set(..., merge=True)``)."""
+    for key, value in data.items():
+        if isinstance(value, dict):
+            current = target.get(key)
+            if not isinstance(current, dict):
+                current = target[key] = {}
+            _merge(current, value)
+        else:
+            _apply(target, key, value)
+
+
+def _update(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """Apply ``update()`` semantics: keys are dotted field paths."""
+    for path, value in data.items():
+        parts = path.split(".")
+        node = target
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        _apply(node, parts[-1], value)
+
+
+def _indexable(value: Any) -> bool:
+    """Whether a value can be looked up in an equality index."""
+    return value is None or isinstance(value, (str, int, float, bool, datetime))
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    if value is _MISSING:
+        return False
+    try:
+        if op == "==":
+            return value == expected
+        if op == "!=":
+            return value != expected
+        if op == "<":
+            return value < expected
+        if op == "<=":
+            return value <= expected
+        if op == ">":
+            return value > expected
+        if op == ">=":
+            return value >= expected
+        if op == "in":
+            return value in expected
+        if op == "not-in":
+            return value not in expected
+        if op == "array_contains":
+            return isinstance(value, list) and expected in value
+        if op == "array_contains_any":
+            return isinstance(value, list) and any(item in value for item in expected)
+    except TypeError:
+        # Firestore never matches values of different types
+        return False
+    raise ValueError(f"Unsupported query operator: {op}")
+
+
+class DocumentSnapshot:
+    """Result of reading one document."""
+
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]], update_time: Optional[datetime] = None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        value = _get_path(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class DocumentReference:
+    def __init__(self, client: "LocalFirestore", collection: str, document_id: str):
+        self._client = client
+        self.id = document_id
+        self._collection = collection
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._client, self._collection)
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection}/{self.id}"
+
+    def _snapshot(self) -> DocumentSnapshot:
+        data = self._client._documents(self._collection).get(self.id)
+        return DocumentSnapshot(self, copy.deepcopy(data), self._client._update_times.get((self._collection, self.id)))
+
+    async def get(self, *args, **kwargs) -> DocumentSnapshot:
+        await self._client._round_trip()
+        return self._snapshot()
+
+    async def create(self, document_data: Dict[str, Any], *args, **kwargs) -> None:
+        await self._client._round_trip()
+        if self.id in self._client._documents(self._collection):
+            raise AlreadyExists(f"Document already exists: {self.path}")
+        self._client._commit([(self._collection, self.id, "set", document_data, False)])
+
+    async def set(self, document_data: Dict[str, Any], merge: bool = False) -> None:
+        await self._client._round_trip()
+        self._client._commit([(self._collection, self.id, "set", document_data, merge)])
+
+    async def update(self, field_updates: Dict[str, Any], option: Optional["LastUpdateOption"] = None, *args, **kwargs) -> None:
+        await self._client._round_trip()
+        if option is not None and self._client._update_times.get((self._collection, self.id)) != option.last_update_time:
+            raise FailedPrecondition(f"Document was written since it was read: {self.path}")
+        self._client._commit([(self._collection, self.id, "update", field_updates, False)])
+
+    async def delete(self, *args, **kwargs) -> None:
+        await self._client._round_trip()
+        self._client._commit([(self._collection, self.id, "delete", None, False)])
+
+
+class Query:
+    def __init__(
+        self,
+        client: "LocalFirestore",
+        collection: str,
+        filters: Tuple = (),
+        orders: Tuple = (),
+        limit: Optional[int] = None,
+        projection: Optional[Tuple[str, ...]] = None,
+    ):
+        self._client = client
+        self._collection = collection
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._projection = projection
+
+    def _copy(self, **changes) -> "Query":
+        fields = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "projection": self._projection,
+        }
+        fields.update(changes)
+        return Query(self._client, self._collection, **fields)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter=None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "Query":
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit=count)
+
+    def select(self, field_paths: Iterable[str]) -> "Query":
+        return self._copy(projection=tuple(field_paths))
+
+    def _project(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self._projection is None:
+            return copy.deepcopy(data)
+        projected: Dict[str, Any] = {}
+        for field in self._projection:
+            value = _get_path(data, field)
+            if value is not _MISSING:
+                _update(projected, {field: copy.deepcopy(value)})
+        return projected
+
+    def _run(self) -> List[DocumentSnapshot]:
+        documents = self._client._documents(self._collection)
+        candidates = self._client._lookup(self._collection, self._filters)
+        if candidates is None:
+            items = documents.items()
+        else:
+            items = [(document_id, documents[document_id]) for document_id in candidates]
+        results = [
+            (document_id, data)
+            for document_id, data in sorted(items)
+            if all(_matches(_get_path(data, field), op, value) for field, op, value in self._filters)
+        ]
+        for field, direction in reversed(self._orders):
+            # Documents without the field are excluded, as in Firestore
+            results = [item for item in results if _get_path(item[1], field) is not _MISSING]
+            results.sort(key=lambda item: _get_path(item[1], field), reverse=direction == "DESCENDING")
+        if self._limit is not None:
+            results = results[:self._limit]
+        return [
+            DocumentSnapshot(
+                DocumentReference(self._client, self._collection, document_id),
+                self._project(data),
+                self._client._update_times.get((self._collection, document_id)),
+            )
+            for document_id, data in results
+        ]
+
+    async def get(self, *args, **kwargs) -> List[DocumentSnapshot]:
+        await self._client._round_trip()
+        return self._run()
+
+    async def stream(self, *args, **kwargs):
+        await self._client._round_trip()
+        for snapshot in self._run():
+            yield snapshot
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "LocalFirestore", name: str):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._client, self.id, document_id or uuid.uuid4().hex)
+
+
+class LastUpdateOption:
+    """Precondition that a document was last written at ``last_update_time``."""
+
+    def __init__(self, last_update_time: Optional[datetime]):
+        self.last_update_time = last_update_time
+
+
+class WriteBatch:
+    """Writes applied together on commit."""
+
+    def __init__(self, client: "LocalFirestore"):
+        self._client = client
+        self._writes: List[Tuple] = []
+
+    def set(self, reference: DocumentReference, document_data: Dict[str, Any], merge: bool = False) -> "WriteBatch":
+        self._writes.append((reference._collection, reference.id, "set", document_data, merge))
+        return self
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any]) -> "WriteBatch":
+        self._writes.append((reference._collection, reference.id, "update", field_updates, False))
+        return self
+
+    def delete(self, reference: DocumentReference) -> "WriteBatch":
+        self._writes.append((reference._collection, reference.id, "delete", None, False))
+        return self
+
+    async def commit(self, *args, **kwargs) -> None:
+        await self._client._round_trip()
+        # Updates of missing documents fail the whole batch before anything is written
+        for collection, document_id, operation, _, _ in self._writes:
+            if operation == "update" and document_id not in self._client._documents(collection):
+                raise NotFound(f"No document to update: {collection}/{document_id}")
+        self._client._commit(self._writes)
+        self._writes = []
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot store {type(value).__name__} in a document")
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    if len(value) == 1:
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+    return value
+
+
+class _SQLiteStore:
+    """Write-through copy of every document in one SQLite table."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (collection, id)) WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    def load(self) -> Iterable[Tuple[str, str, Dict[str, Any]]]:
+        for collection, document_id, data in self._connection.execute("SELECT collection, id, data FROM documents"):
+            yield collection, document_id, json.loads(data, object_hook=_decode)
+
+    def save(self, documents: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """Store (collection, ID, data) rows in one transaction; data None deletes."""
+        with self._connection:
+            for collection, document_id, data in documents:
+                if data is None:
+                    self._connection.execute(
+                        "DELETE FROM documents WHERE collection = ? AND id = ?", (collection, document_id)
+                    )
+                else:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                        (collection, document_id, json.dumps(data, default=_encode)),
+                    )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class LocalFirestore:
+    """In-memory Firestore client.
+
+    ``latency`` (seconds) is awaited on every round trip to approximate a
+    remote database. ``path`` persists the documents to a SQLite file; the
+    whole database is still held in memory, so use it from one process.
+    """
+
+    def __init__(self, latency: float = 0.0, path: Optional[str] = None):
+        self.latency = latency
+        # Collection -> document ID -> data
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Collection -> field path -> value -> document IDs
+        self._indexes: Dict[str, Dict[str, Dict[Any, Set[str]]]] = {}
+        # (collection, document ID) -> time of the last write, unique per write
+        self._update_times: Dict[Tuple[str, str], datetime] = {}
+        self._last_update_time = datetime.min.replace(tzinfo=timezone.utc)
+        self._store = _SQLiteStore(path) if path else None
+        if self._store is not None:
+            for collection, document_id, data in self._store.load():
+                self._documents(collection)[document_id] = data
+                self._update_times[(collection, document_id)] = self._next_update_time()
+
+    async def _round_trip(self) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    def _documents(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self._collections.setdefault(collection, {})
+
+    def _next_update_time(self) -> datetime:
+        now = datetime.now(timezone.utc)
+        if now <= self._last_update_time:
+            now = self._last_update_time + timedelta(microseconds=1)
+        self._last_update_time = now
+        return now
+
+    def _write(
+        self,
+        collection: str,
+        document_id: str,
+        operation: str,
+        data: Optional[Dict[str, Any]] = None,
+        merge: bool = False,
+    ) -> None:
+        documents = self._documents(collection)
+        indexes = self._indexes.get(collection, {})
+        before = documents.get(document_id)
+        old_keys = {field: _get_path(before, field) for field in indexes} if before is not None else {}
+        if operation == "delete":
+            documents.pop(document_id, None)
+        elif operation == "update":
+            if document_id not in documents:
+                raise NotFound(f"No document to update: {collection}/{document_id}")
+            _update(documents[document_id], data)
+        elif merge:
+            _merge(documents.setdefault(document_id, {}), data)
+        else:
+            new_document: Dict[str, Any] = {}
+            _merge(new_document, data)
+            documents[document_id] = new_document
+
+        after = documents.get(document_id)
+        if after is None:
+            self._update_times.pop((collection, document_id), None)
+        else:
+            self._update_times[(collection, document_id)] = self._next_update_time()
+        for field, index in indexes.items():
+            old_key = old_keys.get(field, _MISSING)
+            new_key = _get_path(after, field) if after is not None else _MISSING
+            if old_key is new_key or (type(old_key) is type(new_key) and old_key == new_key):
+                continue
+            if _indexable(old_key):
+                ids = index.get(old_key)
+                if ids is not None:
+                    ids.discard(document_id)
+                    if not ids:
+                        del index[old_key]
+            if _indexable(new_key):
+                index.setdefault(new_key, set()).add(document_id)
+
+    def _commit(self, writes: List[Tuple]) -> None:
+        """Apply (collection, ID, operation, data, merge) writes and persist them together."""
+        for write in writes:
+            self._write(*write)
+        if self._store is not None:
+            self._store.save(
+                (collection, document_id, self._documents(collection).get(document_id))
+                for collection, document_id, *_ in writes
+            )
+
+    def _index(self, collection: str, field: str) -> Dict[Any, Set[str]]:
+        fields = self._indexes.setdefault(collection, {})
+        index = fields.get(field)
+        if index is None:
+            index = fields[field] = {}
+            for document_id, data in self._documents(collection).items():
+                value = _get_path(data, field)
+                if _indexable(value):
+                    index.setdefault(value, set()).add(document_id)
+        return index
+
+    def _lookup(self, collection: str, filters: Tuple) -> Optional[Set[str]]:
+        """IDs of the documents that can match the equality and ``in`` filters.
+
+        None when no filter can use an index and the collection must be
+        scanned. Every filter is still checked against the candidates.
+        """
+        candidates = None
+        for field, op, value in filters:
+            if op == "==":
+                keys = [value]
+            elif op == "in":
+                keys = list(value)
+            else:
+                continue
+            if not all(_indexable(key) for key in keys):
+                continue
+            index = self._index(collection, field)
+            ids = set().union(*(index.get(key, ()) for key in keys))
+            candidates = ids if candidates is None else candidates & ids
+        return candidates
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def write_option(self, last_update_time: Optional[datetime] = None) -> LastUpdateOption:
+        return LastUpdateOption(last_update_time)
+
+    async def get_all(self, references: Iterable[DocumentReference], *args, **kwargs):
+        await self._round_trip()
+        for reference in references:
+            yield reference._snapshot()
@@ -1,8 +1,42 @@
 """FastAPI application entry point."""
-from fastapi import FastAPI
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
+from app.container import ServiceContainer
+from app.metrics import EVENT_LOOP_LAG, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, render_metrics
+from app.profiling import PROFILE_HEADER, SamplingProfiler, profile_path, release_profiler, try_acquire_profiler
 from app.routers import documents, questions, attempts, analytics, auth
+from app.services.document_deletion import document_deleter
+from app.services.loop_monitor import EventLoopLagMonitor
+from app.services.token_verifier import certificate_prefetcher, firebase_app_initialized
+from app.uploads import UploadSizeLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the worker's services once and run background tasks."""
+    lag_monitor = EventLoopLagMonitor(interval=settings.EVENT_LOOP_LAG_INTERVAL, observer=EVENT_LOOP_LAG.observe)
+    lag_monitor.start()
+    services = ServiceContainer()
+    app.state.services = services
+    await services.start()
+    if firebase_app_initialized():
+        # Fetch token-signing certificates ahead of the first request (only
+        # with Firebase credentials; without them no token can be verified)
+        certificate_prefetcher.start()
+    if services.status.get("firestore", {}).get("ready") and services.status.get("vector_store", {}).get("ready"):
+        # Finish deletions interrupted by a crash or restart
+        document_deleter.start(services.peek("firestore"), services.peek("vector_store"))
+    yield
+    await document_deleter.stop()
+    await certificate_prefetcher.stop()
+    await lag_monitor.stop()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -11,8 +45,12 @@ app = FastAPI(
     version="1.0.0",
     docs_url=f"{settings.API_PREFIX}/docs",
     redoc_url=f"{settings.API_PREFIX}/redoc",
+    lifespan=lifespan,
 )
 
+# Reject oversized uploads while they are received (inside CORS, so 413s carry CORS headers)
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=settings.MAX_UPLOAD_BYTES)
+
 # CORS middleware
 # Allow all origins in development (use specific origins in production)
 cors_origins = settings.cors_origins_list if "*" not in settings.cors_origins_list else ["*"]
@@ -24,6 +62,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def firestore_read_diagnostics(request: Request, call_next):
+    """Report the Firestore reads made through the request's repository."""
+    response = await call_next(request)
+    repository = getattr(request.state, "repository", None)
+    if repository is not None:
+        response.headers["X-Firestore-Reads"] = str(repository.reads)
+        response.headers["X-Firestore-Read-Calls"] = str(repository.calls)
+        response.headers["X-Firestore-Identity-Hits"] = str(repository.hits)
+    auth_seconds = getattr(request.state, "auth_seconds", None)
+    if auth_seconds is not None:
+        response.headers["Server-Timing"] = f"auth;dur={auth_seconds * 1000:.2f}"
+    return response
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Record request latency per route template and status code."""
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        # Label by the matched route's template (e.g. /api/v1/documents/{document_id})
+        # so the number of series stays bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            str(status_code),
+        ).observe(time.perf_counter() - start)
+
+
+@app.middleware("http")
+async def request_profiling(request: Request, call_next):
+    """Capture a sampling profile of a request sent with an X-Profile header."""
+    if not settings.PROFILING_ENABLED or PROFILE_HEADER not in request.headers:
+        return await call_next(request)
+    if not try_acquire_profiler():
+        # Another request is being profiled
+        return await call_next(request)
+    try:
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+        profiler.start()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+        seconds = time.perf_counter() - start
+        if seconds >= settings.PROFILE_MIN_SECONDS:
+            path = profile_path(settings.PROFILE_DIR, request.method, request.url.path, seconds)
+            profiler.write(path)
+            print(f"Profile of {request.method} {request.url.path} ({seconds * 1000:.0f} ms) written to {path}")
+            response.headers["X-Profile-File"] = os.path.basename(path)
+        return response
+    finally:
+        release_profiler()
+
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_PREFIX, tags=["Authentication"])
 app.include_router(documents.router, prefix=settings.API_PREFIX, tags=["Documents"])
@@ -42,3 +145,20 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get(f"{settings.API_PREFIX}/ready")
+async def readiness_check(request: Request):
+    """Readiness check: whether every service warmed up, with per-component timing."""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        return JSONResponse(status_code=503, content={"ready": False, "components": {}})
+    readiness = services.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
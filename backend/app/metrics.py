@@ -0,0 +1,294 @@
+"""Prometheus metrics.
+
+Request latency per route and status code, latency and errors of every
+outbound dependency call (Firestore, Pinecone, embeddings, LLMs, Firebase
+Auth), ID token verification latency, in-flight gauges and event-loop
+lag, exposed on ``/metrics``.
+
+Dependency labels:
+    dependency  firestore | pinecone | embeddings | llm | firebase_auth
+    operation   the call made (get, query, commit, upsert, embed_batch, ...)
+    target      Firestore collection, Pinecone index or provider/model
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Request handling stays well under a second; LLM calls take up to a minute
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DEPENDENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+REQUEST_LATENCY = Histogram(
+    "learnlens_http_request_duration_seconds",
+    "HTTP request latency by route template and status code.",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "learnlens_http_requests_in_flight",
+    "HTTP requests being handled.",
+    multiprocess_mode="livesum",
+)
+DEPENDENCY_LATENCY = Histogram(
+    "learnlens_dependency_duration_seconds",
+    "Latency of outbound dependency calls.",
+    ["dependency", "operation", "target"],
+    buckets=DEPENDENCY_BUCKETS,
+)
+DEPENDENCY_ERRORS = Counter(
+    "learnlens_dependency_errors_total",
+    "Outbound dependency calls that raised.",
+    ["dependency", "operation", "target"],
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    "learnlens_dependency_in_flight",
+    "Outbound dependency calls in progress.",
+    ["dependency"],
+    multiprocess_mode="livesum",
+)
+FIRESTORE_DOCUMENTS = Counter(
+    "learnlens_firestore_documents_total",
+    "Firestore documents read or written.",
+    ["operation", "collection"],
+)
+AUTH_LATENCY = Histogram(
+    "learnlens_auth_duration_seconds",
+    "ID token verification latency by outcome: served from the token cache (hit), "
+    "verified (miss) or rejected (failure).",
+    ["outcome"],
+    buckets=DEPENDENCY_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "learnlens_event_loop_lag_seconds",
+    "How late the event loop ran a periodic probe task.",
+    buckets=LAG_BUCKETS,
+)
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str, target: str = "") -> Iterator[None]:
+    """Time an outbound call (sync or awaited inside the block) and count failures."""
+    in_flight = DEPENDENCY_IN_FLIGHT.labels(dependency)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        DEPENDENCY_ERRORS.labels(dependency, operation, target).inc()
+        raise
+    finally:
+        DEPENDENCY_LATENCY.labels(dependency, operation, target).observe(time.perf_counter() - start)
+        in_flight.dec()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, with its content type.
+
+    With several worker processes, set PROMETHEUS_MULTIPROC_DIR so every
+    worker writes its samples there and any worker can report all of them.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# Firestore client instrumentation. The wrappers mirror the parts of the
+# async client API the app uses and time each round trip; anything else is
+# passed through to the wrapped object.
+
+def _unwrap(reference: Any) -> Tuple[Any, str]:
+    """The client's own document reference, and its collection name."""
+    if isinstance(reference, _DocumentReference):
+        return reference._ref, reference._collection
+    parent = getattr(reference, "parent", None)
+    return reference, getattr(parent, "id", "") or ""
+
+
+class _Snapshot:
+    """Document snapshot whose ``reference`` is instrumented."""
+
+    __slots__ = ("_snapshot", "_collection")
+
+    def __init__(self, snapshot: Any, collection: str):
+        self._snapshot = snapshot
+        self._collection = collection
+
+    @property
+    def reference(self) -> "_DocumentReference":
+        return _DocumentReference(self._snapshot.reference, self._collection)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._snapshot, name)
+
+
+class _DocumentReference:
+    __slots__ = ("_ref", "_collection")
+
+    def __init__(self, ref: Any, collection: str):
+        self._ref = ref
+        self._collection = collection
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ref, name)
+
+    async def get(self, *args, **kwargs) -> _Snapshot:
+        with track_dependency("firestore", "get", self._collection):
+            snapshot = await self._ref.get(*args, **kwargs)
+        FIRESTORE_DOCUMENTS.labels("read", self._collection).inc()
+        return _Snapshot(snapshot, self._collection)
+
+    async def _write(self, operation: str, *args, **kwargs) -> Any:
+        with track_dependency("firestore", operation, self._collection):
+            result = await getattr(self._ref, operation)(*args, **kwargs)
+        FIRESTORE_DOCUMENTS.labels("write", self._collection).inc()
+        return result
+
+    async def create(self, *args, **kwargs) -> Any:
+        return await self._write("create", *args, **kwargs)
+
+    async def set(self, *args, **kwargs) -> Any:
+        return await self._write("set", *args, **kwargs)
+
+    async def update(self, *args, **kwargs) -> Any:
+        return await self._write("update", *args, **kwargs)
+
+    async def delete(self, *args, **kwargs) -> Any:
+        return await self._write("delete", *args, **kwargs)
+
+
+_QUERY_BUILDERS = frozenset((
+    "where", "order_by", "limit", "limit_to_last", "offset", "select",
+    "start_at", "start_after", "end_at", "end_before",
+))
+
+
+class _Query:
+    """Collection reference or query."""
+
+    __slots__ = ("_query", "_collection")
+
+    def __init__(self, query: Any, collection: str):
+        self._query = query
+        self._collection = collection
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._query, name)
+        if name in _QUERY_BUILDERS:
+            # Builder methods return a new query, which stays instrumented
+            return lambda *args, **kwargs: _Query(attr(*args, **kwargs), self._collection)
+        return attr
+
+    def document(self, *args, **kwargs) -> _DocumentReference:
+        return _DocumentReference(self._query.document(*args, **kwargs), self._collection)
+
+    async def get(self, *args, **kwargs):
+        with track_dependency("firestore", "query", self._collection):
+            snapshots = await self._query.get(*args, **kwargs)
+        FIRESTORE_DOCUMENTS.labels("read", self._collection).inc(len(snapshots))
+        return [_Snapshot(snapshot, self._collection) for snapshot in snapshots]
+
+    async def stream(self, *args, **kwargs):
+        # Timed until the last document arrives, excluding time the caller
+        # spends between documents
+        count = 0
+        elapsed = 0.0
+        stream = self._query.stream(*args, **kwargs).__aiter__()
+        DEPENDENCY_IN_FLIGHT.labels("firestore").inc()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    snapshot = await stream.__anext__()
+                except StopAsyncIteration:
+                    elapsed += time.perf_counter() - start
+                    break
+                except Exception:
+                    DEPENDENCY_ERRORS.labels("firestore", "query", self._collection).inc()
+                    raise
+                elapsed += time.perf_counter() - start
+                count += 1
+                yield _Snapshot(snapshot, self._collection)
+        finally:
+            DEPENDENCY_IN_FLIGHT.labels("firestore").dec()
+            DEPENDENCY_LATENCY.labels("firestore", "query", self._collection).observe(elapsed)
+            FIRESTORE_DOCUMENTS.labels("read", self._collection).inc(count)
+
+
+class _WriteBatch:
+    __slots__ = ("_batch", "_writes")
+
+    def __init__(self, batch: Any):
+        self._batch = batch
+        # Collection -> number of writes queued
+        self._writes = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._batch, name)
+
+    def _queue(self, operation: str, reference: Any, *args, **kwargs) -> Any:
+        reference, collection = _unwrap(reference)
+        self._writes[collection] = self._writes.get(collection, 0) + 1
+        return getattr(self._batch, operation)(reference, *args, **kwargs)
+
+    def set(self, reference: Any, *args, **kwargs) -> Any:
+        return self._queue("set", reference, *args, **kwargs)
+
+    def update(self, reference: Any, *args, **kwargs) -> Any:
+        return self._queue("update", reference, *args, **kwargs)
+
+    def delete(self, reference: Any, *args, **kwargs) -> Any:
+        return self._queue("delete", reference, *args, **kwargs)
+
+    async def commit(self, *args, **kwargs) -> Any:
+        target = ",".join(sorted(self._writes))
+        with track_dependency("firestore", "commit", target):
+            result = await self._batch.commit(*args, **kwargs)
+        for collection, count in self._writes.items():
+            FIRESTORE_DOCUMENTS.labels("write", collection).inc(count)
+        return result
+
+
+class InstrumentedFirestore:
+    """Async Firestore client wrapper recording metrics for every round trip."""
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def collection(self, name: str, *args) -> _Query:
+        return _Query(self._client.collection(name, *args), name)
+
+    def batch(self) -> _WriteBatch:
+        return _WriteBatch(self._client.batch())
+
+    async def get_all(self, references, *args, **kwargs):
+        unwrapped = [_unwrap(reference) for reference in references]
+        references = [reference for reference, _ in unwrapped]
+        target = ",".join(sorted({collection for _, collection in unwrapped}))
+        with track_dependency("firestore", "get_all", target):
+            snapshots = [snapshot async for snapshot in self._client.get_all(references, *args, **kwargs)]
+        FIRESTORE_DOCUMENTS.labels("read", target).inc(len(snapshots))
+        for snapshot in snapshots:
+            yield _Snapshot(snapshot, _unwrap(snapshot.reference)[1])
+
+
+def instrument_firestore(client: Optional[Any]) -> Optional[Any]:
+    """Wrap a Firestore client so its calls are recorded (None passes through)."""
+    if client is None or isinstance(client, InstrumentedFirestore):
+        return client
+    return InstrumentedFirestore(client)
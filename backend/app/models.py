@@ -1,6 +1,6 @@
 """Firestore data models and helpers."""
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
 from uuid import UUID, uuid4
 import enum
 from google.cloud.firestore import Client as FirestoreClient
@@ -12,6 +12,7 @@ class DocumentStatus(str, enum.Enum):
     PROCESSING = "processing"
     PROCESSED = "processed"
     FAILED = "failed"
+    DELETING = "deleting"
 
 
 class QuestionType(str, enum.Enum):
@@ -28,8 +29,123 @@ class Difficulty(str, enum.Enum):
     HARD = "hard"
 
 
-class FirestoreModel:
-    """Base class for Firestore models."""
+_MISSING = object()
+
+
+def _parse_uuid(value):
+    """UUID from a stored string; other values (and non-UUID strings) unchanged."""
+    if isinstance(value, str):
+        try:
+            return UUID(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _parse_timestamp(value):
+    """datetime from a stored timestamp."""
+    if isinstance(value, datetime) or value is None:
+        return value
+    if hasattr(value, 'seconds'):  # Firestore Timestamp
+        return datetime.fromtimestamp(value.seconds, tz=timezone.utc)
+    return value
+
+
+def _compile_serializers(cls) -> None:
+    """Generate ``to_dict`` and ``from_dict`` for a model from its ``_schema``.
+
+    The generated code handles each field by its declared type, so no
+    per-value type sniffing is left at run time.
+    """
+    namespace = {
+        "_MISSING": _MISSING,
+        "UUID": UUID,
+        "Enum": enum.Enum,
+        "_parse_uuid": _parse_uuid,
+        "_parse_timestamp": _parse_timestamp,
+        "_fields": frozenset(cls._schema),
+    }
+    to_lines = ["def to_dict(self):", "    data = {}"]
+    from_lines = [
+        "def from_dict(cls, data):",
+        "    instance = cls.__new__(cls)",
+    ]
+    for name, kind in cls._schema.items():
+        if kind is UUID:
+            store, load = "str(value) if isinstance(value, UUID) else value", "_parse_uuid(value)"
+        elif kind is datetime:
+            store, load = "value", "_parse_timestamp(value)"
+        elif isinstance(kind, type) and issubclass(kind, enum.Enum):
+            namespace[f"_{name}_enum"] = kind
+            namespace[f"_{name}_members"] = kind._value2member_map_
+            store = "value.value if isinstance(value, Enum) else value"
+            load = f"_{name}_members.get(value) or _{name}_enum(value)"
+        elif kind is list:
+            store = "[str(v) if isinstance(v, UUID) else v for v in value] if isinstance(value, list) else value"
+            load = "value"
+        else:
+            store, load = "value", "value"
+        to_lines += [
+            "    try:",
+            f"        value = self.{name}",
+            "    except AttributeError:",
+            "        pass",
+            "    else:",
+            f"        data[{name!r}] = {store}",
+        ]
+        from_lines += [
+            f"    value = data.get({name!r}, _MISSING)",
+            "    if value is not _MISSING:",
+            f"        instance.{name} = {load}",
+        ]
+    to_lines += [
+        "    try:",
+        "        extra = self._extra",
+        "    except AttributeError:",
+        "        pass",
+        "    else:",
+        "        if extra:",
+        "            data.update(extra)",
+        "    return data",
+    ]
+    from_lines += [
+        "    if _fields.issuperset(data):",
+        "        instance._extra = None",
+        "    else:",
+        "        # Fields outside the schema are kept so they survive a round trip",
+        "        instance._extra = {key: value for key, value in data.items() if key not in _fields and not key.startswith('_')}",
+        "    return instance",
+    ]
+    exec("\n".join(to_lines) + "\n\n" + "\n".join(from_lines), namespace)
+    cls.to_dict = namespace["to_dict"]
+    cls.from_dict = classmethod(namespace["from_dict"])
+
+
+class _ModelMeta(type):
+    """Gives each model slots for its ``_schema`` fields and compiled serializers."""
+    
+    def __new__(mcs, name, bases, namespace):
+        schema = namespace.get("_schema")
+        if schema is not None:
+            namespace["__slots__"] = tuple(schema)
+        cls = super().__new__(mcs, name, bases, namespace)
+        if schema is not None:
+            _compile_serializers(cls)
+        return cls
+
+
+class FirestoreModel(metaclass=_ModelMeta):
+    """Base class for Firestore models.
+    
+    Subclasses declare their stored fields in ``_schema`` (field name ->
+    type: UUID, datetime, an Enum, list, or any other type for values stored
+    as is). Instances use ``__slots__`` for those fields, and ``to_dict`` /
+    ``from_dict`` are generated from the schema once per class. Fields
+    missing from a stored record stay unset; fields outside the schema are
+    kept in ``_extra`` and written back by ``to_dict``.
+    """
+    
+    __slots__ = ("_extra",)
     
     @classmethod
     def collection_name(cls) -> str:
@@ -38,86 +154,55 @@ class FirestoreModel:
     
     def to_dict(self) -> dict:
         """Convert model to dictionary for Firestore."""
-        data = {}
-        for key, value in self.__dict__.items():
-            if not key.startswith('_'):
-                if isinstance(value, UUID):
-                    data[key] = str(value)
-                elif isinstance(value, datetime):
-                    data[key] = value
-                elif isinstance(value, enum.Enum):
-                    data[key] = value.value
-                elif isinstance(value, list):
-                    # Handle lists (e.g., options, chunk_ids)
-                    data[key] = [str(v) if isinstance(v, UUID) else v for v in value]
-                else:
-                    data[key] = value
-        return data
+        raise NotImplementedError
     
     @classmethod
     def from_dict(cls, data: dict):
         """Create model from Firestore dictionary."""
-        instance = cls.__new__(cls)
-        for key, value in data.items():
-            if not key.startswith('_'):
-                # Handle UUID fields
-                if key.endswith('_id') and isinstance(value, str):
-                    try:
-                        setattr(instance, key, UUID(value))
-                    except (ValueError, AttributeError):
-                        setattr(instance, key, value)
-                # Handle datetime
-                elif isinstance(value, datetime):
-                    setattr(instance, key, value)
-                # Handle Firestore Timestamp
-                elif hasattr(value, 'timestamp') or (hasattr(value, 'seconds') and hasattr(value, 'nanoseconds')):  # Firestore Timestamp
-                    try:
-                        # Firestore Timestamp object
-                        if hasattr(value, 'seconds'):
-                            from datetime import timezone
-                            timestamp = datetime.fromtimestamp(value.seconds, tz=timezone.utc)
-                            setattr(instance, key, timestamp)
-                        else:
-                            setattr(instance, key, datetime.utcnow())
-                    except Exception as e:
-                        # Fallback to current time if conversion fails
-                        setattr(instance, key, datetime.utcnow())
-                # Handle enum
-                elif key in ['status', 'question_type', 'difficulty']:
-                    if key == 'status':
-                        from app.models import DocumentStatus
-                        setattr(instance, key, DocumentStatus(value))
-                    elif key == 'question_type':
-                        from app.models import QuestionType
-                        setattr(instance, key, QuestionType(value))
-                    elif key == 'difficulty':
-                        from app.models import Difficulty
-                        setattr(instance, key, Difficulty(value))
-                else:
-                    setattr(instance, key, value)
-        return instance
+        raise NotImplementedError
 
 
 class Document(FirestoreModel):
     """Document model."""
     
+    _schema = {
+        "document_id": UUID,
+        "user_id": str,
+        "title": str,
+        "language": str,
+        "uploaded_at": datetime,
+        "status": DocumentStatus,
+        "text_ref": str,
+        "text_size": int,
+        "text_sha256": str,
+        "content_sha256": str,
+    }
+    
     def __init__(
         self,
         document_id: Optional[UUID] = None,
         user_id: str = "",
         title: str = "",
-        extracted_text: str = "",
         language: str = "en",
         uploaded_at: Optional[datetime] = None,
         status: DocumentStatus = DocumentStatus.UPLOADED,
+        text_ref: Optional[str] = None,
+        text_size: int = 0,
+        text_sha256: Optional[str] = None,
+        content_sha256: Optional[str] = None,
     ):
         self.document_id = document_id or uuid4()
         self.user_id = user_id
         self.title = title
-        self.extracted_text = extracted_text
         self.language = language
         self.uploaded_at = uploaded_at or datetime.utcnow()
         self.status = status
+        # Extracted text lives in the text store; the record only keeps a reference
+        self.text_ref = text_ref
+        self.text_size = text_size
+        self.text_sha256 = text_sha256
+        # sha256 of the uploaded file, the key for reusing its processing results
+        self.content_sha256 = content_sha256
     
     @classmethod
     def collection_name(cls) -> str:
@@ -127,6 +212,18 @@ class Document(FirestoreModel):
 class Chunk(FirestoreModel):
     """Text chunk model."""
     
+    _schema = {
+        "chunk_id": UUID,
+        "document_id": UUID,
+        "chunk_index": int,
+        "start_char": int,
+        "end_char": int,
+        "chunk_text": str,
+        "text_sha256": str,
+        "topic": str,
+        "created_at": datetime,
+    }
+    
     def __init__(
         self,
         chunk_id: Optional[UUID] = None,
@@ -135,6 +232,7 @@ class Chunk(FirestoreModel):
         start_char: int = 0,
         end_char: int = 0,
         chunk_text: Optional[str] = None,
+        text_sha256: Optional[str] = None,
         topic: Optional[str] = None,
         created_at: Optional[datetime] = None,
     ):
@@ -144,6 +242,8 @@ class Chunk(FirestoreModel):
         self.start_char = start_char
         self.end_char = end_char
         self.chunk_text = chunk_text
+        # sha256 of chunk_text, used to match chunks when a document's content is replaced
+        self.text_sha256 = text_sha256
         self.topic = topic
         self.created_at = created_at or datetime.utcnow()
     
@@ -155,10 +255,25 @@ class Chunk(FirestoreModel):
 class Question(FirestoreModel):
     """Assessment question model."""
     
+    _schema = {
+        "question_id": UUID,
+        "document_id": UUID,
+        "user_id": str,
+        "question_type": QuestionType,
+        "difficulty": Difficulty,
+        "question_text": str,
+        "correct_answer": str,
+        "explanation": str,
+        "options": list,
+        "chunk_ids": list,
+        "created_at": datetime,
+    }
+    
     def __init__(
         self,
         question_id: Optional[UUID] = None,
         document_id: Optional[UUID] = None,
+        user_id: str = "",
         question_type: QuestionType = QuestionType.MCQ,
         difficulty: Difficulty = Difficulty.MEDIUM,
         question_text: str = "",
@@ -170,6 +285,8 @@ class Question(FirestoreModel):
     ):
         self.question_id = question_id or uuid4()
         self.document_id = document_id
+        # Denormalized document owner so ownership checks skip the document read
+        self.user_id = user_id
         self.question_type = question_type
         self.difficulty = difficulty
         self.question_text = question_text
@@ -187,6 +304,18 @@ class Question(FirestoreModel):
 class Attempt(FirestoreModel):
     """User attempt on a question."""
     
+    _schema = {
+        "attempt_id": UUID,
+        "user_id": str,
+        "question_id": UUID,
+        "document_id": UUID,
+        "user_answer": str,
+        "is_correct": bool,
+        "score": float,
+        "time_taken": float,
+        "attempted_at": datetime,
+    }
+    
     def __init__(
         self,
         attempt_id: Optional[UUID] = None,
@@ -197,10 +326,13 @@ class Attempt(FirestoreModel):
         score: Optional[float] = None,
         time_taken: Optional[float] = None,
         attempted_at: Optional[datetime] = None,
+        document_id: Optional[UUID] = None,
     ):
         self.attempt_id = attempt_id or uuid4()
         self.user_id = user_id
         self.question_id = question_id
+        # Denormalized from the question for document-scoped queries
+        self.document_id = document_id
         self.user_answer = user_answer
         self.is_correct = is_correct
         self.score = score
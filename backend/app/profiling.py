@@ -0,0 +1,81 @@
+"""On-demand sampling profiles of single requests.
+
+With PROFILING_ENABLED, a request carrying an ``X-Profile`` header is
+profiled by sampling the event-loop thread's stack every
+PROFILE_SAMPLE_INTERVAL seconds. Samples are written to PROFILE_DIR in the
+folded-stack format read by flamegraph.pl and speedscope, and the file name
+is returned in the ``X-Profile-File`` response header.
+
+Only one request is profiled at a time. The sampler sees everything running
+on the event loop, so profile on a quiet worker; work handed to threads
+(``asyncio.to_thread``) shows up as the awaiting frame only.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+PROFILE_HEADER = "X-Profile"
+
+
+class SamplingProfiler:
+    """Sample one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        # Folded stack ("outer;inner;innermost") -> number of samples
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: str) -> None:
+        """Write the samples as folded stacks, one per line."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+_profile_lock = threading.Lock()
+
+
+def try_acquire_profiler() -> bool:
+    """Claim the single profiling slot (False if another request holds it)."""
+    return _profile_lock.acquire(blocking=False)
+
+
+def release_profiler() -> None:
+    _profile_lock.release()
+
+
+def profile_path(directory: str, method: str, path: str, seconds: float) -> str:
+    """File name for a request's profile: time, method, path and duration."""
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return os.path.join(directory, f"{stamp}-{method}-{slug}-{seconds * 1000:.0f}ms.folded")
@@ -0,0 +1,214 @@
+"""Request-scoped Firestore repository with an identity map."""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request
+from app.database import get_firestore
+from app.models import FirestoreModel, Document, DocumentStatus, Chunk, Question, Attempt
+from app.services.ownership_cache import get_ownership_cache
+
+Key = Tuple[str, str]
+
+# Firestore document ID field of each model
+_ID_FIELDS = {
+    Document: "document_id",
+    Chunk: "chunk_id",
+    Question: "question_id",
+    Attempt: "attempt_id",
+}
+
+
+class Repository:
+    """Firestore reads for one request.
+
+    Every document read (directly or through a query) is kept in an identity
+    map, so repeated gets and queries within the request are served from
+    memory and return the same model instances. Read counters are kept for
+    diagnostics.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.reads = 0  # documents fetched from Firestore
+        self.calls = 0  # Firestore read round trips
+        self.hits = 0  # reads served from the identity map
+        self._data: Dict[Key, Optional[dict]] = {}
+        self._models: Dict[Key, FirestoreModel] = {}
+        self._queries: Dict[tuple, List[str]] = {}
+
+    # Raw access
+
+    async def get_data(self, collection: str, doc_id: Any) -> Optional[dict]:
+        """Get a document's raw data, or None if it does not exist."""
+        key = (collection, str(doc_id))
+        if key in self._data:
+            self.hits += 1
+            return self._data[key]
+        snapshot = await self.db.collection(collection).document(key[1]).get()
+        self.calls += 1
+        self.reads += 1
+        self._data[key] = snapshot.to_dict() if snapshot.exists else None
+        self._remember_owner(collection, key[1], self._data[key])
+        return self._data[key]
+
+    async def get_many_data(self, collection: str, doc_ids: Iterable[Any]) -> Dict[str, dict]:
+        """Get several documents' raw data in one batched read (missing ones are omitted)."""
+        ids = list(dict.fromkeys(str(doc_id) for doc_id in doc_ids))
+        missing = [doc_id for doc_id in ids if (collection, doc_id) not in self._data]
+        self.hits += len(ids) - len(missing)
+        if missing:
+            refs = [self.db.collection(collection).document(doc_id) for doc_id in missing]
+            found = {}
+            self.calls += 1
+            async for snapshot in self.db.get_all(refs):
+                self.reads += 1
+                found[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+            for doc_id in missing:
+                self._data[(collection, doc_id)] = found.get(doc_id)
+        return {
+            doc_id: self._data[(collection, doc_id)]
+            for doc_id in ids
+            if self._data[(collection, doc_id)] is not None
+        }
+
+    async def query_data(self, collection: str, *filters: Tuple[str, str, Any]) -> List[Tuple[str, dict]]:
+        """Run a query of (field, op, value) filters and return (id, data) pairs."""
+        key = (collection,) + tuple(
+            (field, op, tuple(value) if isinstance(value, list) else value)
+            for field, op, value in filters
+        )
+        if key in self._queries:
+            self.hits += 1
+        else:
+            query = self.db.collection(collection)
+            for field, op, value in filters:
+                query = query.where(field, op, value)
+            snapshots = await query.get()
+            self.calls += 1
+            self.reads += len(snapshots)
+            for snapshot in snapshots:
+                self._data[(collection, snapshot.id)] = snapshot.to_dict()
+                self._remember_owner(collection, snapshot.id, self._data[(collection, snapshot.id)])
+            self._queries[key] = [snapshot.id for snapshot in snapshots]
+        return [
+            (doc_id, self._data[(collection, doc_id)])
+            for doc_id in self._queries[key]
+            if self._data.get((collection, doc_id)) is not None
+        ]
+
+    @staticmethod
+    def _owner(data: Optional[dict]) -> Optional[str]:
+        # A document being deleted is treated as missing
+        if not data or data.get("status") == DocumentStatus.DELETING.value:
+            return None
+        return data.get("user_id")
+
+    @classmethod
+    def _remember_owner(cls, collection: str, doc_id: str, data: Optional[dict]) -> None:
+        # Any document read warms the process-wide ownership cache
+        if collection == Document.collection_name():
+            get_ownership_cache().remember(doc_id, cls._owner(data))
+
+    def forget(self, collection: str, doc_id: Any) -> None:
+        """Drop a document from the identity map after writing or deleting it."""
+        key = (collection, str(doc_id))
+        self._data.pop(key, None)
+        self._models.pop(key, None)
+        self._queries = {
+            query_key: ids for query_key, ids in self._queries.items()
+            if query_key[0] != collection
+        }
+
+    # Models
+
+    def _model(self, model_cls: Type[FirestoreModel], doc_id: str, data: dict) -> FirestoreModel:
+        key = (model_cls.collection_name(), doc_id)
+        model = self._models.get(key)
+        if model is None:
+            data = dict(data)
+            data[_ID_FIELDS[model_cls]] = doc_id
+            model = model_cls.from_dict(data)
+            self._models[key] = model
+        return model
+
+    async def _get(self, model_cls: Type[FirestoreModel], doc_id: Any) -> Optional[FirestoreModel]:
+        data = await self.get_data(model_cls.collection_name(), doc_id)
+        if data is None:
+            return None
+        return self._model(model_cls, str(doc_id), data)
+
+    async def _query(self, model_cls: Type[FirestoreModel], *filters) -> List[FirestoreModel]:
+        rows = await self.query_data(model_cls.collection_name(), *filters)
+        return [self._model(model_cls, doc_id, data) for doc_id, data in rows]
+
+    async def get_document(self, document_id: Any) -> Optional[Document]:
+        """A document, or None if it does not exist or is being deleted."""
+        data = await self.get_data(Document.collection_name(), document_id)
+        if data is None or data.get("status") == DocumentStatus.DELETING.value:
+            return None
+        return self._model(Document, str(document_id), data)
+
+    async def get_question(self, question_id: Any) -> Optional[Question]:
+        return await self._get(Question, question_id)
+
+    async def get_attempt(self, attempt_id: Any) -> Optional[Attempt]:
+        return await self._get(Attempt, attempt_id)
+
+    async def document_owner(self, document_id: Any) -> Optional[str]:
+        """User ID of a document's owner, or None if the document does not exist.
+        
+        Served from the process-wide ownership cache when possible, so
+        ownership checks usually cost no read.
+        """
+        known, owner = get_ownership_cache().lookup(document_id)
+        if known:
+            return owner
+        data = await self.get_data(Document.collection_name(), document_id)
+        return self._owner(data)
+
+    async def question_owner(self, question: Question) -> Optional[str]:
+        """User ID of a question's owner (denormalized on newer questions)."""
+        owner = getattr(question, "user_id", None)
+        if owner:
+            return owner
+        return await self.document_owner(question.document_id)
+
+    async def get_questions(self, question_ids: Iterable[Any]) -> Dict[str, Question]:
+        """Get several questions in one batched read, keyed by string ID."""
+        rows = await self.get_many_data(Question.collection_name(), question_ids)
+        return {q_id: self._model(Question, q_id, data) for q_id, data in rows.items()}
+
+    async def list_chunks(self, document_id: Any) -> List[Chunk]:
+        """Chunks of a document ordered by chunk_index."""
+        # Sorted in memory to avoid requiring a Firestore composite index
+        chunks = await self._query(Chunk, ("document_id", "==", str(document_id)))
+        return sorted(chunks, key=lambda chunk: chunk.chunk_index or 0)
+
+    async def list_questions(self, document_id: Any) -> List[Question]:
+        return await self._query(Question, ("document_id", "==", str(document_id)))
+
+    async def list_attempts(self, user_id: str, question_id: Optional[Any] = None) -> List[Attempt]:
+        filters = [("user_id", "==", user_id)]
+        if question_id:
+            filters.append(("question_id", "==", str(question_id)))
+        return await self._query(Attempt, *filters)
+
+    async def attempt_records(self, user_id: str, document_id: Optional[Any] = None) -> List[dict]:
+        """Raw attempt dicts of a user, optionally scoped to one document."""
+        filters = [("user_id", "==", user_id)]
+        if document_id:
+            filters.append(("document_id", "==", str(document_id)))
+        return [data for _, data in await self.query_data(Attempt.collection_name(), *filters)]
+
+
+async def get_repository(request: Request):
+    """FastAPI dependency: one Repository per request."""
+    try:
+        db = get_firestore()
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database not initialized: {str(e)}"
+        )
+    repository = Repository(db)
+    # Exposed so middleware can report per-request read counts
+    request.state.repository = repository
+    return repository
@@ -2,11 +2,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime, timedelta, timezone
-from app.database import get_firestore
-from app.schemas import PerformanceAnalytics, TopicAccuracy, DifficultyStats
+from app.repository import Repository, get_repository
+from app.schemas import PerformanceAnalytics
 from app.routers.auth import get_current_user
-from app.models import Attempt, Question, Chunk, Document, Difficulty
+from app.models import Question
+from app.services.analytics_aggregates import (
+    AGGREGATES_COLLECTION,
+    aggregate_id,
+    analytics_from_aggregate,
+    refresh_aggregate,
+)
+from app.services.analytics_engine import AttemptColumns, compute_analytics
+from app.services.analytics_cache import get_analytics_cache
 
 router = APIRouter()
 
@@ -15,252 +22,85 @@ router = APIRouter()
 async def get_performance_analytics(
     document_id: Optional[UUID] = None,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """Get comprehensive performance analytics."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
     user_id = current_user["user_id"]
     
-    # Get user's attempts
-    base_attempts_query = db.collection(Attempt.collection_name()).where(
-        "user_id", "==", user_id
-    )
-    
-    # Filter by document if provided
-    document_question_ids = None
+    # Cached entries only exist for documents the user was verified to own
+    cache = get_analytics_cache()
+    analytics, version = await cache.get(user_id, document_id)
+    if analytics is None:
+        analytics = await _compute_performance_analytics(repo, user_id, document_id)
+        # Stored under the version read before computing, so an attempt
+        # recorded meanwhile leaves this result unreachable
+        await cache.set(user_id, document_id, analytics, version)
+    return analytics
+
+
+async def _compute_performance_analytics(repo: Repository, user_id: str, document_id: Optional[UUID]) -> PerformanceAnalytics:
+    """Compute analytics for a user, optionally scoped to one document."""
     if document_id:
         # Verify document belongs to user
-        doc_ref = db.collection(Document.collection_name()).document(str(document_id))
-        doc = doc_ref.get()
-        if not doc.exists or doc.to_dict().get("user_id") != user_id:
+        if await repo.document_owner(document_id) != user_id:
             raise HTTPException(status_code=404, detail="Document not found")
-        
-        # Get question IDs for this document (as strings, matching how they're stored in attempts)
-        questions_query = db.collection(Question.collection_name()).where(
-            "document_id", "==", str(document_id)
-        )
-        document_question_ids = [q.id for q in questions_query.stream()]
-    
-    # Get attempts
-    if document_question_ids and len(document_question_ids) <= 10:
-        # Use Firestore "in" query (supports up to 10 items)
-        attempts_docs = list(base_attempts_query.where(
-            "question_id", "in", document_question_ids
-        ).stream())
-    else:
-        # Get all attempts and filter in memory if needed
-        all_attempts = list(base_attempts_query.stream())
-        if document_question_ids:
-            attempts_docs = [
-                a for a in all_attempts 
-                if a.to_dict().get("question_id") in document_question_ids
-            ]
-        else:
-            attempts_docs = all_attempts
-    
-    if not attempts_docs:
-        return PerformanceAnalytics(
-            total_attempts=0,
-            overall_accuracy=0.0,
-            topic_accuracy=[],
-            difficulty_stats=[],
-            weak_areas=[],
-            avg_time_per_question=None,
-            progress_over_time=[],
-        )
-    
-    # Convert to Attempt objects and collect unique question IDs
-    attempts = []
-    attempt_question_ids = set()  # Use set to avoid duplicates
-    for attempt_doc in attempts_docs:
-        attempt_data = attempt_doc.to_dict()
-        # Ensure user_id is present (should already be there, but verify)
-        if not attempt_data.get("user_id"):
-            attempt_data["user_id"] = user_id
-        attempt_data["attempt_id"] = UUID(attempt_doc.id)
-        attempt = Attempt.from_dict(attempt_data)
-        attempts.append(attempt)
-        # Store question_id as string for dictionary lookup
-        if attempt.question_id:
-            attempt_question_ids.add(str(attempt.question_id))
-    
-    # Calculate overall accuracy
-    total_attempts = len(attempts)
-    correct_attempts = sum(1 for a in attempts if a.is_correct)
-    overall_accuracy = correct_attempts / total_attempts if total_attempts > 0 else 0.0
-    
-    # Get questions for attempts (using string IDs as keys for dictionary)
-    questions_dict = {}
-    for q_id_str in attempt_question_ids:
-        q_ref = db.collection(Question.collection_name()).document(q_id_str)
-        q_doc = q_ref.get()
-        if q_doc.exists:
-            q_data = q_doc.to_dict()
-            q_data["question_id"] = UUID(q_doc.id)
-            question = Question.from_dict(q_data)
-            # Store with string key for lookup
-            questions_dict[q_id_str] = question
-    
-    # Calculate difficulty stats
-    difficulty_stats_map = {}
-    for attempt in attempts:
-        # Use string version of question_id for lookup
-        question = questions_dict.get(str(attempt.question_id)) if attempt.question_id else None
-        if not question:
-            continue
-        
-        difficulty = question.difficulty.value
-        if difficulty not in difficulty_stats_map:
-            difficulty_stats_map[difficulty] = {
-                "total": 0,
-                "correct": 0,
-                "times": [],
-            }
-        
-        difficulty_stats_map[difficulty]["total"] += 1
-        if attempt.is_correct:
-            difficulty_stats_map[difficulty]["correct"] += 1
-        if attempt.time_taken:
-            difficulty_stats_map[difficulty]["times"].append(attempt.time_taken)
     
-    difficulty_stats_list = []
-    for difficulty, stats in difficulty_stats_map.items():
-        accuracy = stats["correct"] / stats["total"] if stats["total"] > 0 else 0.0
-        avg_time = sum(stats["times"]) / len(stats["times"]) if stats["times"] else None
-        
-        difficulty_stats_list.append(DifficultyStats(
-            difficulty=Difficulty(difficulty),
-            total_questions=stats["total"],
-            correct_answers=stats["correct"],
-            accuracy=accuracy,
-            avg_time=avg_time,
-        ))
-    
-    # Calculate topic accuracy (simplified - using "General" if no topic)
-    topic_stats_map = {"General": {"total": 0, "correct": 0}}
-    for attempt in attempts:
-        # Use string version of question_id for lookup
-        question = questions_dict.get(str(attempt.question_id)) if attempt.question_id else None
-        if not question:
-            continue
-        
-        # For now, use "General" as topic (can be enhanced later)
-        topic = "General"
-        if topic not in topic_stats_map:
-            topic_stats_map[topic] = {"total": 0, "correct": 0}
-        
-        topic_stats_map[topic]["total"] += 1
-        if attempt.is_correct:
-            topic_stats_map[topic]["correct"] += 1
-    
-    topic_accuracy_list = []
-    for topic, stats in topic_stats_map.items():
-        accuracy = stats["correct"] / stats["total"] if stats["total"] > 0 else 0.0
-        topic_accuracy_list.append(TopicAccuracy(
-            topic=topic,
-            total_questions=stats["total"],
-            correct_answers=stats["correct"],
-            accuracy=accuracy,
-        ))
-    
-    # Identify weak areas
-    weak_areas = [
-        ta.topic for ta in topic_accuracy_list
-        if ta.accuracy < 0.6 and ta.total_questions >= 3
-    ]
-    
-    # Calculate average time per question
-    times = [a.time_taken for a in attempts if a.time_taken]
-    avg_time_per_question = sum(times) / len(times) if times else None
-    
-    # Calculate progress over time (last 30 days)
-    progress_data = []
-    # Use timezone-aware datetime to match Firestore timestamps
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=30)
-    
-    date_accuracy = {}
-    for attempt in attempts:
-        # Ensure attempted_at is a datetime object
-        if not attempt.attempted_at or not isinstance(attempt.attempted_at, datetime):
-            continue
-        # Ensure both datetimes are timezone-aware for comparison
-        attempt_time = attempt.attempted_at
-        if attempt_time.tzinfo is None:
-            # If timezone-naive, assume UTC
-            attempt_time = attempt_time.replace(tzinfo=timezone.utc)
-        if attempt_time >= start_date:
-            date_key = attempt_time.date().isoformat()
-            if date_key not in date_accuracy:
-                date_accuracy[date_key] = {"total": 0, "correct": 0}
-            
-            date_accuracy[date_key]["total"] += 1
-            if attempt.is_correct:
-                date_accuracy[date_key]["correct"] += 1
+    # Serve from the incrementally maintained aggregate once it covers every attempt
+    snapshot = await repo.db.collection(AGGREGATES_COLLECTION).document(aggregate_id(user_id, document_id)).get()
+    if snapshot.exists and snapshot.to_dict().get("complete"):
+        return analytics_from_aggregate(snapshot.to_dict())
+    
+    # Missing or incomplete aggregate (attempts predating aggregates, or
+    # deleted attempts): compute from raw attempts.
+    # Attempts carry their question's document_id, so document-scoped
+    # retrieval only reads that document's attempts
+    attempt_records = await repo.attempt_records(user_id, document_id)
+    
+    # Get questions for attempts in one batched read, keeping the raw dicts
+    # so the columnar load never builds model objects
+    questions_dict = await repo.get_many_data(
+        Question.collection_name(),
+        {str(record["question_id"]) for record in attempt_records if record.get("question_id")},
+    )
     
-    for date_str, stats in sorted(date_accuracy.items()):
-        accuracy = stats["correct"] / stats["total"] if stats["total"] > 0 else 0.0
-        progress_data.append({
-            "date": date_str,
-            "accuracy": accuracy,
-        })
+    columns = AttemptColumns.from_records(attempt_records, questions_dict)
+    analytics = compute_analytics(columns)
     
-    return PerformanceAnalytics(
-        total_attempts=total_attempts,
-        overall_accuracy=overall_accuracy,
-        topic_accuracy=topic_accuracy_list,
-        difficulty_stats=difficulty_stats_list,
-        weak_areas=weak_areas,
-        avg_time_per_question=avg_time_per_question,
-        progress_over_time=progress_data,
-    )
+    # Later reads are served from the aggregate (skipped if attempts raced this read)
+    await refresh_aggregate(repo.db, user_id, document_id, snapshot, attempt_records, questions_dict)
+    return analytics
 
 
 @router.get("/analytics/document/{document_id}/summary")
 async def get_document_summary(
     document_id: UUID,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """Get summary analytics for a specific document."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
     # Verify document belongs to user
-    doc_ref = db.collection(Document.collection_name()).document(str(document_id))
-    doc = doc_ref.get()
+    document = await repo.get_document(document_id)
     
-    if not doc.exists:
+    if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc_data = doc.to_dict()
-    if doc_data.get("user_id") != current_user["user_id"]:
+    if document.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get performance analytics for this document
+    # Get performance analytics for this document (the document read above
+    # is reused from the repository's identity map)
     analytics = await get_performance_analytics(
         document_id=document_id,
         current_user=current_user,
+        repo=repo,
     )
     
     # Get question counts
-    questions_query = db.collection(Question.collection_name()).where(
-        "document_id", "==", str(document_id)
-    )
-    total_questions = len(list(questions_query.stream()))
+    total_questions = len(await repo.list_questions(document_id))
     
     return {
         "document_id": document_id,
-        "title": doc_data.get("title", ""),
+        "title": document.title,
         "total_questions": total_questions,
         "analytics": analytics,
     }
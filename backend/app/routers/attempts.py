@@ -3,11 +3,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from app.database import get_firestore
+from app.container import get_llm_service
+from app.repository import Repository, get_repository
 from app.schemas import AttemptResponse, AttemptCreate
 from app.routers.auth import get_current_user
-from app.models import Attempt, Question, Document
+from app.models import Attempt
 from app.services.llm_service import LLMService
+from app.services.analytics_aggregates import record_attempt
+from app.services.analytics_cache import get_analytics_cache
 
 router = APIRouter()
 
@@ -16,36 +19,21 @@ router = APIRouter()
 async def submit_attempt(
     attempt_data: AttemptCreate,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+    llm_service: LLMService = Depends(get_llm_service),
 ):
     """Submit an answer attempt."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
     # Get question
-    q_ref = db.collection(Question.collection_name()).document(str(attempt_data.question_id))
-    q_doc = q_ref.get()
+    question = await repo.get_question(attempt_data.question_id)
     
-    if not q_doc.exists:
+    if question is None:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    q_data = q_doc.to_dict()
-    q_data["question_id"] = UUID(q_doc.id)
-    question = Question.from_dict(q_data)
-    
     # Verify document belongs to user
-    doc_ref = db.collection(Document.collection_name()).document(str(question.document_id))
-    doc = doc_ref.get()
-    
-    if not doc.exists or doc.to_dict().get("user_id") != current_user["user_id"]:
+    if await repo.question_owner(question) != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Evaluate answer
-    llm_service = LLMService()
     evaluation = await llm_service.evaluate_answer(
         question=question.question_text,
         correct_answer=question.correct_answer,
@@ -61,11 +49,17 @@ async def submit_attempt(
         is_correct=evaluation["is_correct"],
         score=evaluation.get("score", 1.0 if evaluation["is_correct"] else 0.0),
         time_taken=attempt_data.time_taken,
+        document_id=question.document_id,
     )
     
-    # Save to Firestore
+    # Save attempt and update analytics aggregates in one atomic batch
+    db = repo.db
     attempt_ref = db.collection(Attempt.collection_name()).document(str(attempt.attempt_id))
-    attempt_ref.set(attempt.to_dict())
+    batch = db.batch()
+    batch.set(attempt_ref, attempt.to_dict())
+    record_attempt(batch, db, attempt, question)
+    await batch.commit()
+    await get_analytics_cache().invalidate_user(attempt.user_id)
     
     return AttemptResponse(
         attempt_id=attempt.attempt_id,
@@ -87,44 +81,22 @@ async def list_attempts(
     skip: int = 0,
     limit: int = 20,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """List user's attempts."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
+    all_attempts = list(await repo.list_attempts(current_user["user_id"], question_id))
+    # Sort by attempted_at (descending)
+    all_attempts.sort(key=lambda a: getattr(a, "attempted_at", None) or datetime.min, reverse=True)
+    attempts_page = all_attempts[skip:skip + limit]
     
-    query = db.collection(Attempt.collection_name()).where(
-        "user_id", "==", current_user["user_id"]
+    # Get questions for the page in one batched read
+    questions = await repo.get_questions(
+        a.question_id for a in attempts_page if a.question_id
     )
     
-    if question_id:
-        query = query.where("question_id", "==", str(question_id))
-    
-    all_attempts = list(query.stream())
-    # Sort by attempted_at (descending)
-    all_attempts.sort(key=lambda a: a.to_dict().get("attempted_at", datetime.min), reverse=True)
-    attempts_docs = all_attempts[skip:skip + limit]
-    
-    # Get questions for each attempt
     attempt_responses = []
-    for attempt_doc in attempts_docs:
-        attempt_data = attempt_doc.to_dict()
-        attempt_data["attempt_id"] = UUID(attempt_doc.id)
-        attempt = Attempt.from_dict(attempt_data)
-        
-        # Get question
-        q_ref = db.collection(Question.collection_name()).document(str(attempt.question_id))
-        q_doc = q_ref.get()
-        
-        question = None
-        if q_doc.exists:
-            q_data = q_doc.to_dict()
-            q_data["question_id"] = UUID(q_doc.id)
-            question = Question.from_dict(q_data)
+    for attempt in attempts_page:
+        question = questions.get(str(attempt.question_id))
         
         attempt_responses.append(AttemptResponse(
             attempt_id=attempt.attempt_id,
@@ -146,38 +118,19 @@ async def list_attempts(
 async def get_attempt(
     attempt_id: UUID,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """Get a specific attempt."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
+    attempt = await repo.get_attempt(attempt_id)
     
-    attempt_ref = db.collection(Attempt.collection_name()).document(str(attempt_id))
-    attempt_doc = attempt_ref.get()
-    
-    if not attempt_doc.exists:
+    if attempt is None:
         raise HTTPException(status_code=404, detail="Attempt not found")
     
-    attempt_data = attempt_doc.to_dict()
-    if attempt_data.get("user_id") != current_user["user_id"]:
+    if attempt.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    attempt_data["attempt_id"] = UUID(attempt_doc.id)
-    attempt = Attempt.from_dict(attempt_data)
-    
     # Get question
-    q_ref = db.collection(Question.collection_name()).document(str(attempt.question_id))
-    q_doc = q_ref.get()
-    
-    question = None
-    if q_doc.exists:
-        q_data = q_doc.to_dict()
-        q_data["question_id"] = UUID(q_doc.id)
-        question = Question.from_dict(q_data)
+    question = await repo.get_question(attempt.question_id) if attempt.question_id else None
     
     return AttemptResponse(
         attempt_id=attempt.attempt_id,
@@ -1,19 +1,22 @@
 """Authentication router."""
-from fastapi import APIRouter, Depends, HTTPException, Header
+import time
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from typing import Optional
 import firebase_admin
-from firebase_admin import auth
 from app.database import initialize_firebase
+from app.services.token_verifier import verify_id_token
 
 router = APIRouter()
 
-# Ensure Firebase is initialized (safe to call multiple times)
-initialize_firebase()
 
-
-async def verify_firebase_token(authorization: Optional[str] = Header(None, alias="Authorization")):
+async def verify_firebase_token(
+    request: Request,
+    authorization: Optional[str] = Header(None, alias="Authorization"),
+):
     """Verify Firebase ID token."""
-    # Check if Firebase Admin SDK is initialized
+    # Check if Firebase Admin SDK is initialized (normally done at startup;
+    # safe to call multiple times)
+    initialize_firebase()
     try:
         firebase_admin.get_app()
     except ValueError:
@@ -25,6 +28,7 @@ async def verify_firebase_token(authorization: Optional[str] = Header(None, alia
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
     
+    start = time.perf_counter()
     try:
         # Extract token from "Bearer <token>" (handle both "Bearer token" and just "token")
         if authorization.startswith("Bearer "):
@@ -35,9 +39,8 @@ async def verify_firebase_token(authorization: Optional[str] = Header(None, alia
         if not token:
             raise HTTPException(status_code=401, detail="Token is empty")
         
-        # Verify token with clock skew tolerance (60 seconds max) to handle clock differences
-        # between client and server
-        decoded_token = auth.verify_id_token(token, clock_skew_seconds=60)
+        # Verify token (cached until shortly before it expires)
+        decoded_token = await verify_id_token(token)
         return decoded_token
     except HTTPException:
         raise
@@ -46,10 +49,10 @@ async def verify_firebase_token(authorization: Optional[str] = Header(None, alia
         print(f"Token format error: {str(e)}")
         raise HTTPException(status_code=401, detail="Invalid token format")
     except Exception as e:
-        import traceback
         error_msg = str(e)
-        print(f"Token verification error: {error_msg}")
-        print(traceback.format_exc())
+        # One line per failure; expired or forged tokens are routine and do
+        # not warrant a traceback
+        print(f"Token verification error: {type(e).__name__}: {error_msg}")
         
         # Provide more helpful error messages
         if "expired" in error_msg.lower():
@@ -63,6 +66,9 @@ async def verify_firebase_token(authorization: Optional[str] = Header(None, alia
             raise HTTPException(status_code=401, detail="Invalid token. Please log in again.")
         else:
             raise HTTPException(status_code=401, detail=f"Authentication failed: {error_msg}")
+    finally:
+        # Reported per request in the Server-Timing header
+        request.state.auth_seconds = time.perf_counter() - start
 
 
 async def get_current_user(token_data: dict = Depends(verify_firebase_token)):
@@ -1,80 +1,126 @@
 """Documents router."""
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from typing import List
 from uuid import UUID
 from datetime import datetime
-from app.database import get_firestore
-from app.schemas import DocumentResponse, DocumentListResponse, UploadResponse
+from app.config import settings
+from app.container import get_document_processor, get_vector_store
+from app.repository import Repository, get_repository
+from app.schemas import DocumentResponse, DocumentListResponse, UploadResponse, DeleteResponse
 from app.routers.auth import get_current_user
 from app.models import Document, DocumentStatus
 from app.services.document_processor import DocumentProcessor
 from app.services.vector_store import VectorStore
+from app.services.text_store import get_text_store, load_document_text
+from app.services.analytics_cache import get_analytics_cache
+from app.services.document_deletion import document_deleter, mark_deleting
+from app.services.document_status import StatusConflict, claim_processing, finish_processing, processing_fields
+from app.services.extractors import detect_mime_type
+from app.services.ingest_artifacts import IngestArtifactStore
+from app.services.ownership_cache import get_ownership_cache
+from app.tracing import span
+from app.uploads import Content, content_size
 
 router = APIRouter()
 
+ALLOWED_EXTENSIONS = {".pdf", ".docx", ".txt", ".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+
+def _check_file_type(filename: str) -> None:
+    """Reject files whose extension cannot be processed."""
+    file_extension = "." + filename.split(".")[-1].lower() if "." in filename else ""
+    
+    if file_extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+
+def _check_content_type(content: Content, filename: str) -> None:
+    """Reject files whose content is not a type that can be processed, whatever their extension."""
+    mime_type = detect_mime_type(content, filename)
+    
+    if mime_type not in DocumentProcessor.EXTRACTORS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {mime_type}")
+
+
+def _raise_status_conflict(conflict: StatusConflict) -> None:
+    """Respond to a status change another request got to first."""
+    if conflict.status == DocumentStatus.PROCESSING.value:
+        raise HTTPException(status_code=409, detail="Document is still being processed")
+    raise HTTPException(status_code=404, detail="Document not found")
+
 
 @router.post("/documents/upload", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+    processor: DocumentProcessor = Depends(get_document_processor),
 ):
     """Upload and process a document."""
     # Validate file type - now includes images
-    allowed_extensions = {".pdf", ".docx", ".txt", ".jpg", ".jpeg", ".png", ".gif", ".webp"}
-    file_extension = "." + file.filename.split(".")[-1].lower() if "." in file.filename else ""
-    
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
-        )
-    
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
+    _check_file_type(file.filename)
     
+    db = repo.db
     document = None
-    doc_ref = None
+    token = None
     
     try:
-        # Read file content
-        content = await file.read()
+        # The file is spooled (to disk when large) and read in place by the extractors
+        content = file.file
+        content_bytes = content_size(content)
         
-        if len(content) == 0:
+        if content_bytes == 0:
             raise HTTPException(status_code=400, detail="File is empty")
         
+        _check_content_type(content, file.filename)
+        
         # Create document record
         document = Document(
             user_id=current_user["user_id"],
             title=file.filename,
-            extracted_text="",  # Will be updated after processing
             status=DocumentStatus.PROCESSING,
         )
         
-        # Save to Firestore
+        # Save to Firestore; the upload holds the processing claim until its last write
+        claim = processing_fields()
         doc_ref = db.collection(Document.collection_name()).document(str(document.document_id))
-        doc_ref.set(document.to_dict())
-        
-        # Process document (chunk, embed, store in Pinecone and Firestore)
-        processor = DocumentProcessor()
-        result = await processor.process_document(
-            content=content,
-            filename=file.filename,
-            document_id=str(document.document_id),
-            user_id=current_user["user_id"],
-        )
+        await doc_ref.set({**document.to_dict(), **claim})
+        token = claim["processing"]["token"]
+        get_ownership_cache().remember(document.document_id, document.user_id)
         
-        # Update document with extracted text and chunks info
-        document.extracted_text = result.get("extracted_text", "")
-        document.status = DocumentStatus.PROCESSED
-        doc_ref.update(document.to_dict())
+        with span("ingest", document_id=str(document.document_id), bytes=content_bytes):
+            # Process document (chunk, embed, store in Pinecone and Firestore)
+            result = await processor.process_document(
+                content=content,
+                filename=file.filename,
+                document_id=str(document.document_id),
+                user_id=current_user["user_id"],
+            )
+            
+            # Store extracted text outside Firestore and keep only its reference
+            with span("store_text"):
+                text_info = await asyncio.to_thread(
+                    get_text_store().save, str(document.document_id), result.get("extracted_text", "")
+                )
+            document.text_ref = text_info["text_ref"]
+            document.text_size = text_info["text_size"]
+            document.text_sha256 = text_info["text_sha256"]
+            document.content_sha256 = result.get("content_sha256")
+            document.status = DocumentStatus.PROCESSED
+            with span("firestore_write"):
+                await finish_processing(db, document.document_id, token, document.to_dict())
         
         chunks_count = len(result.get("chunks", []))
-        message = f"Document processed successfully. {chunks_count} chunk(s) created and embedded."
+        # A match is only reported when it can only have been the user's own
+        # upload; with global scope it would tell them someone else has the file
+        if result.get("deduplicated") and settings.INGEST_DEDUP_SCOPE == "user":
+            message = f"Document matched one of your earlier uploads. {chunks_count} chunk(s) reused."
+        else:
+            message = f"Document processed successfully. {chunks_count} chunk(s) created and embedded."
         
         return UploadResponse(
             document_id=document.document_id,
@@ -86,11 +132,10 @@ async def upload_document(
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        # Mark document as failed
-        if document is not None and doc_ref is not None:
+        # Mark document as failed, unless it has since been taken over
+        if token is not None:
             try:
-                document.status = DocumentStatus.FAILED
-                doc_ref.update(document.to_dict())
+                await finish_processing(db, document.document_id, token, {"status": DocumentStatus.FAILED.value})
             except:
                 pass  # If update fails, continue with error
         
@@ -100,35 +145,124 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
+@router.put("/documents/{document_id}/content", response_model=UploadResponse)
+async def replace_document_content(
+    document_id: UUID,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+    processor: DocumentProcessor = Depends(get_document_processor),
+):
+    """Replace a document's content with a revised file.
+    
+    Chunks whose text is unchanged keep their IDs and embeddings, so
+    questions generated from them stay valid; only new chunks are embedded.
+    """
+    _check_file_type(file.filename)
+    
+    doc_data = await repo.get_data(Document.collection_name(), document_id)
+    
+    if doc_data is None or doc_data.get("status") == DocumentStatus.DELETING.value:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    if doc_data.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    content = file.file
+    content_bytes = content_size(content)
+    
+    if content_bytes == 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    
+    _check_content_type(content, file.filename)
+    
+    repo.forget(Document.collection_name(), document_id)
+    
+    # Only one request processes a document at a time, and never one being deleted
+    try:
+        token = await claim_processing(repo.db, document_id)
+    except StatusConflict as e:
+        _raise_status_conflict(e)
+    
+    try:
+        with span("reingest", document_id=str(document_id), bytes=content_bytes):
+            result = await processor.replace_document_content(
+                content=content,
+                filename=file.filename,
+                document_id=str(document_id),
+                user_id=current_user["user_id"],
+            )
+            
+            # The text blob is keyed by document, so this overwrites the old text
+            with span("store_text"):
+                text_info = await asyncio.to_thread(
+                    get_text_store().save, str(document_id), result.get("extracted_text", "")
+                )
+            with span("firestore_write"):
+                await finish_processing(repo.db, document_id, token, {
+                    **text_info,
+                    "content_sha256": result.get("content_sha256"),
+                    "status": DocumentStatus.PROCESSED.value,
+                })
+        
+        # Ingest artifacts of the previous content are dropped once no document has it
+        previous_sha256 = doc_data.get("content_sha256")
+        if previous_sha256 and previous_sha256 != result.get("content_sha256"):
+            try:
+                await IngestArtifactStore(repo.db).release(previous_sha256, current_user["user_id"], document_id)
+            except Exception as e:
+                print(f"Error releasing ingest artifacts: {e}")
+        
+        return UploadResponse(
+            document_id=document_id,
+            status=DocumentStatus.PROCESSED,
+            message=(
+                f"Document content replaced. {result['reused']} chunk(s) reused, "
+                f"{result['embedded']} embedded, {result['removed']} removed."
+            ),
+        )
+        
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        try:
+            await finish_processing(repo.db, document_id, token, {"status": DocumentStatus.FAILED.value})
+        except:
+            pass  # If update fails, continue with error
+        
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Document re-processing error: {error_details}")
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        repo.forget(Document.collection_name(), document_id)
+
+
 @router.get("/documents", response_model=DocumentListResponse)
 async def list_documents(
     skip: int = 0,
     limit: int = 20,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """List user's documents."""
     try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
-    # Query Firestore
-    query = db.collection(Document.collection_name()).where(
-        "user_id", "==", current_user["user_id"]
-    )
-    
-    try:
-        # Get all documents for total count and pagination
-        all_docs = list(query.stream())
+        # Get all documents for total count and pagination, as (id, data) pairs
+        # Documents being deleted are already gone as far as the user is concerned
+        all_docs = [
+            (doc_id, doc_dict)
+            for doc_id, doc_dict in await repo.query_data(
+                Document.collection_name(), ("user_id", "==", current_user["user_id"])
+            )
+            if doc_dict.get("status") != DocumentStatus.DELETING.value
+        ]
         total = len(all_docs)
         
         # Sort by uploaded_at (descending) and apply pagination
         def get_uploaded_at(doc):
+            doc_id, doc_dict = doc
             try:
-                doc_dict = doc.to_dict()
                 uploaded_at = doc_dict.get("uploaded_at")
                 if uploaded_at is None:
                     return datetime.min
@@ -146,21 +280,18 @@ async def list_documents(
                         pass
                 return datetime.min
             except Exception as e:
-                print(f"Error getting uploaded_at for document {doc.id}: {e}")
+                print(f"Error getting uploaded_at for document {doc_id}: {e}")
                 return datetime.min
         
         all_docs.sort(key=get_uploaded_at, reverse=True)
         documents = []
-        for doc in all_docs[skip:skip + limit]:
+        for doc_id, _ in all_docs[skip:skip + limit]:
             try:
-                doc_data = doc.to_dict()
-                doc_data["document_id"] = UUID(doc.id)
-                document = Document.from_dict(doc_data)
-                documents.append(document)
+                documents.append(await repo.get_document(doc_id))
             except Exception as e:
                 # Skip documents that can't be parsed
                 import traceback
-                print(f"Error parsing document {doc.id}: {e}")
+                print(f"Error parsing document {doc_id}: {e}")
                 print(traceback.format_exc())
                 continue
         
@@ -176,72 +307,61 @@ async def list_documents(
 async def get_document(
     document_id: UUID,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """Get a specific document."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
-    doc_ref = db.collection(Document.collection_name()).document(str(document_id))
-    doc = doc_ref.get()
+    doc_data = await repo.get_data(Document.collection_name(), document_id)
     
-    if not doc.exists:
+    if doc_data is None or doc_data.get("status") == DocumentStatus.DELETING.value:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc_data = doc.to_dict()
-    doc_data["document_id"] = UUID(doc.id)
-    document = Document.from_dict(doc_data)
+    document = await repo.get_document(document_id)
     
     # Verify ownership
     if document.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    return DocumentResponse.model_validate(document)
+    response = DocumentResponse.model_validate(document)
+    response.extracted_text = await asyncio.to_thread(load_document_text, doc_data)
+    return response
 
 
-@router.delete("/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/documents/{document_id}", response_model=DeleteResponse, status_code=status.HTTP_202_ACCEPTED)
 async def delete_document(
     document_id: UUID,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+    vector_store: VectorStore = Depends(get_vector_store),
 ):
-    """Delete a document and its associated data."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
+    """Delete a document and its associated data.
     
-    doc_ref = db.collection(Document.collection_name()).document(str(document_id))
-    doc = doc_ref.get()
+    The document is marked ``deleting`` and hidden right away; its chunks,
+    questions, attempts and vectors are removed by a background job.
+    """
+    db = repo.db
+    doc_data = await repo.get_data(Document.collection_name(), document_id)
     
-    if not doc.exists:
+    if doc_data is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc_data = doc.to_dict()
     if doc_data.get("user_id") != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Delete from Pinecone
-    vector_store = VectorStore()
-    await vector_store.delete_document(document_id)
-    
-    # Delete chunks from Firestore
-    chunks_query = db.collection("chunks").where("document_id", "==", str(document_id))
-    for chunk_doc in chunks_query.stream():
-        chunk_doc.reference.delete()
+    # A repeated delete is accepted; an abandoned job is resumed by the deleter's scan
+    if doc_data.get("status") != DocumentStatus.DELETING.value:
+        try:
+            await mark_deleting(db, document_id)
+            document_deleter.schedule(db, vector_store, document_id)
+        except StatusConflict as e:
+            if e.status != DocumentStatus.DELETING.value:
+                _raise_status_conflict(e)
     
-    # Delete questions from Firestore
-    questions_query = db.collection("questions").where("document_id", "==", str(document_id))
-    for question_doc in questions_query.stream():
-        question_doc.reference.delete()
+    repo.forget(Document.collection_name(), document_id)
+    get_ownership_cache().invalidate(document_id)
+    await get_analytics_cache().invalidate_user(current_user["user_id"])
     
-    # Delete document
-    doc_ref.delete()
-    
-    return None
+    return DeleteResponse(
+        document_id=document_id,
+        status=DocumentStatus.DELETING,
+        message="Document deletion started.",
+    )
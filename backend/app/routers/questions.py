@@ -3,10 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 from uuid import UUID
 from datetime import datetime
-from app.database import get_firestore
+from app.container import get_llm_service
+from app.repository import Repository, get_repository
 from app.schemas import QuestionResponse, QuestionListResponse
 from app.routers.auth import get_current_user
-from app.models import Question, Document, QuestionType, Difficulty
+from app.models import Question, DocumentStatus, QuestionType, Difficulty
+from app.services.llm_service import LLMService
 from app.services.question_generator import QuestionGenerator
 
 router = APIRouter()
@@ -19,45 +21,36 @@ async def generate_questions(
     difficulty: Difficulty,
     num_questions: int = 5,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+    llm_service: LLMService = Depends(get_llm_service),
 ):
     """Generate questions for a document."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
     # Verify document belongs to user
-    doc_ref = db.collection(Document.collection_name()).document(str(document_id))
-    doc = doc_ref.get()
+    document = await repo.get_document(document_id)
     
-    if not doc.exists:
+    if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc_data = doc.to_dict()
-    if doc_data.get("user_id") != current_user["user_id"]:
+    if document.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    if doc_data.get("status") != "processed":
+    if document.status != DocumentStatus.PROCESSED:
         raise HTTPException(
             status_code=400,
-            detail=f"Document not ready. Status: {doc_data.get('status')}"
+            detail=f"Document not ready. Status: {document.status.value}"
         )
     
     # Check if document has chunks before generating questions
-    chunks_query = db.collection("chunks").where("document_id", "==", str(document_id))
-    chunks_docs = list(chunks_query.stream())
+    chunks = await repo.list_chunks(document_id)
     
-    if not chunks_docs:
+    if not chunks:
         raise HTTPException(
             status_code=400,
             detail="Document has no chunks. Please ensure the document was processed successfully and contains extractable text."
         )
     
     # Generate questions
-    generator = QuestionGenerator()
+    generator = QuestionGenerator(repo, llm_service)
     try:
         questions = await generator.generate_questions(
             document_id=str(document_id),
@@ -96,44 +89,27 @@ async def list_questions(
     skip: int = 0,
     limit: int = 20,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """List questions for a document."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
     # Verify document belongs to user
-    doc_ref = db.collection(Document.collection_name()).document(str(document_id))
-    doc = doc_ref.get()
+    owner = await repo.document_owner(document_id)
     
-    if not doc.exists:
+    if owner is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc_data = doc.to_dict()
-    if doc_data.get("user_id") != current_user["user_id"]:
+    if owner != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Get questions
-    questions_query = db.collection(Question.collection_name()).where(
-        "document_id", "==", str(document_id)
-    )
-    
-    all_questions = list(questions_query.stream())
+    all_questions = list(await repo.list_questions(document_id))
     # Sort by created_at (descending)
-    all_questions.sort(key=lambda q: q.to_dict().get("created_at", datetime.min), reverse=True)
+    all_questions.sort(key=lambda q: getattr(q, "created_at", None) or datetime.min, reverse=True)
     total = len(all_questions)
-    questions_docs = all_questions[skip:skip + limit]
     
     # Convert to response format
     question_responses = []
-    for q_doc in questions_docs:
-        q_data = q_doc.to_dict()
-        q_data["question_id"] = UUID(q_doc.id)
-        question = Question.from_dict(q_data)
+    for question in all_questions[skip:skip + limit]:
         question_responses.append(QuestionResponse(
             question_id=question.question_id,
             document_id=question.document_id,
@@ -157,31 +133,16 @@ async def list_questions(
 async def get_question(
     question_id: UUID,
     current_user: dict = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
 ):
     """Get a specific question."""
-    try:
-        db = get_firestore()
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database not initialized: {str(e)}"
-        )
-    
-    q_ref = db.collection(Question.collection_name()).document(str(question_id))
-    q_doc = q_ref.get()
+    question = await repo.get_question(question_id)
     
-    if not q_doc.exists:
+    if question is None:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    q_data = q_doc.to_dict()
-    q_data["question_id"] = UUID(q_doc.id)
-    question = Question.from_dict(q_data)
-    
     # Verify document belongs to user
-    doc_ref = db.collection(Document.collection_name()).document(str(question.document_id))
-    doc = doc_ref.get()
-    
-    if not doc.exists or doc.to_dict().get("user_id") != current_user["user_id"]:
+    if await repo.question_owner(question) != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
     return QuestionResponse(
@@ -22,7 +22,8 @@ class DocumentResponse(DocumentBase):
     """Schema for document response."""
     document_id: UUID
     user_id: str
-    extracted_text: str
+    extracted_text: str = ""  # Loaded from the text store on single-document reads
+    text_size: Optional[int] = None
     uploaded_at: datetime
     status: DocumentStatus
     
@@ -146,3 +147,10 @@ class UploadResponse(BaseModel):
     status: DocumentStatus
     message: str
 
+
+
+class DeleteResponse(BaseModel):
+    """Schema for an accepted document deletion."""
+    document_id: UUID
+    status: DocumentStatus
+    message: str
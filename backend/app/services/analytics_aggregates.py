@@ -0,0 +1,315 @@
+"""Incrementally maintained analytics aggregates.
+
+Each attempt updates one aggregate for the user and one for the
+(user, document) pair, so analytics can be served from a single read.
+
+Increments only add to what is already there, so an aggregate is served
+only once it is marked complete: written from every raw attempt by
+rebuild_aggregates or refresh_aggregate. Until then (attempts predating
+aggregates, or after a document's attempts were deleted) analytics are
+computed from raw attempts and the aggregate is refreshed from them.
+
+Aggregate layout:
+    {
+        "user_id": str, "document_id": str | None,
+        "total": int, "correct": int, "time_sum": float, "time_count": int,
+        "difficulty": {"easy": {"total", "correct", "time_sum", "time_count"}, ...},
+        "daily": {"2024-01-31": {"total", "correct"}, ...},
+        "complete": bool,
+        "updated_at": datetime,
+    }
+"""
+from typing import Any, Dict, Iterable, Optional
+from datetime import datetime, timedelta, timezone
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from app.models import Attempt, Question, Difficulty
+from app.schemas import PerformanceAnalytics, TopicAccuracy, DifficultyStats
+
+AGGREGATES_COLLECTION = "analytics_aggregates"
+PROGRESS_DAYS = 30
+EMPTY_COUNTERS = {
+    "total": 0,
+    "correct": 0,
+    "time_sum": 0.0,
+    "time_count": 0,
+    "difficulty": {},
+    "daily": {},
+}
+
+
+def aggregate_id(user_id: str, document_id: Optional[Any] = None) -> str:
+    """Firestore document ID of a user or (user, document) aggregate."""
+    if document_id:
+        return f"{user_id}__{document_id}"
+    return user_id
+
+
+def _attempt_day(attempted_at: Optional[datetime]) -> Optional[str]:
+    """UTC date bucket for an attempt."""
+    if not isinstance(attempted_at, datetime):
+        return None
+    if attempted_at.tzinfo is not None:
+        attempted_at = attempted_at.astimezone(timezone.utc)
+    return attempted_at.date().isoformat()
+
+
+def attempt_delta(attempt: Attempt, difficulty: Optional[Difficulty]) -> Dict[str, Any]:
+    """Counter contributions of a single attempt.
+
+    ``difficulty`` is None when the attempt's question no longer exists; the
+    attempt still counts, but not towards any difficulty (or topic).
+    """
+    correct = 1 if attempt.is_correct else 0
+    # Matches the analytics semantics: only non-zero times are averaged
+    time_sum = float(attempt.time_taken) if attempt.time_taken else 0.0
+    time_count = 1 if attempt.time_taken else 0
+    delta = {
+        "total": 1,
+        "correct": correct,
+        "time_sum": time_sum,
+        "time_count": time_count,
+        "difficulty": {},
+        "daily": {},
+    }
+    if difficulty is not None:
+        delta["difficulty"][difficulty.value] = {
+            "total": 1,
+            "correct": correct,
+            "time_sum": time_sum,
+            "time_count": time_count,
+        }
+    day = _attempt_day(attempt.attempted_at)
+    if day:
+        delta["daily"][day] = {"total": 1, "correct": correct}
+    return delta
+
+
+def _merge_delta(target: Dict[str, Any], delta: Dict[str, Any]) -> None:
+    """Add a delta into an in-memory aggregate."""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            _merge_delta(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+def _as_increments(delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a delta into Firestore Increment transforms."""
+    return {
+        key: _as_increments(value) if isinstance(value, dict) else firestore.Increment(value)
+        for key, value in delta.items()
+    }
+
+
+def record_attempt(batch, db, attempt: Attempt, question: Question) -> None:
+    """Add the aggregate updates for an attempt to a write batch.
+
+    The batch should also contain the attempt write so the attempt and both
+    aggregates are committed atomically.
+    """
+    increments = _as_increments(attempt_delta(attempt, question.difficulty))
+    collection = db.collection(AGGREGATES_COLLECTION)
+    for document_id in (None, question.document_id):
+        batch.set(
+            collection.document(aggregate_id(attempt.user_id, document_id)),
+            {
+                **increments,
+                "user_id": attempt.user_id,
+                "document_id": str(document_id) if document_id else None,
+                "updated_at": datetime.utcnow(),
+            },
+            merge=True,
+        )
+
+
+async def invalidate_aggregate(db, user_id: str, document_id: Optional[Any] = None) -> None:
+    """Mark a user or (user, document) aggregate incomplete after its attempts changed.
+
+    Adjusting the counters instead would miss attempts an incomplete
+    aggregate never counted; the next read rebuilds it from the attempts
+    that are there now. Any refresh already in flight fails its precondition.
+    """
+    try:
+        await db.collection(AGGREGATES_COLLECTION).document(aggregate_id(user_id, document_id)).update({
+            "complete": False,
+            "updated_at": datetime.utcnow(),
+        })
+    except NotFound:
+        pass
+
+
+def analytics_from_aggregate(data: Dict[str, Any]) -> PerformanceAnalytics:
+    """Build the analytics response from an aggregate document."""
+    total = int(data.get("total", 0))
+    if total == 0:
+        return PerformanceAnalytics(
+            total_attempts=0,
+            overall_accuracy=0.0,
+            topic_accuracy=[],
+            difficulty_stats=[],
+            weak_areas=[],
+            avg_time_per_question=None,
+            progress_over_time=[],
+        )
+    correct = int(data.get("correct", 0))
+
+    difficulty_stats_list = []
+    difficulty_map = data.get("difficulty", {})
+    for difficulty in Difficulty:
+        stats = difficulty_map.get(difficulty.value)
+        if not stats or not stats.get("total"):
+            continue
+        time_count = stats.get("time_count", 0)
+        difficulty_stats_list.append(DifficultyStats(
+            difficulty=difficulty,
+            total_questions=int(stats["total"]),
+            correct_answers=int(stats.get("correct", 0)),
+            accuracy=stats.get("correct", 0) / stats["total"],
+            avg_time=stats.get("time_sum", 0.0) / time_count if time_count else None,
+        ))
+
+    # Topics are not tracked yet, so every attempt whose question is known
+    # (counted under a difficulty) counts towards "General"
+    known_total = sum(stats.total_questions for stats in difficulty_stats_list)
+    known_correct = sum(stats.correct_answers for stats in difficulty_stats_list)
+    topic_accuracy_list = [TopicAccuracy(
+        topic="General",
+        total_questions=known_total,
+        correct_answers=known_correct,
+        accuracy=known_correct / known_total if known_total else 0.0,
+    )]
+    weak_areas = [
+        ta.topic for ta in topic_accuracy_list
+        if ta.accuracy < 0.6 and ta.total_questions >= 3
+    ]
+
+    time_count = data.get("time_count", 0)
+    avg_time_per_question = data.get("time_sum", 0.0) / time_count if time_count else None
+
+    start_day = (datetime.now(timezone.utc) - timedelta(days=PROGRESS_DAYS)).date().isoformat()
+    progress_data = []
+    for day, stats in sorted(data.get("daily", {}).items()):
+        if day < start_day or not stats.get("total"):
+            continue
+        progress_data.append({
+            "date": day,
+            "accuracy": stats.get("correct", 0) / stats["total"],
+        })
+
+    return PerformanceAnalytics(
+        total_attempts=total,
+        overall_accuracy=correct / total,
+        topic_accuracy=topic_accuracy_list,
+        difficulty_stats=difficulty_stats_list,
+        weak_areas=weak_areas,
+        avg_time_per_question=avg_time_per_question,
+        progress_over_time=progress_data,
+    )
+
+
+def build_aggregates(attempts: Iterable[Attempt], questions: Dict[str, Question]) -> Dict[str, Dict[str, Any]]:
+    """Compute aggregates from raw attempts, keyed by aggregate ID.
+
+    Attempts whose question was deleted are counted like compute_analytics
+    counts them: in the totals, under the document_id they carry, but not
+    under any difficulty.
+    """
+    aggregates: Dict[str, Dict[str, Any]] = {}
+    for attempt in attempts:
+        question = questions.get(str(attempt.question_id))
+        if question:
+            delta = attempt_delta(attempt, question.difficulty)
+            attempt_document_id = question.document_id
+        else:
+            delta = attempt_delta(attempt, None)
+            attempt_document_id = attempt.document_id
+        for document_id in (None, attempt_document_id):
+            agg_id = aggregate_id(attempt.user_id, document_id)
+            if agg_id not in aggregates:
+                aggregates[agg_id] = {
+                    "user_id": attempt.user_id,
+                    "document_id": str(document_id) if document_id else None,
+                }
+            _merge_delta(aggregates[agg_id], delta)
+    return aggregates
+
+
+async def rebuild_aggregates(db, user_id: Optional[str] = None) -> int:
+    """Recompute aggregates from raw attempts.
+
+    Rebuilds every user's aggregates, or only those of ``user_id``.
+    Returns the number of aggregate documents written.
+    """
+    attempts_query = db.collection(Attempt.collection_name())
+    aggregates_query = db.collection(AGGREGATES_COLLECTION)
+    if user_id:
+        attempts_query = attempts_query.where("user_id", "==", user_id)
+        aggregates_query = aggregates_query.where("user_id", "==", user_id)
+
+    attempts = []
+    async for attempt_doc in attempts_query.stream():
+        attempt_data = attempt_doc.to_dict()
+        attempt_data["attempt_id"] = attempt_doc.id
+        attempts.append(Attempt.from_dict(attempt_data))
+
+    questions = {}
+    for q_id in {str(a.question_id) for a in attempts if a.question_id}:
+        q_doc = await db.collection(Question.collection_name()).document(q_id).get()
+        if q_doc.exists:
+            q_data = q_doc.to_dict()
+            q_data["question_id"] = q_doc.id
+            questions[q_id] = Question.from_dict(q_data)
+
+    aggregates = build_aggregates(attempts, questions)
+
+    # Remove stale aggregates (e.g. for deleted documents) before rewriting
+    async for agg_doc in aggregates_query.stream():
+        if agg_doc.id not in aggregates:
+            await agg_doc.reference.delete()
+
+    now = datetime.utcnow()
+    for agg_id, data in aggregates.items():
+        data["complete"] = True
+        data["updated_at"] = now
+        await db.collection(AGGREGATES_COLLECTION).document(agg_id).set(data)
+
+    return len(aggregates)
+
+
+async def refresh_aggregate(
+    db,
+    user_id: str,
+    document_id: Optional[Any],
+    snapshot,
+    attempt_records: Iterable[Dict[str, Any]],
+    question_records: Dict[str, Dict[str, Any]],
+) -> bool:
+    """Rewrite one aggregate from raw attempts and mark it complete.
+
+    ``snapshot`` is the aggregate as read before the attempts were, so the
+    write is skipped (returning False) when an attempt was recorded or the
+    aggregate invalidated in between; the next read refreshes it instead.
+    """
+    questions = {
+        q_id: Question.from_dict({**data, "question_id": q_id})
+        for q_id, data in question_records.items()
+    }
+    agg_id = aggregate_id(user_id, document_id)
+    data = {
+        **EMPTY_COUNTERS,
+        **build_aggregates(map(Attempt.from_dict, attempt_records), questions).get(agg_id, {}),
+        "user_id": user_id,
+        "document_id": str(document_id) if document_id else None,
+        "complete": True,
+        "updated_at": datetime.utcnow(),
+    }
+    reference = db.collection(AGGREGATES_COLLECTION).document(agg_id)
+    try:
+        if snapshot.exists:
+            await reference.update(data, option=db.write_option(last_update_time=snapshot.update_time))
+        else:
+            await reference.create(data)
+    except (AlreadyExists, FailedPrecondition):
+        return False
+    return True
@@ -0,0 +1,190 @@
+"""Analytics response cache.
+
+Entries are keyed by (user, document, version). Each user has a version
+token that is replaced whenever their attempts or documents change, which
+invalidates all of that user's cached analytics at once. The version is
+read once per lookup and a miss is stored under that same version, so a
+result computed while the user's data changed is never cached under the
+newer version. Entries also expire after a TTL so a missed invalidation
+is bounded; version tokens expire after the same TTL, so users who stop
+using the app leave nothing behind (a user whose version expired simply
+gets a fresh one, which no cached entry is stored under).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from uuid import uuid4
+from app.config import settings
+from app.schemas import PerformanceAnalytics
+
+
+class CacheBackend:
+    """Key/value store used by the analytics cache (async, so a remote store never blocks the event loop)."""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU (per worker)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis store shared by all workers."""
+
+    def __init__(self, url: str):
+        import redis.asyncio
+        self.client = redis.asyncio.Redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        await self.client.set(key, value, ex=ttl or None)
+
+
+class AnalyticsCache:
+    """Cache of PerformanceAnalytics per (user, document)."""
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _version_key(user_id: str) -> str:
+        return f"analytics:version:{user_id}"
+
+    async def _version(self, user_id: str) -> str:
+        version = await self.backend.get(self._version_key(user_id))
+        if version is None:
+            # A fresh random token (not a counter) so an evicted or expired
+            # version can never collide with entries cached under an older one
+            version = uuid4().hex
+            await self.backend.set(self._version_key(user_id), version, ttl=self.ttl)
+        return version
+
+    @staticmethod
+    def _entry_key(user_id: str, document_id: Optional[Any], version: str) -> str:
+        return f"analytics:{user_id}:{document_id or 'all'}:{version}"
+
+    async def get(
+        self, user_id: str, document_id: Optional[Any] = None
+    ) -> Tuple[Optional[PerformanceAnalytics], Optional[str]]:
+        """Get cached analytics (None on a miss) and the version to store a miss under.
+
+        The version is None if it could not be read; set() then skips caching.
+        """
+        version = None
+        try:
+            version = await self._version(user_id)
+            value = await self.backend.get(self._entry_key(user_id, document_id, version))
+            if value is None:
+                return None, version
+            return PerformanceAnalytics.model_validate_json(value), version
+        except Exception as e:
+            print(f"Analytics cache read error: {e}")
+            return None, version
+
+    async def set(
+        self,
+        user_id: str,
+        document_id: Optional[Any],
+        analytics: PerformanceAnalytics,
+        version: Optional[str],
+    ) -> None:
+        """Cache analytics under the version returned by the get() that missed."""
+        if version is None:
+            return
+        try:
+            await self.backend.set(
+                self._entry_key(user_id, document_id, version),
+                analytics.model_dump_json(),
+                ttl=self.ttl,
+            )
+        except Exception as e:
+            print(f"Analytics cache write error: {e}")
+
+    async def invalidate_user(self, user_id: str) -> None:
+        """Invalidate all cached analytics of a user."""
+        try:
+            await self.backend.set(self._version_key(user_id), uuid4().hex, ttl=self.ttl)
+        except Exception as e:
+            print(f"Analytics cache invalidation error: {e}")
+
+
+class NullAnalyticsCache(AnalyticsCache):
+    """Cache that never stores anything (caching disabled)."""
+
+    def __init__(self):
+        pass
+
+    async def get(
+        self, user_id: str, document_id: Optional[Any] = None
+    ) -> Tuple[Optional[PerformanceAnalytics], Optional[str]]:
+        return None, None
+
+    async def set(
+        self,
+        user_id: str,
+        document_id: Optional[Any],
+        analytics: PerformanceAnalytics,
+        version: Optional[str],
+    ) -> None:
+        pass
+
+    async def invalidate_user(self, user_id: str) -> None:
+        pass
+
+
+_analytics_cache: Optional[AnalyticsCache] = None
+
+
+def get_analytics_cache() -> AnalyticsCache:
+    """Get the configured analytics cache (created once per process)."""
+    global _analytics_cache
+    if _analytics_cache is None:
+        backend = settings.ANALYTICS_CACHE_BACKEND
+        if backend == "memory":
+            _analytics_cache = AnalyticsCache(
+                MemoryCacheBackend(settings.ANALYTICS_CACHE_MAX_ENTRIES),
+                ttl=settings.ANALYTICS_CACHE_TTL,
+            )
+        elif backend == "redis":
+            _analytics_cache = AnalyticsCache(
+                RedisCacheBackend(settings.REDIS_URL),
+                ttl=settings.ANALYTICS_CACHE_TTL,
+            )
+        elif backend == "none":
+            _analytics_cache = NullAnalyticsCache()
+        else:
+            raise ValueError(f"Unknown analytics cache backend: {backend}. Supported: 'memory', 'redis', 'none'")
+    return _analytics_cache
@@ -0,0 +1,200 @@
+"""Vectorized analytics over columnar attempt arrays."""
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+from app.models import Difficulty
+from app.schemas import PerformanceAnalytics, TopicAccuracy, DifficultyStats
+
+DIFFICULTIES: List[Difficulty] = list(Difficulty)
+DIFFICULTY_CODES = {d.value: code for code, d in enumerate(DIFFICULTIES)}
+NO_DAY = np.iinfo(np.int32).min
+PROGRESS_DAYS = 30
+
+_EPOCH_DATE = date(1970, 1, 1)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_EPOCH_AWARE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _epoch_day(value: Any) -> int:
+    """Days since the Unix epoch (UTC) for a datetime or Firestore Timestamp."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            # Timezone-naive values are stored as UTC
+            return (value - _EPOCH_NAIVE).days
+        return (value - _EPOCH_AWARE).days
+    seconds = getattr(value, "seconds", None)
+    if seconds is not None:
+        return int(seconds // 86400)
+    return NO_DAY
+
+
+class AttemptColumns:
+    """Attempts stored as parallel NumPy arrays.
+
+    Columns:
+        is_correct: bool
+        score: float64 (NaN when missing)
+        time_taken: float64 (0 when missing)
+        epoch_day: int32 (NO_DAY when missing)
+        difficulty: int8 index into DIFFICULTIES (-1 when the question is unknown)
+        document: int32 index into document_ids (-1 when the question is unknown)
+    """
+
+    __slots__ = ("is_correct", "score", "time_taken", "epoch_day", "difficulty", "document", "document_ids")
+
+    def __init__(
+        self,
+        is_correct: np.ndarray,
+        score: np.ndarray,
+        time_taken: np.ndarray,
+        epoch_day: np.ndarray,
+        difficulty: np.ndarray,
+        document: np.ndarray,
+        document_ids: List[str],
+    ):
+        self.is_correct = is_correct
+        self.score = score
+        self.time_taken = time_taken
+        self.epoch_day = epoch_day
+        self.difficulty = difficulty
+        self.document = document
+        self.document_ids = document_ids
+
+    def __len__(self) -> int:
+        return len(self.is_correct)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Dict[str, Any]],
+        questions: Dict[str, Dict[str, Any]],
+    ) -> "AttemptColumns":
+        """Build columns from raw Firestore attempt dicts.
+
+        ``questions`` maps question_id to its raw Firestore dict (only
+        ``difficulty`` and ``document_id`` are read).
+        """
+        # Resolve each question to (difficulty code, document code) once
+        document_codes: Dict[str, int] = {}
+        question_codes: Dict[str, tuple] = {}
+        for q_id, q_data in questions.items():
+            doc_id = str(q_data.get("document_id", ""))
+            if doc_id not in document_codes:
+                document_codes[doc_id] = len(document_codes)
+            question_codes[q_id] = (
+                DIFFICULTY_CODES.get(q_data.get("difficulty"), -1),
+                document_codes[doc_id],
+            )
+        unknown = (-1, -1)
+
+        is_correct = []
+        score = []
+        time_taken = []
+        epoch_day = []
+        difficulty = []
+        document = []
+        for data in records:
+            is_correct.append(bool(data.get("is_correct")))
+            value = data.get("score")
+            score.append(np.nan if value is None else value)
+            time_taken.append(data.get("time_taken") or 0.0)
+            epoch_day.append(_epoch_day(data.get("attempted_at")))
+            d_code, doc_code = question_codes.get(str(data.get("question_id")), unknown)
+            difficulty.append(d_code)
+            document.append(doc_code)
+
+        return cls(
+            is_correct=np.array(is_correct, dtype=bool),
+            score=np.array(score, dtype=np.float64),
+            time_taken=np.array(time_taken, dtype=np.float64),
+            epoch_day=np.array(epoch_day, dtype=np.int32),
+            difficulty=np.array(difficulty, dtype=np.int8),
+            document=np.array(document, dtype=np.int32),
+            document_ids=list(document_codes),
+        )
+
+
+def compute_analytics(columns: AttemptColumns, today: Optional[int] = None) -> PerformanceAnalytics:
+    """Compute performance analytics from attempt columns.
+
+    ``today`` is the current epoch day (UTC); defaults to now.
+    """
+    total = len(columns)
+    if total == 0:
+        return PerformanceAnalytics(
+            total_attempts=0,
+            overall_accuracy=0.0,
+            topic_accuracy=[],
+            difficulty_stats=[],
+            weak_areas=[],
+            avg_time_per_question=None,
+            progress_over_time=[],
+        )
+
+    correct = columns.is_correct
+    times = columns.time_taken
+    timed = times != 0
+    total_correct = int(np.count_nonzero(correct))
+
+    # Per-difficulty counters (attempts whose question is known)
+    known = columns.difficulty >= 0
+    codes = columns.difficulty[known].astype(np.intp)
+    n_codes = len(DIFFICULTIES)
+    d_total = np.bincount(codes, minlength=n_codes)
+    d_correct = np.bincount(codes, weights=correct[known], minlength=n_codes)
+    d_time = np.bincount(codes, weights=times[known], minlength=n_codes)
+    d_timed = np.bincount(codes, weights=timed[known], minlength=n_codes)
+
+    difficulty_stats_list = []
+    for code, difficulty in enumerate(DIFFICULTIES):
+        if not d_total[code]:
+            continue
+        difficulty_stats_list.append(DifficultyStats(
+            difficulty=difficulty,
+            total_questions=int(d_total[code]),
+            correct_answers=int(d_correct[code]),
+            accuracy=float(d_correct[code] / d_total[code]),
+            avg_time=float(d_time[code] / d_timed[code]) if d_timed[code] else None,
+        ))
+
+    # Topics are not tracked yet, so every known attempt counts towards "General"
+    known_total = int(codes.size)
+    known_correct = int(d_correct.sum())
+    topic_accuracy_list = [TopicAccuracy(
+        topic="General",
+        total_questions=known_total,
+        correct_answers=known_correct,
+        accuracy=known_correct / known_total if known_total else 0.0,
+    )]
+    weak_areas = [
+        ta.topic for ta in topic_accuracy_list
+        if ta.accuracy < 0.6 and ta.total_questions >= 3
+    ]
+
+    timed_count = int(np.count_nonzero(timed))
+    avg_time_per_question = float(times[timed].sum() / timed_count) if timed_count else None
+
+    # Progress over the last 30 days, bucketed by UTC day
+    if today is None:
+        today = (datetime.now(timezone.utc).date() - _EPOCH_DATE).days
+    recent = columns.epoch_day >= today - PROGRESS_DAYS
+    days, inverse = np.unique(columns.epoch_day[recent], return_inverse=True)
+    day_total = np.bincount(inverse, minlength=len(days))
+    day_correct = np.bincount(inverse, weights=correct[recent], minlength=len(days))
+    progress_data = [
+        {
+            "date": (_EPOCH_DATE + timedelta(days=int(day))).isoformat(),
+            "accuracy": float(day_correct[i] / day_total[i]),
+        }
+        for i, day in enumerate(days)
+    ]
+
+    return PerformanceAnalytics(
+        total_attempts=total,
+        overall_accuracy=total_correct / total,
+        topic_accuracy=topic_accuracy_list,
+        difficulty_stats=difficulty_stats_list,
+        weak_areas=weak_areas,
+        avg_time_per_question=avg_time_per_question,
+        progress_over_time=progress_data,
+    )
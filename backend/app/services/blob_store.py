@@ -0,0 +1,116 @@
+"""Blob storage backends for large document payloads."""
+import os
+from typing import Optional
+from app.config import settings
+
+
+class BlobStore:
+    """Minimal key/value blob storage interface."""
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a blob under key, replacing any existing blob."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        """Read a whole blob."""
+        raise NotImplementedError
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        """Read bytes [start, end) of a blob."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Delete a blob (missing blobs are ignored)."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Blob storage on the local filesystem."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or settings.TEXT_STORAGE_PATH)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial blob
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class CloudBlobStore(BlobStore):
+    """Blob storage in the Firebase Cloud Storage bucket."""
+
+    def __init__(self, bucket_name: Optional[str] = None):
+        from firebase_admin import storage
+        from app.database import initialize_firebase
+
+        initialize_firebase()
+        self.bucket = storage.bucket(bucket_name or settings.TEXT_STORAGE_BUCKET or None)
+        self.prefix = settings.TEXT_STORAGE_PREFIX.strip("/")
+
+    def _blob(self, key: str):
+        name = f"{self.prefix}/{key}" if self.prefix else key
+        return self.bucket.blob(name)
+
+    def put(self, key: str, data: bytes) -> None:
+        self._blob(key).upload_from_string(data, content_type="application/octet-stream")
+
+    def get(self, key: str) -> bytes:
+        return self._blob(key).download_as_bytes()
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        # Cloud Storage ranges are inclusive of the end byte
+        return self._blob(key).download_as_bytes(start=start, end=end - 1)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._blob(key).delete()
+        except Exception as e:
+            if "404" not in str(e) and "not found" not in str(e).lower():
+                raise
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Get the configured blob store (created once per process)."""
+    global _blob_store
+    if _blob_store is None:
+        backend = settings.TEXT_STORAGE_BACKEND
+        if backend == "local":
+            _blob_store = LocalBlobStore()
+        elif backend == "cloud":
+            _blob_store = CloudBlobStore()
+        else:
+            raise ValueError(f"Unknown text storage backend: {backend}. Supported: 'local', 'cloud'")
+    return _blob_store
@@ -0,0 +1,279 @@
+"""Background deletion of documents and everything derived from them.
+
+DELETE /documents/{id} only marks the document ``deleting`` (refused while
+an upload or replacement is processing it, see document_status); a
+DeletionJob then removes, in order:
+
+1. the document's vectors
+2. its chunks
+3. attempts on its questions, then marks the user aggregates of their
+   authors incomplete (see analytics_aggregates)
+4. its questions
+5. the per-document aggregate, the extracted text and the ingest
+   artifacts of its content if no other document has that content
+6. the document record
+
+Each step deletes whatever is still there, so a job can always be rerun
+from the start.
+
+Progress is kept on the document record under ``deletion``:
+    {"stage", "chunks", "attempts", "questions", "started_at",
+     "heartbeat", "worker"}
+
+A job holds a lease: the worker that owns it updates ``heartbeat`` after
+every page of deletes and stops if another worker has taken over. Each
+worker periodically resumes deletions whose heartbeat is older than
+DELETION_LEASE_SECONDS, e.g. after a crash or a restart.
+"""
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+from firebase_admin import firestore
+from app.config import settings
+from app.models import Attempt, Chunk, Document, DocumentStatus, Question
+from app.services.analytics_aggregates import AGGREGATES_COLLECTION, aggregate_id, invalidate_aggregate
+from app.services.analytics_cache import get_analytics_cache
+from app.services.document_status import is_idle, transition
+from app.services.ingest_artifacts import IngestArtifactStore
+from app.services.maintenance import BATCH_SIZE
+from app.services.ownership_cache import get_ownership_cache
+from app.services.text_store import get_text_store
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+# Firestore accepts at most 30 values in an "in" filter
+IN_FILTER_LIMIT = 30
+
+
+class LeaseLost(Exception):
+    """Another worker took over the deletion, or the document is gone."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_expired(deletion: Dict[str, Any]) -> bool:
+    heartbeat = deletion.get("heartbeat")
+    if not isinstance(heartbeat, datetime):
+        return True
+    if heartbeat.tzinfo is None:
+        heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+    return heartbeat < _now() - timedelta(seconds=settings.DELETION_LEASE_SECONDS)
+
+
+async def mark_deleting(db, document_id: Any) -> None:
+    """Mark a document for deletion, with this worker holding the job's lease.
+
+    Raises StatusConflict if the document is being processed (its upload or
+    replacement would write after the job swept), already being deleted, or gone.
+    """
+    now = _now()
+    await transition(db, document_id, is_idle, {
+        "status": DocumentStatus.DELETING.value,
+        "deletion": {
+            "stage": "pending",
+            "chunks": 0,
+            "attempts": 0,
+            "questions": 0,
+            "started_at": now,
+            "heartbeat": now,
+            "worker": WORKER_ID,
+        },
+    })
+
+
+class DeletionJob:
+    """Delete one document and its chunks, questions, attempts and vectors."""
+
+    def __init__(self, db, vector_store, document_id: str):
+        self.db = db
+        self.vector_store = vector_store
+        self.document_id = str(document_id)
+        self.doc_ref = db.collection(Document.collection_name()).document(self.document_id)
+        self._commit_slots = asyncio.Semaphore(settings.DELETION_CONCURRENCY)
+
+    async def _checkpoint(self, **fields: Any) -> Dict[str, Any]:
+        """Renew the lease and record progress; returns the document data."""
+        snapshot = await self.doc_ref.get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        if not data or data.get("status") != DocumentStatus.DELETING.value:
+            raise LeaseLost(f"document {self.document_id} is no longer being deleted")
+        if (data.get("deletion") or {}).get("worker") != WORKER_ID:
+            raise LeaseLost(f"deletion of document {self.document_id} was taken over")
+        updates = {f"deletion.{key}": value for key, value in fields.items()}
+        updates["deletion.heartbeat"] = _now()
+        await self.doc_ref.update(updates)
+        return data
+
+    async def _commit(self, snapshots: List[Any], before_commit=None) -> None:
+        async with self._commit_slots:
+            batch = self.db.batch()
+            for snapshot in snapshots:
+                batch.delete(snapshot.reference)
+            if before_commit is not None:
+                before_commit(batch, snapshots)
+            await batch.commit()
+
+    async def _sweep(self, query, counter: str, before_commit=None, batch_size: int = BATCH_SIZE) -> int:
+        """Delete everything ``query`` matches, a page of parallel batches at a time."""
+        page_size = batch_size * settings.DELETION_CONCURRENCY
+        deleted = 0
+        while True:
+            snapshots = await query.limit(page_size).get()
+            if not snapshots:
+                return deleted
+            await asyncio.gather(*(
+                self._commit(snapshots[i:i + batch_size], before_commit)
+                for i in range(0, len(snapshots), batch_size)
+            ))
+            deleted += len(snapshots)
+            await self._checkpoint(**{counter: firestore.Increment(len(snapshots))})
+
+    async def _question_ids(self) -> List[str]:
+        query = self.db.collection(Question.collection_name()).where("document_id", "==", self.document_id)
+        return [snapshot.id async for snapshot in query.select(["document_id"]).stream()]
+
+    async def _delete_attempts(self, user_id: Optional[str]) -> None:
+        question_ids = await self._question_ids()
+        # The owner's aggregate is always invalidated, even on a rerun that finds no attempts left
+        users = {user_id} if user_id else set()
+
+        def collect_users(batch, snapshots) -> None:
+            users.update(snapshot.to_dict().get("user_id") for snapshot in snapshots)
+
+        attempts = self.db.collection(Attempt.collection_name()).select(["user_id"])
+        await self._sweep(
+            attempts.where("document_id", "==", self.document_id), "attempts", collect_users
+        )
+        # Attempts written before document_id was denormalized onto them
+        for i in range(0, len(question_ids), IN_FILTER_LIMIT):
+            await self._sweep(
+                attempts.where("question_id", "in", question_ids[i:i + IN_FILTER_LIMIT]),
+                "attempts",
+                collect_users,
+            )
+        for author in users - {None}:
+            await invalidate_aggregate(self.db, author)
+
+    async def run(self) -> None:
+        data = await self._checkpoint(stage="vectors")
+        user_id = data.get("user_id")
+        await self.vector_store.delete_document(UUID(self.document_id))
+
+        await self._checkpoint(stage="chunks")
+        # Only the references are needed, not the chunk text
+        chunks = self.db.collection(Chunk.collection_name()).where("document_id", "==", self.document_id)
+        await self._sweep(chunks.select(["document_id"]), "chunks")
+
+        await self._checkpoint(stage="attempts")
+        await self._delete_attempts(user_id)
+
+        await self._checkpoint(stage="questions")
+        questions = self.db.collection(Question.collection_name()).where("document_id", "==", self.document_id)
+        await self._sweep(questions.select(["document_id"]), "questions")
+
+        await self._checkpoint(stage="text")
+        if user_id:
+            await self.db.collection(AGGREGATES_COLLECTION).document(
+                aggregate_id(user_id, self.document_id)
+            ).delete()
+        if data.get("text_ref"):
+            await asyncio.to_thread(get_text_store().delete, data["text_ref"])
+        if data.get("content_sha256") and user_id:
+            await IngestArtifactStore(self.db).release(data["content_sha256"], user_id, self.document_id)
+
+        await self._checkpoint(stage="document")
+        await self.doc_ref.delete()
+        get_ownership_cache().invalidate(self.document_id)
+        if user_id:
+            await get_analytics_cache().invalidate_user(user_id)
+
+
+class DocumentDeleter:
+    """Runs deletion jobs on the event loop and resumes abandoned ones."""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, db, vector_store, document_id: Any) -> None:
+        """Start deleting a document this worker holds the lease for (no-op if already running)."""
+        key = str(document_id)
+        if key in self._jobs:
+            return
+        task = asyncio.get_running_loop().create_task(self._run_job(DeletionJob(db, vector_store, key)))
+        self._jobs[key] = task
+
+    async def _run_job(self, job: DeletionJob) -> None:
+        try:
+            await job.run()
+            print(f"Deleted document {job.document_id}")
+        except LeaseLost as e:
+            print(f"Stopped deleting document {job.document_id}: {e}")
+        except Exception as e:
+            # The lease expires and the deletion is resumed by the next scan
+            print(f"Deletion of document {job.document_id} failed: {e}")
+        finally:
+            self._jobs.pop(job.document_id, None)
+
+    async def claim(self, db, document_id: Any) -> bool:
+        """Take over a deletion whose lease has expired."""
+        doc_ref = db.collection(Document.collection_name()).document(str(document_id))
+        snapshot = await doc_ref.get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        if not data or data.get("status") != DocumentStatus.DELETING.value:
+            return False
+        deletion = data.get("deletion") or {}
+        if deletion.get("worker") == WORKER_ID:
+            return True
+        if not _lease_expired(deletion):
+            return False
+        await doc_ref.update({"deletion.worker": WORKER_ID, "deletion.heartbeat": _now()})
+        # Two workers can claim at once; the last write wins and the other backs off
+        await asyncio.sleep(1)
+        snapshot = await doc_ref.get()
+        return snapshot.exists and (snapshot.to_dict().get("deletion") or {}).get("worker") == WORKER_ID
+
+    async def resume(self, db, vector_store) -> int:
+        """Schedule every deletion whose lease has expired; returns how many were resumed."""
+        query = db.collection(Document.collection_name()).where("status", "==", DocumentStatus.DELETING.value)
+        resumed = 0
+        for snapshot in await query.get():
+            if snapshot.id in self._jobs:
+                continue
+            if await self.claim(db, snapshot.id):
+                self.schedule(db, vector_store, snapshot.id)
+                resumed += 1
+        return resumed
+
+    def start(self, db, vector_store) -> None:
+        """Resume abandoned deletions now and every ``interval`` seconds."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(db, vector_store))
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, *self._jobs.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        # Interrupted jobs are resumed by any worker once their lease expires
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._jobs.clear()
+
+    async def _run(self, db, vector_store) -> None:
+        while True:
+            try:
+                resumed = await self.resume(db, vector_store)
+                if resumed:
+                    print(f"Resumed {resumed} document deletion(s)")
+            except Exception as e:
+                print(f"Resuming document deletions failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+document_deleter = DocumentDeleter(settings.DELETION_LEASE_SECONDS)
@@ -1,103 +1,452 @@
 """Document processing service."""
-import io
-from typing import Dict, Any, Optional
-from PyPDF2 import PdfReader
-from docx import Document as DocxDocument
-from PIL import Image
+import hashlib
+import importlib.util
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from app.services.text_chunker import TextChunker
 from app.services.vector_store import VectorStore
 from app.services.embedding_service import EmbeddingService
+from app.services.extractors import DOCX, IMAGE_TYPES, PDF, TEXT, detect_mime_type, extract_pdf_pages
+from app.services.ingest_artifacts import IngestArtifacts, IngestArtifactStore, content_hash, pipeline_fingerprint
+from app.services.maintenance import BATCH_SIZE
 from app.database import get_firestore
 from app.models import Chunk
 from app.config import settings
+from app.tracing import current_span, span
+from app.uploads import Content, content_size, content_stream, content_view
 
-# Try to import EasyOCR, fallback to None if not available
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
+# Extraction libraries (PyPDF2, python-docx, Pillow, EasyOCR and through it
+# torch) are imported on first use, so workers that never see a given file
+# type never pay for loading it. EasyOCR is only checked for here.
+EASYOCR_AVAILABLE = importlib.util.find_spec("easyocr") is not None
+if not EASYOCR_AVAILABLE:
     print("Warning: EasyOCR not installed. Image OCR will not work. Install with: pip install easyocr")
 
 
+# WordprocessingML elements read by the streaming DOCX extractor
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_BODY, W_P = W + "body", W + "p"
+W_TEXT = {W + "t": None, W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+W_BR, W_BR_TYPE = W + "br", W + "type"
+# Drawings repeat their text boxes in a fallback for older readers
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+
+def _paragraph_text(paragraph) -> str:
+    """Text of a w:p element, as python-docx's ``Paragraph.text`` gives it."""
+    parts = []
+    for node in paragraph.iter():
+        tag = node.tag
+        if tag in W_TEXT:
+            parts.append(W_TEXT[tag] or node.text or "")
+        elif tag == W_BR and node.get(W_BR_TYPE, "textWrapping") == "textWrapping":
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _line_pieces(lines: Iterable[str], kept: List[str]) -> Iterator[str]:
+    """Cleaned lines as chunker pieces, each ending at its line break; the lines are added to ``kept``."""
+    previous = None
+    for line in lines:
+        if previous is not None:
+            yield previous + "\n"
+        kept.append(line)
+        previous = line
+    if previous is not None:
+        yield previous
+
+
+def chunk_hash(text: str) -> str:
+    """sha256 of a chunk's text, used to match chunks across versions of a document."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def create_ocr_reader():
+    """Build an EasyOCR reader (loads, and on first use downloads, the models)."""
+    # Use English by default, can be extended to support other languages
+    # gpu=False to work on systems without GPU
+    # verbose=False to reduce output noise
+    import easyocr
+    return easyocr.Reader(['en'], gpu=False, verbose=False)
+
+
 class DocumentProcessor:
     """Process uploaded documents."""
     
-    def __init__(self):
-        self.chunker = TextChunker()
-        self.vector_store = VectorStore()
-        self.embedding_service = EmbeddingService()
-        self.db = get_firestore()
-        # Initialize OCR reader lazily (only when needed)
-        self._ocr_reader: Optional[Any] = None
+    # Extractor method by MIME type (see app.services.extractors); each is
+    # called with the upload's content and filename and returns its text
+    EXTRACTORS: Dict[str, str] = {
+        PDF: "_extract_from_pdf",
+        DOCX: "_extract_from_docx",
+        TEXT: "_extract_from_txt",
+        **{mime_type: "_extract_from_image" for mime_type in IMAGE_TYPES},
+    }
+    
+    def __init__(
+        self,
+        chunker: Optional[TextChunker] = None,
+        vector_store: Optional[VectorStore] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        db=None,
+        ocr_reader: Optional[Any] = None,
+        artifact_store: Optional[IngestArtifactStore] = None,
+    ):
+        # Shared instances are passed in by the service container; building
+        # them here is the fallback for standalone use
+        self.chunker = chunker or TextChunker()
+        self.vector_store = vector_store or VectorStore()
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.db = db or get_firestore()
+        # Initialize OCR reader lazily (only when needed) unless warmed up
+        self._ocr_reader: Optional[Any] = ocr_reader
+        # Results of earlier uploads, reused for identical files
+        if artifact_store is None and settings.INGEST_DEDUP_ENABLED:
+            artifact_store = IngestArtifactStore(self.db)
+        self.artifact_store = artifact_store
     
     async def process_document(
         self,
-        content: bytes,
+        content: Content,
+        filename: str,
+        document_id: str,
+        user_id: str,
+    ) -> Dict[str, Any]:
+        """Process a document: extract text, chunk, embed, and store.
+        
+        ``content`` is the file's bytes or the (spooled) file it was uploaded
+        to, which extractors read in place (see app.uploads).
+        
+        Each stage is recorded as a span (see app.tracing) under a
+        ``process_document`` span carrying the document's size and counts.
+        """
+        with span("process_document", document_id=str(document_id), filename=filename, bytes=content_size(content)) as process_span:
+            result = await self._process_document(content, filename, document_id, user_id)
+            process_span.set(chunk_count=len(result["chunks"]))
+            return result
+    
+    async def _process_document(
+        self,
+        content: Content,
         filename: str,
         document_id: str,
         user_id: str,
     ) -> Dict[str, Any]:
-        """Process a document: extract text, chunk, embed, and store."""
         from uuid import UUID
         doc_uuid = UUID(document_id) if isinstance(document_id, str) else document_id
         
-        # Extract text
-        extracted_text = self._extract_text(content, filename)
+        content_sha256 = content_hash(content)
+        current_span().set(content_sha256=content_sha256)
+        result = {"content_sha256": content_sha256, "deduplicated": False}
+        
+        # Reuse the results of an earlier upload of the same bytes
+        artifacts = await self._lookup_artifacts(content_sha256, user_id)
+        if artifacts is not None:
+            current_span().set(deduplicated=True, chunk_count=len(artifacts.chunks))
+            chunk_metadata = await self._store_chunks(doc_uuid, user_id, artifacts.chunks, artifacts.embeddings)
+            return {
+                **result,
+                "deduplicated": True,
+                "extracted_text": artifacts.text,
+                "chunks": chunk_metadata,
+            }
         
-        # Clean text
-        cleaned_text = self._clean_text(extracted_text)
+        extracted_text, cleaned_text, chunks = self._extract_chunks(content, filename)
         
         # If no text extracted (e.g., empty file or image without OCR), return minimal result
         if not cleaned_text or len(cleaned_text.strip()) == 0:
             return {
+                **result,
                 "extracted_text": extracted_text if extracted_text else f"[File: {filename} - No text content]",
                 "chunks": [],
             }
         
-        # Chunk text
-        chunks = self.chunker.chunk_text(cleaned_text)
-        
         # If no chunks created, return with minimal data
         if not chunks or len(chunks) == 0:
             return {
+                **result,
                 "extracted_text": cleaned_text,
                 "chunks": [],
             }
         
-        # Store chunks in Pinecone and Firestore
-        chunk_metadata = []
-        from uuid import uuid4
+        embeddings = await self._embed_chunks(chunks)
         
-        for idx, chunk_data in enumerate(chunks):
-            chunk_text = chunk_data.get("text", "").strip()
-            if not chunk_text:
-                continue
-            
-            chunk_id = None
-            embedding_success = False
-            
+        # Keep the results for later uploads of the same file (only when complete)
+        if self.artifact_store is not None and all(embedding is not None for embedding in embeddings):
             try:
-                # Generate embedding for Pinecone
-                embedding = await self.embedding_service.embed_text(chunk_text)
-                
-                # Store in Pinecone
-                chunk_id = await self.vector_store.add_chunk(
-                    document_id=doc_uuid,
-                    chunk_id=None,  # Will be generated
-                    text=chunk_text,
-                    embedding=embedding,
-                    metadata={
-                        "chunk_index": idx,
-                        "start_char": chunk_data.get("start_char", 0),
-                        "end_char": chunk_data.get("end_char", 0),
-                        "user_id": user_id,
+                await self.artifact_store.put(
+                    self.artifact_store.key(content_sha256, user_id),
+                    content_sha256,
+                    pipeline_fingerprint(self.embedding_service),
+                    IngestArtifacts(cleaned_text, chunks, embeddings),
+                )
+            except Exception as e:
+                print(f"Error storing ingest artifacts: {e}")
+        
+        return {
+            **result,
+            "extracted_text": cleaned_text,
+            "chunks": await self._store_chunks(doc_uuid, user_id, chunks, embeddings),
+        }
+    
+    async def replace_document_content(
+        self,
+        content: Content,
+        filename: str,
+        document_id: str,
+        user_id: str,
+    ) -> Dict[str, Any]:
+        """Replace a processed document's content, re-embedding only changed chunks.
+        
+        The new content is extracted and chunked as usual, then matched to
+        the document's existing chunks by text hash. Matching chunks keep
+        their chunk_id (and so stay valid for existing questions) and their
+        vectors; only new chunks are embedded, and chunks that no longer
+        occur are deleted with their vectors.
+        """
+        with span("replace_document", document_id=str(document_id), filename=filename, bytes=content_size(content)) as replace_span:
+            result = await self._replace_document_content(content, filename, document_id, user_id)
+            replace_span.set(
+                chunk_count=len(result["chunks"]),
+                reused=result["reused"],
+                embedded=result["embedded"],
+                removed=result["removed"],
+            )
+            return result
+    
+    async def _replace_document_content(
+        self,
+        content: Content,
+        filename: str,
+        document_id: str,
+        user_id: str,
+    ) -> Dict[str, Any]:
+        from uuid import UUID
+        doc_uuid = UUID(document_id) if isinstance(document_id, str) else document_id
+        
+        content_sha256 = content_hash(content)
+        current_span().set(content_sha256=content_sha256)
+        
+        # Chunks and embeddings of an identical earlier upload save extraction and embedding
+        artifacts = await self._lookup_artifacts(content_sha256, user_id)
+        if artifacts is not None:
+            text, chunks, embeddings = artifacts.text, artifacts.chunks, artifacts.embeddings
+        else:
+            extracted_text, text, chunks = self._extract_chunks(content, filename)
+            if not text or len(text.strip()) == 0:
+                text = extracted_text if extracted_text else f"[File: {filename} - No text content]"
+            embeddings = None
+        
+        # Existing chunks by text hash; identical chunks are matched in order
+        collection = self.db.collection(Chunk.collection_name())
+        with span("load_chunks") as load_span:
+            existing: Dict[str, List[Dict[str, Any]]] = {}
+            snapshots = await collection.where("document_id", "==", str(doc_uuid)).get()
+            records = [{**snapshot.to_dict(), "chunk_id": snapshot.id} for snapshot in snapshots]
+            for record in sorted(records, key=lambda record: record.get("chunk_index") or 0):
+                # Chunks stored before text_sha256 was recorded are hashed here
+                key = record.get("text_sha256") or chunk_hash(record.get("chunk_text") or "")
+                existing.setdefault(key, []).append(record)
+            load_span.set(chunk_count=len(records))
+        
+        kept = []  # (existing record, new chunk)
+        new_chunks = []
+        new_embeddings = []
+        for position, chunk_data in enumerate(chunks):
+            matches = existing.get(chunk_hash(chunk_data["text"]))
+            if matches:
+                kept.append((matches.pop(0), chunk_data))
+            else:
+                new_chunks.append(chunk_data)
+                if embeddings is not None:
+                    new_embeddings.append(embeddings[position])
+        removed = [record for records in existing.values() for record in records]
+        
+        # Embed and store only the chunks that did not exist before
+        if embeddings is None:
+            new_embeddings = await self._embed_chunks(new_chunks)
+        chunk_metadata = await self._store_chunks(doc_uuid, user_id, new_chunks, new_embeddings)
+        
+        # Kept chunks may have moved within the document
+        moved = [
+            (record, chunk_data)
+            for record, chunk_data in kept
+            if (record.get("chunk_index"), record.get("start_char"), record.get("end_char"))
+            != (chunk_data["chunk_index"], chunk_data["start_char"], chunk_data["end_char"])
+        ]
+        with span("firestore_write", moved=len(moved), removed=len(removed)):
+            writes = [
+                (
+                    "update",
+                    record["chunk_id"],
+                    {
+                        "chunk_index": chunk_data["chunk_index"],
+                        "start_char": chunk_data["start_char"],
+                        "end_char": chunk_data["end_char"],
                     },
                 )
-                embedding_success = True
+                for record, chunk_data in moved
+            ] + [("delete", record["chunk_id"], None) for record in removed]
+            for i in range(0, len(writes), BATCH_SIZE):
+                batch = self.db.batch()
+                for operation, chunk_id, fields in writes[i:i + BATCH_SIZE]:
+                    if operation == "update":
+                        batch.update(collection.document(chunk_id), fields)
+                    else:
+                        batch.delete(collection.document(chunk_id))
+                await batch.commit()
+        
+        with span("pinecone_update", moved=len(moved), removed=len(removed)):
+            for record, chunk_data in moved:
+                try:
+                    await self.vector_store.update_metadata(UUID(record["chunk_id"]), {
+                        "chunk_index": chunk_data["chunk_index"],
+                        "start_char": chunk_data["start_char"],
+                        "end_char": chunk_data["end_char"],
+                    })
+                except Exception as e:
+                    print(f"Error updating vector metadata for chunk {record['chunk_id']}: {e}")
+            if removed:
+                try:
+                    await self.vector_store.delete_chunks([UUID(record["chunk_id"]) for record in removed])
+                except Exception as e:
+                    # Orphaned vectors only point at chunks that no longer exist
+                    print(f"Error deleting vectors of removed chunks: {e}")
+        
+        chunk_metadata += [
+            {
+                "chunk_id": record["chunk_id"],
+                "chunk_index": chunk_data["chunk_index"],
+                "start_char": chunk_data["start_char"],
+                "end_char": chunk_data["end_char"],
+            }
+            for record, chunk_data in kept
+        ]
+        chunk_metadata.sort(key=lambda chunk: chunk["chunk_index"])
+        
+        return {
+            "content_sha256": content_sha256,
+            "deduplicated": artifacts is not None,
+            "extracted_text": text,
+            "chunks": chunk_metadata,
+            "reused": len(kept),
+            "embedded": sum(1 for embedding in new_embeddings if embedding is not None),
+            "removed": len(removed),
+        }
+    
+    async def _lookup_artifacts(self, content_sha256: str, user_id: str) -> Optional[IngestArtifacts]:
+        """Stored results of an earlier upload of the same bytes, if any."""
+        if self.artifact_store is None:
+            return None
+        artifacts = None
+        with span("dedup_lookup") as lookup_span:
+            try:
+                artifacts = await self.artifact_store.get(
+                    self.artifact_store.key(content_sha256, user_id),
+                    pipeline_fingerprint(self.embedding_service),
+                )
+            except Exception as e:
+                print(f"Ingest artifact lookup failed: {e}")
+            lookup_span.set(hit=artifacts is not None)
+        return artifacts
+    
+    def _extract_chunks(self, content: Content, filename: str) -> Tuple[str, str, List[Dict[str, Any]]]:
+        """Extract, clean and chunk a file; returns (extracted text, cleaned text, chunks).
+        
+        Chunks are {"chunk_index", "text", "start_char", "end_char",
+        "token_count"}; chunks without text are dropped.
+        """
+        mime_type = detect_mime_type(content, filename)
+        if mime_type == DOCX:
+            # Read, cleaned and chunked a paragraph at a time, without the whole document in memory
+            with span("extract", bytes=content_size(content), mime_type=mime_type, streamed=True) as extract_span:
+                lines: List[str] = []
+                pieces = _line_pieces(self._clean_lines(self._iter_docx_text(content)), lines)
+                chunks = list(self.chunker.chunk_stream(pieces))
+                extracted_text = cleaned_text = "\n".join(lines)
+                token_count = sum(chunk.get("token_count", 0) for chunk in chunks)
+                extract_span.set(chars=len(cleaned_text), chunk_count=len(chunks), token_count=token_count)
+        else:
+            # Extract text
+            with span("extract", bytes=content_size(content), mime_type=mime_type) as extract_span:
+                extracted_text = self._extract_text(content, filename, mime_type)
+                extract_span.set(chars=len(extracted_text))
+            
+            # Clean text
+            with span("clean", chars=len(extracted_text)) as clean_span:
+                cleaned_text = self._clean_text(extracted_text)
+                clean_span.set(cleaned_chars=len(cleaned_text))
+            
+            if not cleaned_text or len(cleaned_text.strip()) == 0:
+                return extracted_text, cleaned_text, []
+            
+            # Chunk text
+            with span("chunk", chars=len(cleaned_text)) as chunk_span:
+                chunks = self.chunker.chunk_text(cleaned_text)
+                token_count = sum(chunk.get("token_count", 0) for chunk in chunks)
+                chunk_span.set(chunk_count=len(chunks), token_count=token_count)
+        current_span().set(token_count=token_count)
+        
+        chunks = [
+            {
+                "chunk_index": idx,
+                "text": chunk_data.get("text", "").strip(),
+                "start_char": chunk_data.get("start_char", 0),
+                "end_char": chunk_data.get("end_char", 0),
+                "token_count": chunk_data.get("token_count", 0),
+            }
+            for idx, chunk_data in enumerate(chunks)
+            if chunk_data.get("text", "").strip()
+        ]
+        return extracted_text, cleaned_text, chunks
+    
+    async def _embed_chunks(self, chunks: List[Dict[str, Any]]) -> List[Optional[List[float]]]:
+        """Embed each chunk for Pinecone; None for chunks whose embedding failed."""
+        embeddings = []
+        for chunk_data in chunks:
+            try:
+                with span("embed", chunk_index=chunk_data["chunk_index"], token_count=chunk_data["token_count"]):
+                    embeddings.append(await self.embedding_service.embed_text(chunk_data["text"]))
             except Exception as e:
                 # Log error but continue - we'll still store chunk in Firestore
-                print(f"Error generating embedding for chunk {idx}: {e}")
+                print(f"Error generating embedding for chunk {chunk_data['chunk_index']}: {e}")
+                embeddings.append(None)
+        return embeddings
+    
+    async def _store_chunks(
+        self,
+        doc_uuid,
+        user_id: str,
+        chunks: List[Dict[str, Any]],
+        embeddings: List[Optional[List[float]]],
+    ) -> List[Dict[str, Any]]:
+        """Store chunks in Pinecone and Firestore under new chunk IDs; returns their metadata."""
+        from uuid import uuid4
+        chunk_metadata = []
+        
+        for chunk_data, embedding in zip(chunks, embeddings):
+            idx = chunk_data["chunk_index"]
+            chunk_text = chunk_data["text"]
+            chunk_id = None
+            
+            if embedding is not None:
+                try:
+                    # Store in Pinecone
+                    with span("pinecone_upsert", chunk_index=idx):
+                        chunk_id = await self.vector_store.add_chunk(
+                            document_id=doc_uuid,
+                            chunk_id=None,  # Will be generated
+                            text=chunk_text,
+                            embedding=embedding,
+                            metadata={
+                                "chunk_index": idx,
+                                "start_char": chunk_data["start_char"],
+                                "end_char": chunk_data["end_char"],
+                                "user_id": user_id,
+                            },
+                        )
+                except Exception as e:
+                    # Log error but continue - we'll still store chunk in Firestore
+                    print(f"Error storing embedding for chunk {idx}: {e}")
+            if chunk_id is None:
                 # Generate a chunk_id even if embedding fails
                 chunk_id = uuid4()
             
@@ -108,66 +457,88 @@ class DocumentProcessor:
                     chunk_id=chunk_id,
                     document_id=doc_uuid,
                     chunk_index=idx,
-                    start_char=chunk_data.get("start_char", 0),
-                    end_char=chunk_data.get("end_char", 0),
+                    start_char=chunk_data["start_char"],
+                    end_char=chunk_data["end_char"],
                     chunk_text=chunk_text,
+                    text_sha256=chunk_hash(chunk_text),
                 )
                 
-                self.db.collection(Chunk.collection_name()).document(str(chunk_id)).set(
-                    chunk.to_dict()
-                )
+                with span("firestore_write", chunk_index=idx):
+                    await self.db.collection(Chunk.collection_name()).document(str(chunk_id)).set(
+                        chunk.to_dict()
+                    )
                 
                 chunk_metadata.append({
                     "chunk_id": str(chunk_id),
                     "chunk_index": idx,
-                    "start_char": chunk_data.get("start_char", 0),
-                    "end_char": chunk_data.get("end_char", 0),
+                    "start_char": chunk_data["start_char"],
+                    "end_char": chunk_data["end_char"],
                 })
             except Exception as e:
                 # Log error but continue with other chunks
                 print(f"Error storing chunk {idx} in Firestore: {e}")
                 continue
         
-        return {
-            "extracted_text": cleaned_text,
-            "chunks": chunk_metadata,
-        }
+        return chunk_metadata
     
-    def _extract_text(self, content: bytes, filename: str) -> str:
-        """Extract text from document."""
-        file_extension = "." + filename.split(".")[-1].lower() if "." in filename else ""
-
-        if file_extension == ".pdf":
-            return self._extract_from_pdf(content)
-        elif file_extension == ".docx":
-            return self._extract_from_docx(content)
-        elif file_extension == ".txt":
-            return content.decode("utf-8")
-        elif file_extension in {".jpg", ".jpeg", ".png", ".gif", ".webp"}:
-            # Use OCR to extract text from images
-            return self._extract_from_image(content, filename)
-        else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
+    def _extract_text(self, content: Content, filename: str, mime_type: Optional[str] = None) -> str:
+        """Extract text from document with the extractor for its MIME type (detected if not given)."""
+        mime_type = mime_type or detect_mime_type(content, filename)
+        extractor = self.EXTRACTORS.get(mime_type)
+        if extractor is None:
+            raise ValueError(f"Unsupported file type: {mime_type}")
+        return getattr(self, extractor)(content, filename)
+    
+    def _extract_from_txt(self, content: Content, filename: str) -> str:
+        """Extract text from a plain text file."""
+        with content_view(content) as view:
+            return str(view, "utf-8")
     
-    def _extract_from_pdf(self, content: bytes) -> str:
-        """Extract text from PDF."""
-        pdf_file = io.BytesIO(content)
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+    def _extract_from_pdf(self, content: Content, filename: str) -> str:
+        """Extract text from PDF with the PDF_EXTRACTOR backend."""
+        pages = extract_pdf_pages(content, settings.PDF_EXTRACTOR)
+        current_span().set(pages=len(pages), pdf_extractor=settings.PDF_EXTRACTOR)
+        return "".join(page + "\n" for page in pages)
     
-    def _extract_from_docx(self, content: bytes) -> str:
+    def _extract_from_docx(self, content: Content, filename: str) -> str:
         """Extract text from DOCX."""
-        docx_file = io.BytesIO(content)
-        doc = DocxDocument(docx_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+        return "".join(text + "\n" for text in self._iter_docx_text(content))
+    
+    def _iter_docx_text(self, content: Content) -> Iterator[str]:
+        """Yield the text of each DOCX paragraph, including those in table cells, in document order.
+        
+        word/document.xml is parsed incrementally and each paragraph is
+        discarded once read, so memory stays flat however long the document.
+        """
+        import zipfile
+        from xml.etree.ElementTree import iterparse
+        paragraphs = 0
+        with zipfile.ZipFile(content_stream(content)) as package, package.open("word/document.xml") as part:
+            body = None
+            depth = 0
+            fallback = 0
+            for event, element in iterparse(part, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if element.tag == W_BODY:
+                        body = element
+                    elif element.tag == MC_FALLBACK:
+                        fallback += 1
+                    continue
+                depth -= 1
+                if element.tag == W_P:
+                    if not fallback:
+                        paragraphs += 1
+                        yield _paragraph_text(element)
+                    element.clear()
+                elif element.tag == MC_FALLBACK:
+                    fallback -= 1
+                if body is not None and depth == 2:
+                    # A paragraph or table of the body is done
+                    body.clear()
+        current_span().set(paragraphs=paragraphs)
     
-    def _extract_from_image(self, content: bytes, filename: str) -> str:
+    def _extract_from_image(self, content: Content, filename: str) -> str:
         """Extract text from image using OCR."""
         if not EASYOCR_AVAILABLE:
             return f"[Image file: {filename}. OCR not available. Please install EasyOCR: pip install easyocr]"
@@ -176,51 +547,12 @@ class DocumentProcessor:
             # Initialize OCR reader if not already done (lazy initialization)
             if self._ocr_reader is None:
                 print("Initializing EasyOCR reader (this may take a moment on first use - downloading models)...")
-                # Use English by default, can be extended to support other languages
-                # gpu=False to work on systems without GPU
-                # verbose=False to reduce output noise
-                self._ocr_reader = easyocr.Reader(['en'], gpu=False, verbose=False)
-            
-            # Load image from bytes
-            image = Image.open(io.BytesIO(content))
-            
-            # Handle EXIF orientation for mobile camera images
-            # Mobile cameras often store images with rotation metadata
-            try:
-                from PIL import ImageOps
-                # Auto-rotate based on EXIF orientation tag
-                image = ImageOps.exif_transpose(image)
-            except (AttributeError, Exception):
-                # No EXIF data or error, continue as-is
-                pass
+                self._ocr_reader = create_ocr_reader()
             
-            # Convert to RGB if necessary (EasyOCR works best with RGB)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Optional: Enhance image quality for better OCR
-            # Resize if image is too large (OCR works better on reasonable sizes)
-            max_dimension = 2000
-            if max(image.size) > max_dimension:
-                ratio = max_dimension / max(image.size)
-                new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Convert PIL Image to numpy array for EasyOCR
-            import numpy as np
-            image_array = np.array(image)
-            
-            # Perform OCR
-            print(f"Performing OCR on image: {filename} (size: {image.size})")
-            results = self._ocr_reader.readtext(image_array)
-            
-            # Extract text from results
-            # Each result is a tuple: (bbox, text, confidence)
-            extracted_lines = []
-            for (bbox, text, confidence) in results:
-                # Only include text with reasonable confidence (> 0.5)
-                if confidence > 0.5:
-                    extracted_lines.append(text.strip())
+            # Decoded in grayscale at a bounded size, and tiled if the text is small (see app.services.image_ocr)
+            from app.services.image_ocr import recognize_image
+            print(f"Performing OCR on image: {filename}")
+            extracted_lines = recognize_image(self._ocr_reader, content_stream(content))
             
             if extracted_lines:
                 extracted_text = "\n".join(extracted_lines)
@@ -246,24 +578,35 @@ class DocumentProcessor:
     
     def _clean_text(self, text: str) -> str:
         """Clean extracted text."""
-        # Remove excessive whitespace
-        lines = text.split("\n")
-        cleaned_lines = []
-        for line in lines:
-            cleaned_line = " ".join(line.split())
-            if cleaned_line:
-                cleaned_lines.append(cleaned_line)
-        
-        # Join with single newlines
-        cleaned_text = "\n".join(cleaned_lines)
-        
-        # Remove headers/footers (simple heuristic: very short lines at start/end)
-        lines = cleaned_text.split("\n")
-        if len(lines) > 10:
-            # Remove first and last 2 lines if they're very short
-            if len(lines) > 0 and len(lines[0]) < 30:
-                lines = lines[1:]
-            if len(lines) > 0 and len(lines[-1]) < 30:
-                lines = lines[:-1]
+        return "\n".join(self._clean_lines([text]))
+    
+    def _clean_lines(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Yield the cleaned lines of text given as pieces (each piece ends a line)."""
+        # Lines are held back until it is known whether they are a header or
+        # footer: the first until there are more than 10 lines, the last
+        # until the text ends
+        head: Optional[List[str]] = []
+        last = None
+        for piece in pieces:
+            for line in piece.split("\n"):
+                # Remove excessive whitespace
+                cleaned_line = " ".join(line.split())
+                if not cleaned_line:
+                    continue
+                if head is None:
+                    yield last
+                    last = cleaned_line
+                    continue
+                head.append(cleaned_line)
+                if len(head) > 10:
+                    # Remove headers/footers (simple heuristic: very short lines at start/end)
+                    if len(head[0]) < 30:
+                        head.pop(0)
+                    last = head.pop()
+                    yield from head
+                    head = None
         
-        return "\n".join(lines)
+        if head is not None:
+            yield from head
+        elif len(last) >= 30:
+            yield last
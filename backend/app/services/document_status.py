@@ -0,0 +1,96 @@
+"""Document status changes that cannot race each other.
+
+A document's status says who may write to it: the upload or content
+replacement that set it ``processing``, or the DeletionJob once it is
+``deleting``. Status changes are a read followed by an update with a
+``last_update_time`` precondition, so of two requests racing for the same
+document only one wins and the other gets StatusConflict.
+
+A processing claim carries a token (``processing.token``); the request
+that holds it is the only one that can finish processing. A document left
+``processing`` for PROCESSING_TIMEOUT_SECONDS (the worker died) counts as
+failed, so it can be deleted or replaced again.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+from google.api_core.exceptions import FailedPrecondition
+from app.config import settings
+from app.models import Document, DocumentStatus
+
+# Precondition failures retried before giving up (e.g. deletion heartbeats in between)
+TRANSITION_ATTEMPTS = 5
+
+
+class StatusConflict(Exception):
+    """The document is missing, or its status does not allow the change."""
+
+    def __init__(self, status: Optional[str]):
+        super().__init__(f"document status is {status or 'missing'}")
+        self.status = status
+
+
+def processing_fields(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Fields of a new processing claim; ``processing.token`` identifies its holder."""
+    return {
+        "status": DocumentStatus.PROCESSING.value,
+        "processing": {"token": uuid4().hex, "started_at": now or datetime.now(timezone.utc)},
+    }
+
+
+def _processing_abandoned(data: Dict[str, Any]) -> bool:
+    started_at = (data.get("processing") or {}).get("started_at") or data.get("uploaded_at")
+    if not isinstance(started_at, datetime):
+        return True
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    return started_at < datetime.now(timezone.utc) - timedelta(seconds=settings.PROCESSING_TIMEOUT_SECONDS)
+
+
+def effective_status(data: Dict[str, Any]) -> Optional[str]:
+    """The document's status, with abandoned processing counted as failed."""
+    status = data.get("status")
+    if status == DocumentStatus.PROCESSING.value and _processing_abandoned(data):
+        return DocumentStatus.FAILED.value
+    return status
+
+
+def is_idle(data: Dict[str, Any]) -> bool:
+    """Whether no request is processing or deleting the document."""
+    return effective_status(data) not in (DocumentStatus.PROCESSING.value, DocumentStatus.DELETING.value)
+
+
+async def transition(db, document_id: Any, allowed: Callable[[Dict[str, Any]], bool], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply ``updates`` if ``allowed(data)`` holds and the document is unchanged since; returns its data before."""
+    doc_ref = db.collection(Document.collection_name()).document(str(document_id))
+    for _ in range(TRANSITION_ATTEMPTS):
+        snapshot = await doc_ref.get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        if data is None or not allowed(data):
+            raise StatusConflict(effective_status(data) if data else None)
+        try:
+            await doc_ref.update(updates, option=db.write_option(last_update_time=snapshot.update_time))
+            return data
+        except FailedPrecondition:
+            # Written in between; check the status again
+            continue
+    raise StatusConflict(data.get("status"))
+
+
+async def claim_processing(db, document_id: Any) -> str:
+    """Set an idle document ``processing``; returns the claim's token."""
+    fields = processing_fields()
+    await transition(db, document_id, is_idle, fields)
+    return fields["processing"]["token"]
+
+
+async def finish_processing(db, document_id: Any, token: str, updates: Dict[str, Any]) -> None:
+    """Write the result of processing (``updates`` sets the new status), if the claim is still held."""
+
+    def holds_claim(data: Dict[str, Any]) -> bool:
+        return (
+            data.get("status") == DocumentStatus.PROCESSING.value
+            and (data.get("processing") or {}).get("token") == token
+        )
+
+    await transition(db, document_id, holds_claim, updates)
@@ -1,9 +1,7 @@
 """Embedding service for generating vector embeddings."""
 from typing import List
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
-from google import genai
 from app.config import settings
+from app.metrics import track_dependency
 
 
 class EmbeddingService:
@@ -13,25 +11,33 @@ class EmbeddingService:
         self.provider = settings.EMBEDDING_PROVIDER
         self.model = settings.EMBEDDING_MODEL
         
-        # Initialize provider clients
+        # Initialize provider clients (SDKs are imported on first use so
+        # workers only load the configured provider)
         if self.provider == "openai":
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY is required when EMBEDDING_PROVIDER is 'openai'")
+            from openai import AsyncOpenAI
             self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         elif self.provider == "anthropic":
             if not settings.ANTHROPIC_API_KEY:
                 raise ValueError("ANTHROPIC_API_KEY is required when EMBEDDING_PROVIDER is 'anthropic'")
+            from anthropic import AsyncAnthropic
             self.anthropic_client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
         elif self.provider == "google":
             if not settings.GOOGLE_API_KEY:
                 raise ValueError("GOOGLE_API_KEY is required when EMBEDDING_PROVIDER is 'google'. Get a free API key from https://makersuite.google.com/app/apikey")
             # Initialize Google GenAI client
+            from google import genai
             self.google_client = genai.Client(api_key=settings.GOOGLE_API_KEY)
         else:
             raise ValueError(f"Unknown embedding provider: {self.provider}. Supported: 'openai', 'google'")
     
     async def embed_text(self, text: str) -> List[float]:
         """Generate embedding for a single text."""
+        with track_dependency("embeddings", "embed_text", f"{self.provider}/{self.model}"):
+            return await self._embed_text(text)
+    
+    async def _embed_text(self, text: str) -> List[float]:
         if self.provider == "openai":
             response = await self.client.embeddings.create(
                 model=self.model,
@@ -102,6 +108,10 @@ class EmbeddingService:
     
     async def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts."""
+        with track_dependency("embeddings", "embed_batch", f"{self.provider}/{self.model}"):
+            return await self._embed_batch(texts)
+    
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
         if self.provider == "openai":
             response = await self.client.embeddings.create(
                 model=self.model,
@@ -0,0 +1,124 @@
+"""Upload type detection and PDF text extraction backends.
+
+Uploads are routed to an extractor by MIME type (see
+DocumentProcessor.EXTRACTORS), sniffed from the file's first bytes with
+python-magic rather than taken from the filename. The extension only
+decides between formats magic reports generically (older libmagic calls
+a DOCX a ZIP archive), and is used alone when python-magic or the libmagic
+library is not installed.
+
+PDF text comes from the backend named by PDF_EXTRACTOR:
+- ``pypdf2``: pure Python (default)
+- ``pypdfium2``: PDFium's text layer, several times faster
+- ``pdfminer``: pdfminer.six layout analysis, which groups characters into
+  text boxes so multi-column pages come out in reading order; slowest
+Backend libraries are imported on first use.
+"""
+from typing import BinaryIO, Callable, Dict, List, Optional
+from app.uploads import Content, content_stream
+
+try:
+    import magic
+except ImportError:
+    # python-magic, or the libmagic library it loads, is missing
+    magic = None
+    print("Warning: python-magic not available. Upload types are taken from file extensions.")
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TEXT = "text/plain"
+OCTET_STREAM = "application/octet-stream"
+
+EXTENSION_MIME_TYPES = {
+    ".pdf": PDF,
+    ".docx": DOCX,
+    ".txt": TEXT,
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+IMAGE_TYPES = {mime for mime in EXTENSION_MIME_TYPES.values() if mime.startswith("image/")}
+
+# Reported for content magic cannot narrow down; the extension decides
+GENERIC_TYPES = {OCTET_STREAM, "application/zip", "inode/x-empty", "application/x-empty"}
+# Plain text with a recognizable structure, extracted as text
+TEXT_LIKE_TYPES = {"application/json", "application/xml", "application/csv"}
+
+# Enough for libmagic to recognize every supported format
+SNIFF_BYTES = 2048
+
+
+def file_extension(filename: str) -> str:
+    return "." + filename.split(".")[-1].lower() if "." in filename else ""
+
+
+def sniff_mime_type(content: Content) -> Optional[str]:
+    """MIME type libmagic reports for the start of an upload; None without python-magic."""
+    if magic is None:
+        return None
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        head = bytes(content[:SNIFF_BYTES])
+    else:
+        stream = content_stream(content)
+        head = stream.read(SNIFF_BYTES)
+        stream.seek(0)
+    return magic.from_buffer(head, mime=True)
+
+
+def detect_mime_type(content: Content, filename: str) -> str:
+    """MIME type of an upload, from its content where possible."""
+    by_extension = EXTENSION_MIME_TYPES.get(file_extension(filename), OCTET_STREAM)
+    sniffed = sniff_mime_type(content)
+    if sniffed is None or sniffed in GENERIC_TYPES:
+        return by_extension
+    if sniffed.startswith("text/") or sniffed in TEXT_LIKE_TYPES:
+        return TEXT
+    return sniffed
+
+
+def _pypdf2_pages(stream: BinaryIO) -> List[str]:
+    from PyPDF2 import PdfReader
+    return [page.extract_text() for page in PdfReader(stream).pages]
+
+
+def _pypdfium2_pages(stream: BinaryIO) -> List[str]:
+    import pypdfium2
+    document = pypdfium2.PdfDocument(stream)
+    pages = []
+    try:
+        for page in document:
+            textpage = page.get_textpage()
+            # PDFium ends lines with \r\n
+            pages.append(textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n"))
+            textpage.close()
+            page.close()
+    finally:
+        document.close()
+    return pages
+
+
+def _pdfminer_pages(stream: BinaryIO) -> List[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LAParams, LTTextContainer
+    return [
+        "".join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+        for page in extract_pages(stream, laparams=LAParams())
+    ]
+
+
+# PDF_EXTRACTOR value -> function returning the text of each page
+PDF_BACKENDS: Dict[str, Callable[[BinaryIO], List[str]]] = {
+    "pypdf2": _pypdf2_pages,
+    "pypdfium2": _pypdfium2_pages,
+    "pdfminer": _pdfminer_pages,
+}
+
+
+def extract_pdf_pages(content: Content, backend: str) -> List[str]:
+    """Text of each page of a PDF, extracted by the named backend."""
+    extract = PDF_BACKENDS.get(backend)
+    if extract is None:
+        raise ValueError(f"Unknown PDF extractor: {backend}. Supported: {', '.join(PDF_BACKENDS)}")
+    return extract(content_stream(content))
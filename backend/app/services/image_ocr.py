@@ -0,0 +1,294 @@
+"""Image OCR: memory-bounded decoding, grayscale, tiling and merging.
+
+An image is first decoded in grayscale with its longest side at most
+OCR_TILE_SIZE. JPEGs are scaled down by the decoder itself (by 1/2, 1/4
+or 1/8) and only their luminance is decoded, so a phone photo is never
+held at full resolution in color. If the text lines at that size are at
+least OCR_MIN_TEXT_HEIGHT pixels tall, the image is recognized in one
+pass. Otherwise the page is dense: it is decoded again at up to
+OCR_MAX_DIMENSION and cut into overlapping OCR_TILE_SIZE tiles, which are
+recognized OCR_BATCH_SIZE at a time. Tile results are mapped back to page
+coordinates, text read in two tiles is merged, and lines are put in
+reading order.
+
+Each image is traced as an ``ocr_decode`` and an ``ocr`` span (see
+app.tracing), whose durations are its decoding and recognition latency;
+``pixel_bytes`` is the most image memory the pipeline held at once.
+"""
+from typing import Any, BinaryIO, List, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from app.config import settings
+from app.tracing import span
+
+# Recognized text below this confidence is dropped
+MIN_CONFIDENCE = 0.5
+# A box this close to a tile edge inside the page was probably cut by it
+EDGE_MARGIN = 3
+# Share of a pixel row that must be dark for the row to be part of a text line
+INK_ROW_SHARE = 0.002
+MIN_LINES = 3
+
+
+class Detection:
+    """A recognized text box in page coordinates."""
+
+    __slots__ = ("x0", "y0", "x1", "y1", "text", "confidence", "tile", "cut_left", "cut_right", "cut_vertical")
+
+    def __init__(self, x0, y0, x1, y1, text: str, confidence: float, tile: int,
+                 cut_left: bool = False, cut_right: bool = False, cut_vertical: bool = False):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.text = text
+        self.confidence = confidence
+        self.tile = tile
+        # Which sides of the box a tile edge ran through
+        self.cut_left = cut_left
+        self.cut_right = cut_right
+        self.cut_vertical = cut_vertical
+
+    @property
+    def middle(self) -> float:
+        return (self.y0 + self.y1) / 2
+
+
+def decode_grayscale(stream: BinaryIO, max_dimension: int) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Decode an image in grayscale with its longest side at most ``max_dimension``.
+
+    Returns the image and the size of the original.
+    """
+    image = Image.open(stream)
+    source_size = image.size
+    scale = min(1.0, max_dimension / max(source_size))
+    # JPEG only: decode luminance at the smallest scale still at least this large
+    image.draft("L", (max(1, int(source_size[0] * scale)), max(1, int(source_size[1] * scale))))
+    if image.mode != "L":
+        image = image.convert("L")
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    try:
+        # Mobile cameras store the rotation in EXIF; rotated last, when the image is smallest
+        image = ImageOps.exif_transpose(image, in_place=True) or image
+    except Exception:
+        pass
+    return image, source_size
+
+
+def text_line_height(page: np.ndarray) -> Optional[float]:
+    """Median height of the text lines of a grayscale page, from the rows with dark pixels.
+
+    None when fewer than MIN_LINES lines are found (e.g. a photo, or text
+    too skewed for its lines to be separated by blank rows).
+    """
+    # Statistics of every fourth pixel each way; float copies of the whole page would outweigh it
+    sample = page[::4, ::4]
+    threshold = sample.mean() - sample.std() / 2
+    dark = np.count_nonzero(page < threshold, axis=1)
+    inked = np.concatenate(([False], dark > INK_ROW_SHARE * page.shape[1], [False]))
+    edges = np.diff(inked.astype(np.int8))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    heights = heights[heights >= 2]
+    if len(heights) < MIN_LINES:
+        return None
+    return float(np.median(heights))
+
+
+def tile_origins(length: int, tile: int, overlap: int) -> List[int]:
+    """Evenly spaced tile starts covering ``length`` with at least ``overlap`` between neighbors."""
+    if length <= tile:
+        return [0]
+    count = -(-(length - overlap) // (tile - overlap))
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+
+def recognize_tiles(reader: Any, page: np.ndarray, tile: int, overlap: int, batch_size: int) -> Tuple[List[Detection], int, int]:
+    """Recognize a page in overlapping tiles; returns the detections, tile count and pixel bytes held."""
+    height, width = page.shape
+    tile_width, tile_height = min(tile, width), min(tile, height)
+    origins = [(x, y) for y in tile_origins(height, tile, overlap) for x in tile_origins(width, tile, overlap)]
+    detections = []
+    pixel_bytes = page.nbytes
+    for start in range(0, len(origins), batch_size):
+        group = origins[start:start + batch_size]
+        if len(origins) == 1:
+            crops = [page]
+        else:
+            crops = [np.ascontiguousarray(page[y:y + tile_height, x:x + tile_width]) for x, y in group]
+            pixel_bytes = max(pixel_bytes, page.nbytes + sum(crop.nbytes for crop in crops))
+        # Tiles are all the same size, so they can be batched
+        if len(crops) > 1 and hasattr(reader, "readtext_batched"):
+            results = reader.readtext_batched(crops, batch_size=batch_size)
+        else:
+            results = [reader.readtext(crop) for crop in crops]
+        for index, ((x, y), result) in enumerate(zip(group, results), start):
+            for bbox, text, confidence in result:
+                if confidence <= MIN_CONFIDENCE or not text.strip():
+                    continue
+                xs = [point[0] for point in bbox]
+                ys = [point[1] for point in bbox]
+                detections.append(Detection(
+                    x + min(xs), y + min(ys), x + max(xs), y + max(ys), text.strip(), confidence, index,
+                    cut_left=x > 0 and min(xs) <= EDGE_MARGIN,
+                    cut_right=x + tile_width < width and max(xs) >= tile_width - EDGE_MARGIN,
+                    cut_vertical=(y > 0 and min(ys) <= EDGE_MARGIN)
+                    or (y + tile_height < height and max(ys) >= tile_height - EDGE_MARGIN),
+                ))
+    return detections, len(origins), pixel_bytes
+
+
+def _intersection(a: Detection, b: Detection) -> float:
+    return max(0, min(a.x1, b.x1) - max(a.x0, b.x0)) * max(0, min(a.y1, b.y1) - max(a.y0, b.y0))
+
+
+def _area(detection: Detection) -> float:
+    return max(1, (detection.x1 - detection.x0) * (detection.y1 - detection.y0))
+
+
+def _word_starts(detection: Detection, words: List[str]) -> Tuple[List[float], float]:
+    """Estimated x of each word's start, taking characters to be of equal width; and that width."""
+    char = (detection.x1 - detection.x0) / max(1, len(" ".join(words)))
+    starts, offset = [], 0
+    for word in words:
+        starts.append(detection.x0 + offset * char)
+        offset += len(word) + 1
+    return starts, char
+
+
+def _find(words: List[str], starts: List[float], part: List[str], x: float, tolerance: float) -> bool:
+    """Whether ``part`` occurs in ``words`` at about ``x``."""
+    return any(
+        words[i:i + len(part)] == part and abs(starts[i] - x) <= tolerance
+        for i in range(len(words) - len(part) + 1)
+    )
+
+
+def _join_word_parts(head: str, tail: str) -> str:
+    """A word read as ``head`` up to a tile edge and as ``tail`` from the next tile's edge."""
+    if head.endswith(tail):
+        return head
+    if tail.startswith(head):
+        return tail
+    for shared in range(min(len(head), len(tail)) - 1, 0, -1):
+        if head[-shared:] == tail[:shared]:
+            return head + tail[shared:]
+    return max(head, tail, key=len)
+
+
+def _merge(left: Detection, right: Detection) -> Detection:
+    """One detection for text read in two tiles; ``right`` starts inside ``left``.
+
+    Words a vertical tile edge ran through are only partly read, so they
+    are left out when the two are compared. Word positions are estimated
+    from character counts, so a repeated word is only matched with itself.
+    """
+    left_words, right_words = left.text.split(), right.text.split()
+    left_starts, left_char = _word_starts(left, left_words)
+    right_starts, right_char = _word_starts(right, right_words)
+    tolerance = 3 * max(left_char, right_char)
+    left_start, left_end = int(left.cut_left), len(left_words) - int(left.cut_right)
+    right_start, right_end = int(right.cut_left), len(right_words) - int(right.cut_right)
+    left_whole, right_whole = left_words[left_start:left_end], right_words[right_start:right_end]
+
+    def joined(words: List[str]) -> Detection:
+        return Detection(
+            min(left.x0, right.x0), min(left.y0, right.y0), max(left.x1, right.x1), max(left.y1, right.y1),
+            " ".join(left_words[:left_end] + words + right_words[right_end:]),
+            min(left.confidence, right.confidence),
+            right.tile,
+            cut_left=left.cut_left,
+            cut_right=right.cut_right,
+            cut_vertical=left.cut_vertical or right.cut_vertical,
+        )
+
+    if right_whole:
+        x = right_starts[right_start]
+        if _find(left_whole, left_starts[left_start:left_end], right_whole, x, tolerance):
+            return left
+        # The words read in both tiles are kept once
+        for shared in range(min(len(left_whole), len(right_whole)), 0, -1):
+            if left_whole[-shared:] == right_whole[:shared] and abs(left_starts[left_end - shared] - x) <= tolerance:
+                return joined(right_whole[shared:])
+    elif right.x1 <= left.x1 + EDGE_MARGIN:
+        # Only part of a word the other tile read further
+        return left
+    if left_whole and _find(right_whole, right_starts[right_start:right_end], left_whole, left_starts[left_start], tolerance):
+        return right
+    cut = left.cut_left or left.cut_right or right.cut_left or right.cut_right
+    if not cut and _intersection(left, right) >= 0.8 * max(_area(left), _area(right)):
+        # The same text, read differently in the two tiles
+        return max(left, right, key=lambda detection: detection.confidence)
+    if left.cut_right and right.cut_left:
+        # No word was read whole in both tiles; the two cut words are one
+        # word if it spans the overlap
+        head_start = left_starts[-1]
+        tail_end = right_starts[0] + len(right_words[0]) * right_char
+        if head_start < right.x0 + right_char and tail_end > left.x1 - left_char:
+            return joined([_join_word_parts(left_words[-1], right_words[0])] + right_whole)
+    return joined(right_whole)
+
+
+def reading_order(detections: List[Detection]) -> List[str]:
+    """Lines of text top to bottom, each left to right, with text read in two tiles merged."""
+    # Boxes cut by a horizontal tile edge are dropped where another tile read them whole
+    whole = [d for d in detections if not d.cut_vertical]
+    detections = [
+        d for d in detections
+        if not d.cut_vertical or not any(w.tile != d.tile and _intersection(w, d) > 0 for w in whole)
+    ]
+    lines: List[List[Detection]] = []
+    for detection in sorted(detections, key=lambda d: d.middle):
+        if lines and lines[-1][0].y0 <= detection.middle <= lines[-1][0].y1:
+            lines[-1].append(detection)
+        else:
+            lines.append([detection])
+
+    text_lines = []
+    for line in lines:
+        merged: List[Detection] = []
+        for detection in sorted(line, key=lambda d: d.x0):
+            previous = merged[-1] if merged else None
+            if previous is not None and previous.tile != detection.tile and detection.x0 < previous.x1:
+                merged[-1] = _merge(previous, detection)
+            else:
+                merged.append(detection)
+        text = " ".join(d.text for d in merged if d.text)
+        if text:
+            text_lines.append(text)
+    return text_lines
+
+
+def recognize_image(reader: Any, stream: BinaryIO) -> List[str]:
+    """Lines of text in an image, in reading order."""
+    with span("ocr_decode") as decode_span:
+        image, source_size = decode_grayscale(stream, settings.OCR_TILE_SIZE)
+        page = np.asarray(image)
+        del image
+        line_height = text_line_height(page)
+        # Small text stays legible only at a higher resolution than one pass allows
+        dense = (
+            line_height is not None
+            and line_height < settings.OCR_MIN_TEXT_HEIGHT
+            and max(source_size) > settings.OCR_TILE_SIZE
+        )
+        if dense:
+            stream.seek(0)
+            del page
+            image, _ = decode_grayscale(stream, settings.OCR_MAX_DIMENSION)
+            page = np.asarray(image)
+            del image
+        decode_span.set(
+            source_width=source_size[0],
+            source_height=source_size[1],
+            width=page.shape[1],
+            height=page.shape[0],
+            line_height=line_height,
+            dense=dense,
+        )
+
+    with span("ocr", width=page.shape[1], height=page.shape[0]) as ocr_span:
+        detections, tiles, pixel_bytes = recognize_tiles(
+            reader, page, settings.OCR_TILE_SIZE, settings.OCR_TILE_OVERLAP, settings.OCR_BATCH_SIZE
+        )
+        lines = reading_order(detections)
+        ocr_span.set(tiles=tiles, detections=len(detections), lines=len(lines), pixel_bytes=pixel_bytes)
+    decode_span.set(pixel_bytes=pixel_bytes)
+    return lines
@@ -0,0 +1,172 @@
+"""Content-addressed cache of ingestion results, for upload deduplication.
+
+When a file is processed, its extracted text, chunk boundaries and chunk
+embeddings are stored under the sha256 of the uploaded bytes. A later
+upload of the same bytes reuses them instead of running extraction, OCR,
+chunking and embedding again. The new document still gets its own text
+blob, Chunk records and vectors, so users never share records.
+
+Artifacts are shared by every document with the same content in their
+scope (INGEST_DEDUP_SCOPE) and dropped once the last of them is deleted or
+its content replaced (see IngestArtifactStore.release). They are only
+reused by the same pipeline (PDF extractor, OCR resolution, chunk size, overlap,
+tokenizer and embedding model);
+after a change (or a change to what extraction produces, see
+EXTRACTION_VERSION) the next upload reprocesses the file and replaces them.
+
+Index record ``ingest_artifacts/{key}``:
+    {"content_sha256", "blob_ref", "pipeline", "chunk_count", "dimension",
+     "created_at", "hits"}
+Blob: header | gzip(JSON {"text", "chunks"}) | float32 embeddings
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import struct
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from firebase_admin import firestore
+from app.config import settings
+from app.models import Document
+from app.services.blob_store import BlobStore, get_blob_store
+from app.uploads import Content, content_stream
+
+ARTIFACTS_COLLECTION = "ingest_artifacts"
+
+MAGIC = b"LLIA"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">4sBIII")  # magic, version, JSON bytes, chunks, dimension
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Bumped when extraction produces different text for the same file
+# (2: DOCX table cells are extracted; 3: image text is read in tiles and
+# put in reading order)
+EXTRACTION_VERSION = 3
+
+
+def content_hash(content: Content) -> str:
+    """sha256 of an upload's bytes; files are read in blocks."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(content).hexdigest()
+    digest = hashlib.sha256()
+    stream = content_stream(content)
+    for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def pipeline_fingerprint(embedding_service) -> str:
+    """Settings the artifacts depend on; artifacts from another pipeline are not reused."""
+    return "/".join((
+        str(EXTRACTION_VERSION),
+        settings.PDF_EXTRACTOR,
+        f"{settings.OCR_TILE_SIZE}:{settings.OCR_MAX_DIMENSION}:{settings.OCR_MIN_TEXT_HEIGHT}",
+        str(settings.CHUNK_SIZE),
+        str(settings.CHUNK_OVERLAP),
+        settings.TOKENIZER_ENCODING,
+        str(embedding_service.provider),
+        str(embedding_service.model),
+    ))
+
+
+class IngestArtifacts:
+    """Reusable results of processing one file."""
+
+    def __init__(self, text: str, chunks: List[Dict[str, Any]], embeddings: List[List[float]]):
+        self.text = text
+        # [{"text", "start_char", "end_char", "token_count"}]
+        self.chunks = chunks
+        self.embeddings = embeddings
+
+    def to_blob(self) -> bytes:
+        payload = gzip.compress(
+            json.dumps({"text": self.text, "chunks": self.chunks}).encode("utf-8"), compresslevel=6
+        )
+        vectors = np.asarray(self.embeddings, dtype=np.float32)
+        dimension = vectors.shape[1] if vectors.ndim == 2 else 0
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, len(payload), len(self.chunks), dimension)
+        return header + payload + vectors.tobytes()
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> "IngestArtifacts":
+        magic, version, payload_size, chunk_count, dimension = HEADER.unpack_from(blob, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Unrecognized ingest artifact format")
+        payload = json.loads(gzip.decompress(blob[HEADER.size:HEADER.size + payload_size]))
+        vectors = np.frombuffer(blob, dtype=np.float32, offset=HEADER.size + payload_size)
+        embeddings = vectors.reshape(chunk_count, dimension).tolist() if chunk_count else []
+        return cls(payload["text"], payload["chunks"], embeddings)
+
+
+class IngestArtifactStore:
+    """Firestore index from content hash to artifact blobs."""
+
+    def __init__(self, db, blob_store: Optional[BlobStore] = None):
+        self.db = db
+        self.blob_store = blob_store or get_blob_store()
+
+    @staticmethod
+    def key(content_sha256: str, user_id: str) -> str:
+        """Index key of an upload; scoped to the user unless INGEST_DEDUP_SCOPE is global."""
+        if settings.INGEST_DEDUP_SCOPE == "user":
+            return hashlib.sha256(f"{user_id}:{content_sha256}".encode("utf-8")).hexdigest()
+        return content_sha256
+
+    @staticmethod
+    def blob_key(key: str) -> str:
+        return f"artifacts/{key}.llia"
+
+    async def get(self, key: str, pipeline: str) -> Optional[IngestArtifacts]:
+        """Artifacts stored under ``key`` by the same pipeline, or None."""
+        ref = self.db.collection(ARTIFACTS_COLLECTION).document(key)
+        snapshot = await ref.get()
+        if not snapshot.exists:
+            return None
+        record = snapshot.to_dict()
+        if record.get("pipeline") != pipeline:
+            return None
+        try:
+            blob = await asyncio.to_thread(self.blob_store.get, record["blob_ref"])
+            artifacts = IngestArtifacts.from_blob(blob)
+        except Exception as e:
+            # A missing or unreadable blob only means the file is processed again
+            print(f"Ingest artifacts {key} unreadable: {e}")
+            return None
+        await ref.update({"hits": firestore.Increment(1)})
+        return artifacts
+
+    async def put(self, key: str, content_sha256: str, pipeline: str, artifacts: IngestArtifacts) -> None:
+        blob_ref = self.blob_key(key)
+        await asyncio.to_thread(self.blob_store.put, blob_ref, artifacts.to_blob())
+        await self.db.collection(ARTIFACTS_COLLECTION).document(key).set({
+            "content_sha256": content_sha256,
+            "blob_ref": blob_ref,
+            "pipeline": pipeline,
+            "chunk_count": len(artifacts.chunks),
+            "dimension": len(artifacts.embeddings[0]) if artifacts.embeddings else 0,
+            "created_at": datetime.utcnow(),
+            "hits": 0,
+        })
+
+    async def release(self, content_sha256: str, user_id: str, document_id: Any) -> bool:
+        """Drop the artifacts of ``content_sha256`` unless another document still has that content.
+
+        Called when ``document_id`` is deleted or its content replaced.
+        Returns True if artifacts were dropped.
+        """
+        documents = self.db.collection(Document.collection_name()).where("content_sha256", "==", content_sha256)
+        if settings.INGEST_DEDUP_SCOPE == "user":
+            documents = documents.where("user_id", "==", user_id)
+        async for snapshot in documents.select(["content_sha256"]).limit(2).stream():
+            if snapshot.id != str(document_id):
+                return False
+        ref = self.db.collection(ARTIFACTS_COLLECTION).document(self.key(content_sha256, user_id))
+        snapshot = await ref.get()
+        if not snapshot.exists:
+            return False
+        await ref.delete()
+        await asyncio.to_thread(self.blob_store.delete, snapshot.to_dict()["blob_ref"])
+        return True
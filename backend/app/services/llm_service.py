@@ -1,9 +1,8 @@
 """LLM service for question generation and evaluation."""
 from typing import List, Dict, Any, Optional
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
-from google import genai
 from app.config import settings
+from app.metrics import track_dependency
+from app.services.tokenizer import approx_token_count
 
 
 class LLMService:
@@ -13,19 +12,23 @@ class LLMService:
         self.provider = settings.LLM_PROVIDER
         self.model = settings.LLM_MODEL
         
-        # Initialize provider clients
+        # Initialize provider clients (SDKs are imported on first use so
+        # workers only load the configured provider)
         if self.provider == "openai":
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY is required when LLM_PROVIDER is 'openai'")
+            from openai import AsyncOpenAI
             self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         elif self.provider == "anthropic":
             if not settings.ANTHROPIC_API_KEY:
                 raise ValueError("ANTHROPIC_API_KEY is required when LLM_PROVIDER is 'anthropic'")
+            from anthropic import AsyncAnthropic
             self.anthropic_client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
         elif self.provider == "google":
             if not settings.GOOGLE_API_KEY:
                 raise ValueError("GOOGLE_API_KEY is required when LLM_PROVIDER is 'google'. Get a free API key from https://makersuite.google.com/app/apikey")
             # Initialize Google GenAI client
+            from google import genai
             self.google_client = genai.Client(api_key=settings.GOOGLE_API_KEY)
         else:
             raise ValueError(f"Unknown LLM provider: {self.provider}. Supported: 'openai', 'anthropic', 'google'")
@@ -38,8 +41,8 @@ class LLMService:
         num_questions: int = 1,
     ) -> List[Dict[str, Any]]:
         """Generate assessment questions from text chunks."""
-        # Combine chunks into context
-        context = "\n\n".join(chunks)
+        # Combine chunks into context, up to the prompt budget
+        context = self._build_context(chunks)
         
         # Build prompt based on question type
         if question_type == "mcq":
@@ -59,6 +62,17 @@ class LLMService:
         
         return questions
     
+    def _build_context(self, chunks: List[str]) -> str:
+        """Join chunks in order until LLM_CONTEXT_TOKENS (estimated) is reached; the first is always kept."""
+        selected = []
+        tokens = 0
+        for chunk in chunks:
+            tokens += approx_token_count(chunk)
+            if selected and tokens > settings.LLM_CONTEXT_TOKENS:
+                break
+            selected.append(chunk)
+        return "\n\n".join(selected)
+    
     def _build_mcq_prompt(self, context: str, difficulty: str, num_questions: int) -> str:
         """Build prompt for MCQ generation."""
         return f"""Generate {num_questions} multiple-choice question(s) from the following text. 
@@ -203,6 +217,10 @@ Only return the JSON, no additional text."""
 
     async def _call_llm(self, prompt: str) -> str:
         """Call the LLM with a prompt."""
+        with track_dependency("llm", "generate", f"{self.provider}/{self.model}"):
+            return await self._call_provider(prompt)
+    
+    async def _call_provider(self, prompt: str) -> str:
         if self.provider == "openai":
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -0,0 +1,69 @@
+"""Event-loop lag monitoring."""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+class EventLoopLagMonitor:
+    """Measure how late the event loop wakes up a periodic probe task.
+
+    Any blocking call on the loop (e.g. synchronous network I/O inside an
+    async handler) shows up directly as lag.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        window: int = 1200,
+        observer: Optional[Callable[[float], None]] = None,
+    ):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        # Also called with every sample (e.g. a metrics histogram's observe)
+        self.observer = observer
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start probing on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - start - self.interval))
+
+    def record(self, lag: float) -> None:
+        """Record one lag sample in seconds."""
+        self.samples.append(lag)
+        if self.observer is not None:
+            self.observer(lag)
+
+    def reset(self) -> None:
+        """Drop all recorded samples."""
+        self.samples.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Lag percentiles over the recorded window, in milliseconds."""
+        if not self.samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {
+            "samples": len(ordered),
+            "p50_ms": ordered[int(last * 0.50)] * 1000,
+            "p99_ms": ordered[int(last * 0.99)] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
@@ -0,0 +1,59 @@
+"""One-off data maintenance jobs."""
+from typing import Dict, Optional, Set, Tuple
+from app.models import Attempt, Question
+from app.services.analytics_aggregates import invalidate_aggregate
+from app.services.analytics_cache import get_analytics_cache
+
+# Firestore allows at most 500 writes per batch
+BATCH_SIZE = 500
+
+
+async def backfill_attempt_document_ids(db, user_id: Optional[str] = None) -> int:
+    """Set document_id on attempts written before it was denormalized.
+
+    Document aggregates built before the backfill read only the attempts
+    that already had a document_id, so those of the updated attempts are
+    marked incomplete and rebuilt on their next read.
+
+    Returns the number of attempts updated.
+    """
+    attempts_query = db.collection(Attempt.collection_name())
+    if user_id:
+        attempts_query = attempts_query.where("user_id", "==", user_id)
+
+    question_documents: Dict[str, Optional[str]] = {}
+    touched: Set[Tuple[str, str]] = set()
+    batch = db.batch()
+    pending = 0
+    updated = 0
+    async for attempt_doc in attempts_query.stream():
+        attempt_data = attempt_doc.to_dict()
+        if attempt_data.get("document_id"):
+            continue
+        question_id = str(attempt_data.get("question_id", ""))
+        if question_id not in question_documents:
+            q_doc = await db.collection(Question.collection_name()).document(question_id).get()
+            question_documents[question_id] = q_doc.to_dict().get("document_id") if q_doc.exists else None
+        document_id = question_documents[question_id]
+        if not document_id:
+            # Question was deleted; the attempt can no longer be scoped to a document
+            continue
+
+        batch.update(attempt_doc.reference, {"document_id": str(document_id)})
+        touched.add((str(attempt_data.get("user_id", "")), str(document_id)))
+        pending += 1
+        updated += 1
+        if pending >= BATCH_SIZE:
+            await batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        await batch.commit()
+
+    # Only after the commits, so a refresh that read the old attempts fails its precondition
+    for attempt_user_id, document_id in touched:
+        await invalidate_aggregate(db, attempt_user_id, document_id)
+    for attempt_user_id in {attempt_user_id for attempt_user_id, _ in touched}:
+        await get_analytics_cache().invalidate_user(attempt_user_id)
+    return updated
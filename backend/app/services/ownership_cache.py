@@ -0,0 +1,72 @@
+"""Document ownership cache.
+
+A document's owner never changes, so once read it can be cached for the
+life of the process and ownership checks skip the ``documents/{id}`` read.
+Missing documents are cached as well, for a short TTL, so repeated requests
+for unknown IDs do not each cost a read.
+
+The cache is per worker: deleting a document invalidates it only in the
+worker that handled the delete. A stale entry elsewhere still names the
+right owner, so it can never grant access to another user's data.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from app.config import settings
+
+
+class OwnershipCache:
+    """Bounded LRU of document ID -> owner user ID (None for missing documents)."""
+
+    def __init__(self, max_entries: int, negative_ttl: int):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, document_id: Any) -> Tuple[bool, Optional[str]]:
+        """Return (known, owner); owner is None for a cached missing document."""
+        key = str(document_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            owner, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, owner
+
+    def remember(self, document_id: Any, owner: Optional[str]) -> None:
+        """Cache a document's owner, or None if the document does not exist."""
+        expires_at = None if owner else time.monotonic() + self.negative_ttl
+        with self._lock:
+            self._entries[str(document_id)] = (owner or None, expires_at)
+            self._entries.move_to_end(str(document_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, document_id: Any) -> None:
+        """Drop a document from the cache (e.g. after deleting it)."""
+        with self._lock:
+            self._entries.pop(str(document_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_ownership_cache: Optional[OwnershipCache] = None
+
+
+def get_ownership_cache() -> OwnershipCache:
+    """Get the process-wide ownership cache."""
+    global _ownership_cache
+    if _ownership_cache is None:
+        _ownership_cache = OwnershipCache(
+            settings.OWNERSHIP_CACHE_MAX_ENTRIES,
+            settings.OWNERSHIP_CACHE_NEGATIVE_TTL,
+        )
+    return _ownership_cache
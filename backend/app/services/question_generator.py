@@ -1,18 +1,22 @@
 """Question generation service."""
-from typing import List
+import asyncio
+from typing import List, Optional
 from uuid import UUID
-from app.models import Question, Chunk, Document
+from app.models import Question, Document
 from app.services.llm_service import LLMService
 from app.database import get_firestore
+from app.repository import Repository
 from app.schemas import QuestionType, Difficulty
+from app.services.text_store import load_document_text_range
 
 
 class QuestionGenerator:
     """Generate assessment questions from documents."""
     
-    def __init__(self):
-        self.llm_service = LLMService()
-        self.db = get_firestore()
+    def __init__(self, repo: Optional[Repository] = None, llm_service: Optional[LLMService] = None):
+        self.llm_service = llm_service or LLMService()
+        self.repo = repo or Repository(get_firestore())
+        self.db = self.repo.db
     
     async def generate_questions(
         self,
@@ -22,39 +26,32 @@ class QuestionGenerator:
         num_questions: int,
     ) -> List[Question]:
         """Generate questions for a document."""
-        # Get document chunks from Firestore
-        # Note: Using simple query without order_by to avoid requiring composite index
-        chunks_query = self.db.collection(Chunk.collection_name()).where(
-            "document_id", "==", document_id
-        )
-        
-        chunks_docs = list(chunks_query.stream())
-        
-        # Sort chunks by chunk_index in memory (avoids requiring Firestore composite index)
-        chunks_docs.sort(key=lambda doc: doc.to_dict().get("chunk_index", 0))
+        # Get document chunks (ordered by chunk_index; served from the
+        # request's identity map when the router already loaded them)
+        chunks = await self.repo.list_chunks(document_id)
         
-        if not chunks_docs:
+        if not chunks:
             raise ValueError("No chunks found for document. The document may not have been processed successfully or contains no extractable text.")
         
         # Get chunk texts
         chunk_texts = []
         valid_chunk_ids = []
-        for chunk_doc in chunks_docs:
-            chunk_data = chunk_doc.to_dict()
-            if chunk_data.get("chunk_text"):
-                chunk_texts.append(chunk_data["chunk_text"])
-                valid_chunk_ids.append(chunk_doc.id)
+        for chunk in chunks:
+            if getattr(chunk, "chunk_text", None):
+                chunk_texts.append(chunk.chunk_text)
+                valid_chunk_ids.append(str(chunk.chunk_id))
             else:
-                # Fallback: get from document
-                doc_ref = self.db.collection(Document.collection_name()).document(document_id)
-                doc = doc_ref.get()
-                if doc.exists:
-                    doc_data = doc.to_dict()
-                    start_char = chunk_data.get("start_char", 0)
-                    end_char = chunk_data.get("end_char", 0)
-                    chunk_text = doc_data.get("extracted_text", "")[start_char:end_char]
+                # Fallback: get from document (read once per request via the identity map)
+                doc_data = await self.repo.get_data(Document.collection_name(), document_id)
+                if doc_data is not None:
+                    chunk_text = await asyncio.to_thread(
+                        load_document_text_range,
+                        doc_data,
+                        getattr(chunk, "start_char", 0),
+                        getattr(chunk, "end_char", 0),
+                    )
                     chunk_texts.append(chunk_text)
-                    valid_chunk_ids.append(chunk_doc.id)
+                    valid_chunk_ids.append(str(chunk.chunk_id))
         
         if not chunk_texts:
             raise ValueError("Could not retrieve chunk texts. The document chunks may be corrupted or missing text content.")
@@ -68,6 +65,7 @@ class QuestionGenerator:
         )
         
         # Create question records in Firestore
+        owner = await self.repo.document_owner(document_id)
         created_questions = []
         for q_data in questions_data:
             # Use first few chunks for association
@@ -75,6 +73,7 @@ class QuestionGenerator:
             
             question = Question(
                 document_id=UUID(document_id),
+                user_id=owner or "",
                 question_type=question_type,
                 difficulty=difficulty,
                 question_text=q_data.get("question_text", ""),
@@ -86,7 +85,7 @@ class QuestionGenerator:
             
             # Save to Firestore
             q_ref = self.db.collection(Question.collection_name()).document(str(question.question_id))
-            q_ref.set(question.to_dict())
+            await q_ref.set(question.to_dict())
             
             created_questions.append(question)
         
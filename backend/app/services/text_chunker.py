@@ -1,7 +1,15 @@
 """Text chunking service."""
-from typing import List, Dict
-import tiktoken
+from typing import Dict, Iterable, Iterator, List, Tuple
 from app.config import settings
+from app.services.tokenizer import get_encoding
+
+# UTF-8 continuation bytes (10xxxxxx)
+CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+
+def _char_count(data: bytes) -> int:
+    """Characters starting in a run of UTF-8 bytes."""
+    return len(data.translate(None, CONTINUATION_BYTES))
 
 
 class TextChunker:
@@ -10,55 +18,52 @@ class TextChunker:
     def __init__(self):
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = int(settings.CHUNK_SIZE * settings.CHUNK_OVERLAP)
-        # Use cl100k_base encoding (used by GPT models)
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+        # cl100k_base by default (used by GPT models); loaded once per process
+        # from the pre-seeded tokenizer cache
+        self.encoding = get_encoding()
     
     def chunk_text(self, text: str) -> List[Dict[str, any]]:
         """Chunk text into overlapping segments."""
-        # Encode text to tokens
-        tokens = self.encoding.encode(text)
+        return list(self.chunk_stream([text]))
+    
+    def chunk_stream(self, pieces: Iterable[str]) -> Iterator[Dict[str, any]]:
+        """Chunk text given as consecutive pieces, yielding each chunk once complete.
         
-        chunks = []
-        start_idx = 0
+        Pieces are tokenized one at a time and only the tokens of the chunk
+        being built are kept, so text can be chunked while it is extracted.
+        Pieces that end at line breaks of cleaned text (no blank lines, no
+        leading whitespace) tokenize exactly like the joined text, so the
+        chunks are the same as ``chunk_text`` of the whole.
+        """
+        stride = self.chunk_size - self.chunk_overlap
+        # Tokens from the start of the next chunk, and its character position
+        tokens: List[int] = []
+        start_char = 0
         
-        while start_idx < len(tokens):
-            # Calculate end index
-            end_idx = min(start_idx + self.chunk_size, len(tokens))
-            
-            # Decode chunk
-            chunk_tokens = tokens[start_idx:end_idx]
-            chunk_text = self.encoding.decode(chunk_tokens)
-            
-            # Calculate character positions (approximate)
-            char_start = self._token_to_char_position(text, start_idx)
-            char_end = self._token_to_char_position(text, end_idx)
-            
-            chunks.append({
-                "text": chunk_text,
-                "start_char": char_start,
-                "end_char": char_end,
-                "token_count": len(chunk_tokens),
-            })
-            
-            # Move start index with overlap
-            start_idx += self.chunk_size - self.chunk_overlap
-            
-            # Break if we've reached the end
-            if end_idx >= len(tokens):
-                break
+        for piece in pieces:
+            tokens.extend(self.encoding.encode(piece))
+            # A chunk is only final once tokens past its end have arrived
+            while len(tokens) > self.chunk_size:
+                chunk, start_char = self._chunk(tokens, start_char, stride)
+                yield chunk
+                del tokens[:stride]
         
-        return chunks
+        if tokens:
+            chunk, _ = self._chunk(tokens, start_char, stride)
+            yield chunk
     
-    def _token_to_char_position(self, text: str, token_index: int) -> int:
-        """Approximate character position from token index."""
-        # Simple approximation: assume average token length
-        # More accurate would require encoding up to that point
-        tokens = self.encoding.encode(text)
-        if token_index >= len(tokens):
-            return len(text)
-        
-        # Encode up to token_index and get length
-        partial_tokens = tokens[:token_index]
-        partial_text = self.encoding.decode(partial_tokens)
-        return len(partial_text)
-
+    def _chunk(self, tokens: List[int], start_char: int, stride: int) -> Tuple[Dict[str, any], int]:
+        """The chunk at the start of ``tokens``, and the character position of the next one."""
+        chunk_tokens = tokens[:self.chunk_size]
+        data = self.encoding.decode_bytes(chunk_tokens)
+        # Positions count characters starting before a token boundary, which
+        # is what decoding the tokens up to it gives (a split character
+        # decodes to one replacement character)
+        next_bytes = len(self.encoding.decode_bytes(tokens[:stride])) if len(tokens) > stride else len(data)
+        chunk = {
+            "text": data.decode("utf-8", errors="replace"),
+            "start_char": start_char,
+            "end_char": start_char + _char_count(data),
+            "token_count": len(chunk_tokens),
+        }
+        return chunk, start_char + _char_count(data[:next_bytes])
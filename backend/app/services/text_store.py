@@ -0,0 +1,171 @@
+"""Compressed storage for extracted document text.
+
+Text is stored outside Firestore as a framed blob: the text is split into
+fixed-size character frames that are compressed independently, so a
+character range can be served by downloading only the frames it touches.
+
+Layout: header | frame end offsets (uint64 each) | compressed frames
+"""
+import gzip
+import hashlib
+import struct
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.services.blob_store import BlobStore, get_blob_store
+
+# Try to import zstandard, fallback to gzip if not available
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MAGIC = b"LLTX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">4sBBIIQ")  # magic, version, codec, frame_chars, n_frames, total_chars
+OFFSET = struct.Struct(">Q")
+
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {"gzip": CODEC_GZIP, "zstd": CODEC_ZSTD}
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Text blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class DocumentTextStore:
+    """Store and load extracted document text as compressed blobs."""
+
+    def __init__(self, blob_store: Optional[BlobStore] = None):
+        self.blob_store = blob_store or get_blob_store()
+        self.frame_chars = settings.TEXT_FRAME_CHARS
+        codec_name = settings.TEXT_COMPRESSION
+        if codec_name not in CODEC_NAMES:
+            raise ValueError(f"Unknown text compression: {codec_name}. Supported: 'gzip', 'zstd'")
+        if codec_name == "zstd" and not ZSTD_AVAILABLE:
+            print("Warning: zstandard not installed, storing document text with gzip instead.")
+            codec_name = "gzip"
+        self.codec = CODEC_NAMES[codec_name]
+
+    @staticmethod
+    def blob_key(document_id: str) -> str:
+        """Blob key for a document's text."""
+        return f"documents/{document_id}/text.lltx"
+
+    def save(self, document_id: str, text: str) -> Dict[str, Any]:
+        """Store text and return the reference fields for the document record."""
+        raw = text.encode("utf-8")
+        frames: List[bytes] = []
+        offsets: List[int] = []
+        position = 0
+        for start in range(0, len(text), self.frame_chars):
+            frame = _compress(text[start:start + self.frame_chars].encode("utf-8"), self.codec)
+            frames.append(frame)
+            position += len(frame)
+            offsets.append(position)
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.codec, self.frame_chars, len(frames), len(text))
+        blob = header + b"".join(OFFSET.pack(o) for o in offsets) + b"".join(frames)
+
+        key = self.blob_key(document_id)
+        self.blob_store.put(key, blob)
+        return {
+            "text_ref": key,
+            "text_size": len(raw),
+            "text_sha256": hashlib.sha256(raw).hexdigest(),
+        }
+
+    def _read_index(self, key: str):
+        """Read the header and frame offset table of a blob."""
+        magic, version, codec, frame_chars, n_frames, total_chars = HEADER.unpack(
+            self.blob_store.get_range(key, 0, HEADER.size)
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unrecognized text blob format: {key}")
+        table = self.blob_store.get_range(key, HEADER.size, HEADER.size + OFFSET.size * n_frames)
+        offsets = [OFFSET.unpack_from(table, i * OFFSET.size)[0] for i in range(n_frames)]
+        data_start = HEADER.size + OFFSET.size * n_frames
+        return codec, frame_chars, total_chars, offsets, data_start
+
+    def load(self, text_ref: str) -> str:
+        """Load the full text of a blob."""
+        blob = self.blob_store.get(text_ref)
+        magic, version, codec, _, n_frames, _ = HEADER.unpack_from(blob, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unrecognized text blob format: {text_ref}")
+        data_start = HEADER.size + OFFSET.size * n_frames
+        parts = []
+        previous = 0
+        for i in range(n_frames):
+            end = OFFSET.unpack_from(blob, HEADER.size + i * OFFSET.size)[0]
+            parts.append(_decompress(blob[data_start + previous:data_start + end], codec).decode("utf-8"))
+            previous = end
+        return "".join(parts)
+
+    def load_range(self, text_ref: str, start_char: int, end_char: int) -> str:
+        """Load text[start_char:end_char] reading only the frames it covers."""
+        codec, frame_chars, total_chars, offsets, data_start = self._read_index(text_ref)
+        start_char = max(0, start_char)
+        end_char = min(end_char, total_chars)
+        if end_char <= start_char:
+            return ""
+
+        first = start_char // frame_chars
+        last = (end_char - 1) // frame_chars
+        byte_start = offsets[first - 1] if first > 0 else 0
+        data = self.blob_store.get_range(
+            text_ref, data_start + byte_start, data_start + offsets[last]
+        )
+
+        parts = []
+        previous = byte_start
+        for i in range(first, last + 1):
+            frame = data[previous - byte_start:offsets[i] - byte_start]
+            parts.append(_decompress(frame, codec).decode("utf-8"))
+            previous = offsets[i]
+        text = "".join(parts)
+        offset = first * frame_chars
+        return text[start_char - offset:end_char - offset]
+
+    def delete(self, text_ref: str) -> None:
+        """Delete a text blob."""
+        self.blob_store.delete(text_ref)
+
+
+_text_store: Optional[DocumentTextStore] = None
+
+
+def get_text_store() -> DocumentTextStore:
+    """Get the process-wide document text store."""
+    global _text_store
+    if _text_store is None:
+        _text_store = DocumentTextStore()
+    return _text_store
+
+
+def load_document_text(doc_data: dict) -> str:
+    """Load a document's full text from its Firestore record."""
+    text_ref = doc_data.get("text_ref")
+    if text_ref:
+        return get_text_store().load(text_ref)
+    # Documents created before external storage keep the text inline
+    return doc_data.get("extracted_text", "") or ""
+
+
+def load_document_text_range(doc_data: dict, start_char: int, end_char: int) -> str:
+    """Load a character range of a document's text from its Firestore record."""
+    text_ref = doc_data.get("text_ref")
+    if text_ref:
+        return get_text_store().load_range(text_ref, start_char, end_char)
+    return (doc_data.get("extracted_text", "") or "")[start_char:end_char]
@@ -0,0 +1,178 @@
+"""Cached Firebase ID-token verification.
+
+Verifying an ID token means an RSA signature check against Google's public
+certificates, which the Admin SDK fetches over HTTP whenever its cached copy
+expires. Verified tokens are cached (by hash) until shortly before they
+expire, and the certificates are refreshed in the background so a request
+never waits on a certificate download.
+"""
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import firebase_admin
+from firebase_admin import auth
+from app.config import settings
+from app.metrics import AUTH_LATENCY, track_dependency
+
+# Public certificates used to sign Firebase ID tokens
+ID_TOKEN_CERT_URI = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/"
+    "securetoken@system.gserviceaccount.com"
+)
+
+
+class TokenCache:
+    """Bounded LRU of verified token claims keyed by token hash."""
+
+    def __init__(self, max_entries: int, expiry_margin: int):
+        self.max_entries = max_entries
+        self.expiry_margin = expiry_margin
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # Tokens are bearer credentials, so only their hash is kept in memory
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        expires_at = float(claims.get("exp", 0)) - self.expiry_margin
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def firebase_app_initialized() -> bool:
+    """Whether the default Firebase app exists, i.e. tokens can be verified at all."""
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        return False
+    return True
+
+
+class PrefetchUnsupported(Exception):
+    """The installed Admin SDK does not expose the transport the prefetcher refreshes."""
+
+
+class CertificatePrefetcher:
+    """Keep the Admin SDK's certificate cache warm from a background task.
+
+    The SDK caches the certificates according to the response's
+    Cache-Control max-age; refetching (bypassing that cache) well before the
+    max-age elapses means verification always finds fresh certificates.
+
+    The cache is private SDK state (checked against firebase-admin 7.x, see
+    requirements.txt). If a release no longer has it, prefetching stops
+    and the SDK fetches certificates on demand as it would without it.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _sdk_request():
+        """The HTTP transport whose cache the SDK's token verifier reads from."""
+        get_client = getattr(auth, "_get_client", None)
+        # Raises ValueError while Firebase is not initialized; that is retried
+        client = get_client(None) if get_client is not None else None
+        request = getattr(getattr(client, "_token_verifier", None), "request", None)
+        if not callable(request):
+            raise PrefetchUnsupported(
+                "firebase-admin does not expose its token verifier's certificate transport"
+            )
+        return request
+
+    def fetch(self) -> float:
+        """Refetch the certificates now; returns seconds until the next refresh."""
+        response = self._sdk_request()(
+            url=ID_TOKEN_CERT_URI,
+            method="GET",
+            headers={"Cache-Control": "no-cache"},
+        )
+        if response.status != 200:
+            raise RuntimeError(f"Certificate fetch returned HTTP {response.status}")
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        if match:
+            # Refresh at half the max-age so a slow or failed refresh still has slack
+            return max(60, min(self.interval, int(match.group(1)) // 2))
+        return self.interval
+
+    def start(self) -> None:
+        """Start refreshing on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delay = await asyncio.to_thread(self.fetch)
+            except PrefetchUnsupported as e:
+                print(f"Certificate prefetch disabled: {e}; certificates are fetched on demand")
+                return
+            except Exception as e:
+                print(f"Certificate prefetch failed: {e}")
+                delay = 60
+            await asyncio.sleep(delay)
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_MAX_ENTRIES, settings.AUTH_TOKEN_CACHE_MARGIN)
+certificate_prefetcher = CertificatePrefetcher(settings.AUTH_CERT_REFRESH_INTERVAL)
+
+
+async def verify_id_token(token: str) -> dict:
+    """Verify a Firebase ID token, serving recently verified tokens from memory."""
+    start = time.perf_counter()
+    claims = token_cache.get(token)
+    if claims is not None:
+        AUTH_LATENCY.labels("hit").observe(time.perf_counter() - start)
+        return claims
+    # Verification runs in a worker thread so a certificate download (if the
+    # prefetcher has not run yet) never blocks the event loop.
+    # Clock skew tolerance (60 seconds max) handles clock differences
+    # between client and server
+    try:
+        with track_dependency("firebase_auth", "verify_id_token"):
+            claims = await asyncio.to_thread(auth.verify_id_token, token, clock_skew_seconds=60)
+    except Exception:
+        AUTH_LATENCY.labels("failure").observe(time.perf_counter() - start)
+        raise
+    token_cache.set(token, claims)
+    AUTH_LATENCY.labels("miss").observe(time.perf_counter() - start)
+    return claims
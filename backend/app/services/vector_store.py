@@ -1,8 +1,11 @@
 """Pinecone vector database service."""
 from typing import List, Dict, Optional, Any
 from uuid import UUID, uuid4
-from pinecone import Pinecone, ServerlessSpec
 from app.config import settings
+from app.metrics import track_dependency
+
+# Pinecone deletes at most 1000 IDs per request
+DELETE_BATCH_SIZE = 1000
 
 
 class VectorStore:
@@ -19,6 +22,8 @@ class VectorStore:
             )
         
         try:
+            # Imported on first use to keep worker startup light
+            from pinecone import Pinecone, ServerlessSpec
             pc = Pinecone(api_key=settings.PINECONE_API_KEY)
             index_name = settings.PINECONE_INDEX_NAME
             
@@ -97,18 +102,19 @@ class VectorStore:
         if embedding is None:
             raise ValueError("Pinecone requires embeddings. Use embedding service to generate.")
         
-        self.index.upsert(
-            vectors=[{
-                "id": str(chunk_id),
-                "values": embedding,
-                "metadata": {
-                    **metadata,
-                    "document_id": str(document_id),
-                    "text": text,
-                    "chunk_id": str(chunk_id),
-                },
-            }]
-        )
+        with track_dependency("pinecone", "upsert", settings.PINECONE_INDEX_NAME):
+            self.index.upsert(
+                vectors=[{
+                    "id": str(chunk_id),
+                    "values": embedding,
+                    "metadata": {
+                        **metadata,
+                        "document_id": str(document_id),
+                        "text": text,
+                        "chunk_id": str(chunk_id),
+                    },
+                }]
+            )
         
         return chunk_id
     
@@ -131,12 +137,13 @@ class VectorStore:
                 raise ValueError("Pinecone requires query_embedding or query_text with embedding service configured.")
         
         filter_dict = {"document_id": str(document_id)} if document_id else None
-        results = self.index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True,
-            filter=filter_dict,
-        )
+        with track_dependency("pinecone", "query", settings.PINECONE_INDEX_NAME):
+            results = self.index.query(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True,
+                filter=filter_dict,
+            )
         
         chunks = []
         for match in results.matches:
@@ -150,4 +157,17 @@ class VectorStore:
     
     async def delete_document(self, document_id: UUID):
         """Delete all chunks for a document."""
-        self.index.delete(filter={"document_id": str(document_id)})
+        with track_dependency("pinecone", "delete", settings.PINECONE_INDEX_NAME):
+            self.index.delete(filter={"document_id": str(document_id)})
+    
+    async def delete_chunks(self, chunk_ids: List[UUID]):
+        """Delete individual chunks by ID."""
+        ids = [str(chunk_id) for chunk_id in chunk_ids]
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            with track_dependency("pinecone", "delete", settings.PINECONE_INDEX_NAME):
+                self.index.delete(ids=ids[i:i + DELETE_BATCH_SIZE])
+    
+    async def update_metadata(self, chunk_id: UUID, metadata: Dict[str, Any]):
+        """Overwrite metadata fields of a stored chunk, keeping its vector."""
+        with track_dependency("pinecone", "update", settings.PINECONE_INDEX_NAME):
+            self.index.update(id=str(chunk_id), set_metadata=metadata)
@@ -0,0 +1,213 @@
+"""Span-style tracing.
+
+    with span("extract", document_id=document_id, bytes=len(content)) as s:
+        text = extract(content)
+        s.set(pages=page_count)
+
+Spans nest through a context variable (which follows the request's task and
+``asyncio.to_thread`` calls). Finished spans are appended to TRACE_FILE, one
+JSON object per line, by a background thread so the event loop never waits
+on the disk; with TRACE_OTEL they are also exported through the
+OpenTelemetry API, which must then be installed and configured by the host.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from app.config import settings
+
+
+class Span:
+    """One timed operation and its attributes."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "error", "_otel")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._otel = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add or replace attributes."""
+        self.attributes.update(attributes)
+        if self._otel is not None:
+            self._otel.set_attributes(_otel_attributes(attributes))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is disabled."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+_CLOSE = object()
+
+
+class JsonlTraceSink:
+    """Append finished spans to a JSONL file from a background thread.
+
+    write() only queues the record. While ``max_pending`` records are
+    waiting (the disk cannot keep up) further spans are dropped and counted
+    in ``dropped`` rather than slowing down requests.
+    """
+
+    def __init__(self, path: str, max_pending: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-sink", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        file = None
+        while True:
+            records = [self._queue.get()]
+            # Everything queued meanwhile goes out in the same write
+            while len(records) < 1000:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = any(record is _CLOSE for record in records)
+            spans = [record for record in records if record is not _CLOSE]
+            try:
+                if spans:
+                    if file is None:
+                        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                        file = open(self.path, "a", encoding="utf-8")
+                    file.write("".join(json.dumps(record, default=str) + "\n" for record in spans))
+                    file.flush()
+            except OSError as e:
+                print(f"Error writing {len(spans)} trace span(s): {e}")
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+            if closing:
+                if file is not None:
+                    file.close()
+                return
+
+    def flush(self) -> None:
+        """Wait until every queued span has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the queued spans and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_CLOSE)
+            thread.join()
+
+
+_sink: Optional[JsonlTraceSink] = None
+_otel_tracer = None
+_otel_checked = False
+
+
+def get_trace_sink() -> Optional[JsonlTraceSink]:
+    """The JSONL sink, or None when TRACE_FILE is empty."""
+    global _sink
+    if _sink is None and settings.TRACE_FILE:
+        _sink = JsonlTraceSink(settings.TRACE_FILE)
+        # Spans still queued at exit are written before the process ends
+        atexit.register(_sink.close)
+    return _sink
+
+
+def _get_otel_tracer():
+    global _otel_tracer, _otel_checked
+    if not _otel_checked:
+        _otel_checked = True
+        try:
+            from opentelemetry import trace
+            _otel_tracer = trace.get_tracer("learnlens")
+        except ImportError:
+            print("Warning: TRACE_OTEL is set but opentelemetry-api is not installed. Spans go to TRACE_FILE only.")
+    return _otel_tracer
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    # OpenTelemetry accepts only primitive attribute values
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+def current_span():
+    """The innermost active span (a no-op span outside of any)."""
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time the enclosed block as a child of the current span."""
+    if not settings.TRACING_ENABLED:
+        yield NOOP_SPAN
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    tracer = _get_otel_tracer() if settings.TRACE_OTEL else None
+    otel_context = tracer.start_as_current_span(name, attributes=_otel_attributes(attributes)) if tracer else None
+    if otel_context is not None:
+        current._otel = otel_context.__enter__()
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        if otel_context is not None:
+            if current.error:
+                current._otel.set_attribute("error", current.error)
+            otel_context.__exit__(None, None, None)
+        sink = get_trace_sink()
+        if sink is not None:
+            sink.write(current.to_dict())
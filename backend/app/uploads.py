@@ -0,0 +1,121 @@
+"""Size-limited, spooled file uploads.
+
+Starlette writes each uploaded file to a SpooledTemporaryFile, which stays
+in memory up to UPLOAD_SPOOL_BYTES and then moves to a temporary file on
+disk. Handlers pass that file on instead of reading it into ``bytes``, and
+extractors read from it directly (or from a read-only memory map), so a
+large upload costs disk space rather than worker memory.
+
+UploadSizeLimitMiddleware rejects request bodies larger than
+MAX_UPLOAD_BYTES: at once when Content-Length is too large, and otherwise
+as soon as the received body passes the limit, before it is spooled.
+"""
+import io
+import mmap
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Union
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.formparsers import MultiPartParser
+from app.config import settings
+
+# Uploaded files are spooled to disk above this size
+MultiPartParser.spool_max_size = settings.UPLOAD_SPOOL_BYTES
+
+# An upload's content: bytes, or the (spooled) file it was received into
+Content = Union[bytes, BinaryIO]
+
+
+def _format_size(size: int) -> str:
+    """A byte count in MB, KB or bytes, with at most one decimal."""
+    for unit, scale in (("MB", 1024 * 1024), ("KB", 1024)):
+        if size >= scale:
+            return f"{round(size / scale, 1):g} {unit}"
+    return f"{size} bytes"
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"Upload too large. Maximum size is {_format_size(max_bytes)}"
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies larger than ``max_bytes`` (413)."""
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": _too_large(self.max_bytes)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside body parsing, where it becomes the response
+                    raise HTTPException(status_code=413, detail=_too_large(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def content_size(content: Content) -> int:
+    """Size of an upload in bytes."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return len(content)
+    content.seek(0, io.SEEK_END)
+    size = content.tell()
+    content.seek(0)
+    return size
+
+
+def content_stream(content: Content) -> BinaryIO:
+    """A readable binary stream over an upload, positioned at the start."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        # BytesIO shares the bytes' buffer instead of copying it
+        return io.BytesIO(content)
+    content.seek(0)
+    return content
+
+
+def _on_disk(file: BinaryIO) -> bool:
+    rolled = getattr(file, "_rolled", None)
+    if rolled is not None:
+        # SpooledTemporaryFile: fileno() would move an in-memory file to disk
+        return rolled
+    try:
+        file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+    return True
+
+
+@contextmanager
+def content_view(content: Content) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Read-only bytes-like view of an upload.
+
+    Files on disk are memory-mapped, so decoding one reads the pages from
+    the page cache instead of first copying the file into the heap. Files
+    still in memory are at most UPLOAD_SPOOL_BYTES and are read.
+    """
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        yield content
+        return
+    if not _on_disk(content) or content_size(content) == 0:
+        yield content_stream(content).read()
+        return
+    content.flush()
+    with mmap.mmap(content.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        yield view
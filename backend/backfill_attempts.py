@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""Backfill document_id on attempts created before it was stored."""
+import argparse
+import asyncio
+from app.database import get_firestore
+from app.services.maintenance import backfill_attempt_document_ids
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", help="Only backfill attempts of this user ID")
+    args = parser.parse_args()
+
+    updated = asyncio.run(backfill_attempt_document_ids(get_firestore(), user_id=args.user))
+    print(f"Backfilled document_id on {updated} attempt(s).")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Benchmark the vectorized analytics engine against the per-object loops.
+
+Run from the backend directory:
+    python -m benchmarks.analytics_benchmark [--sizes 1000 100000 1000000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+from app.models import Attempt, Question, Difficulty
+from app.services.analytics_engine import AttemptColumns, compute_analytics
+
+
+def generate_data(num_attempts: int, num_questions: int = 500, num_documents: int = 20, seed: int = 42):
+    """Generate synthetic raw Firestore attempt and question dicts."""
+    rng = random.Random(seed)
+    document_ids = [str(uuid4()) for _ in range(num_documents)]
+    questions = {}
+    for _ in range(num_questions):
+        q_id = str(uuid4())
+        questions[q_id] = {
+            "question_id": q_id,
+            "document_id": rng.choice(document_ids),
+            "question_type": "mcq",
+            "difficulty": rng.choice([d.value for d in Difficulty]),
+            "question_text": "Question?",
+            "correct_answer": "A",
+            "options": ["a", "b", "c", "d"],
+            "chunk_ids": [],
+            "created_at": datetime(2024, 1, 1),
+        }
+    question_ids = list(questions)
+    now = datetime.now(timezone.utc)
+    records = []
+    for _ in range(num_attempts):
+        records.append({
+            "attempt_id": str(uuid4()),
+            "user_id": "bench-user",
+            "question_id": rng.choice(question_ids),
+            "user_answer": "A",
+            "is_correct": rng.random() < 0.7,
+            "score": rng.random(),
+            "time_taken": rng.choice([None, rng.uniform(5, 120)]),
+            "attempted_at": now - timedelta(seconds=rng.uniform(0, 90 * 86400)),
+        })
+    return records, questions
+
+
+def legacy_analytics(records, questions):
+    """The original per-object analytics loops, kept as the baseline."""
+    attempts = []
+    for record in records:
+        data = dict(record)
+        data["attempt_id"] = UUID(data["attempt_id"])
+        attempts.append(Attempt.from_dict(data))
+    questions_dict = {}
+    for q_id in {str(a.question_id) for a in attempts}:
+        if q_id in questions:
+            q_data = dict(questions[q_id])
+            q_data["question_id"] = UUID(q_id)
+            questions_dict[q_id] = Question.from_dict(q_data)
+
+    total = len(attempts)
+    correct = sum(1 for a in attempts if a.is_correct)
+    difficulty_stats = {}
+    for attempt in attempts:
+        question = questions_dict.get(str(attempt.question_id))
+        if not question:
+            continue
+        stats = difficulty_stats.setdefault(question.difficulty.value, {"total": 0, "correct": 0, "times": []})
+        stats["total"] += 1
+        if attempt.is_correct:
+            stats["correct"] += 1
+        if attempt.time_taken:
+            stats["times"].append(attempt.time_taken)
+    topic_stats = {"General": {"total": 0, "correct": 0}}
+    for attempt in attempts:
+        if questions_dict.get(str(attempt.question_id)):
+            topic_stats["General"]["total"] += 1
+            if attempt.is_correct:
+                topic_stats["General"]["correct"] += 1
+    times = [a.time_taken for a in attempts if a.time_taken]
+    start_date = datetime.now(timezone.utc) - timedelta(days=30)
+    date_accuracy = {}
+    for attempt in attempts:
+        if attempt.attempted_at >= start_date:
+            stats = date_accuracy.setdefault(attempt.attempted_at.date().isoformat(), {"total": 0, "correct": 0})
+            stats["total"] += 1
+            if attempt.is_correct:
+                stats["correct"] += 1
+    return {
+        "total_attempts": total,
+        "overall_accuracy": correct / total if total else 0.0,
+        "difficulty_stats": difficulty_stats,
+        "avg_time_per_question": sum(times) / len(times) if times else None,
+        "progress_days": len(date_accuracy),
+    }
+
+
+def vectorized_analytics(records, questions):
+    """Columnar load plus a single vectorized pass."""
+    return compute_analytics(AttemptColumns.from_records(records, questions))
+
+
+def _time(func, *args, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'attempts':>10} {'legacy (s)':>12} {'load (s)':>10} {'compute (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for size in args.sizes:
+        records, questions = generate_data(size)
+        repeat = args.repeat if size <= 100_000 else 1
+
+        legacy_time, legacy = _time(legacy_analytics, records, questions, repeat=repeat)
+        load_time, columns = _time(AttemptColumns.from_records, records, questions, repeat=repeat)
+        compute_time, result = _time(compute_analytics, columns, repeat=repeat)
+        vector_time = load_time + compute_time
+
+        assert result.total_attempts == legacy["total_attempts"]
+        assert abs(result.overall_accuracy - legacy["overall_accuracy"]) < 1e-9
+
+        print(
+            f"{size:>10} {legacy_time:>12.4f} {load_time:>10.4f} {compute_time:>12.4f} "
+            f"{vector_time:>15.4f} {legacy_time / vector_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
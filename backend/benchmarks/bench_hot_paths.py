@@ -0,0 +1,133 @@
+"""Microbenchmarks of the CPU-bound hot paths (pytest-benchmark).
+
+Sizes are parametrized so scaling problems show up as well as constant
+factors. See conftest.py for the baseline comparison.
+"""
+import json
+import random
+from datetime import datetime
+from uuid import UUID, uuid4
+import pytest
+from app.models import Attempt, Difficulty, Question, QuestionType
+from app.services.analytics_aggregates import build_aggregates
+from app.services.analytics_engine import AttemptColumns, compute_analytics
+from benchmarks.analytics_benchmark import generate_data
+from benchmarks.synthetic import generate_text, make_docx, make_pdf
+
+# Roughly one, ten and forty pages of prose
+TEXT_WORDS = {"1p": 500, "10p": 5_000, "40p": 20_000}
+PDF_PAGES = {"1p": 1, "10p": 10, "40p": 40}
+DOCX_PARAGRAPHS = {"10para": 10, "100para": 100, "400para": 400}
+RECORD_COUNTS = {"100": 100, "1k": 1_000, "10k": 10_000}
+QUESTION_COUNTS = {"1q": 1, "10q": 10, "50q": 50}
+ATTEMPT_COUNTS = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+
+def _question_record(rng: random.Random) -> dict:
+    return {
+        "question_id": str(uuid4()),
+        "document_id": str(uuid4()),
+        "user_id": "bench-user",
+        "question_type": QuestionType.MCQ.value,
+        "difficulty": rng.choice([d.value for d in Difficulty]),
+        "question_text": generate_text(25, seed=rng.randint(0, 1000)),
+        "correct_answer": "B",
+        "explanation": generate_text(40, seed=rng.randint(0, 1000)),
+        "options": ["A) one", "B) two", "C) three", "D) four"],
+        "chunk_ids": [str(uuid4()) for _ in range(3)],
+        "created_at": datetime(2024, 1, 1),
+    }
+
+
+def _llm_questions_response(count: int) -> str:
+    rng = random.Random(count)
+    questions = [
+        {
+            "question_text": generate_text(25, seed=i),
+            "options": ["A) one", "B) two", "C) three", "D) four"],
+            "correct_answer": rng.choice("ABCD"),
+            "explanation": generate_text(40, seed=i + 1),
+        }
+        for i in range(count)
+    ]
+    return "Here are the questions:\n```json\n" + json.dumps(questions, indent=2) + "\n```\nLet me know if you need more."
+
+
+@pytest.mark.parametrize("size", TEXT_WORDS)
+def bench_chunk_text(benchmark, chunker, size):
+    text = generate_text(TEXT_WORDS[size])
+    chunks = benchmark(chunker.chunk_text, text)
+    assert chunks
+
+
+@pytest.mark.parametrize("size", TEXT_WORDS)
+def bench_clean_text(benchmark, processor, size):
+    text = generate_text(TEXT_WORDS[size])
+    assert benchmark(processor._clean_text, text)
+
+
+@pytest.mark.parametrize("size", PDF_PAGES)
+def bench_extract_from_pdf(benchmark, processor, size):
+    content = make_pdf(PDF_PAGES[size])
+    assert benchmark(processor._extract_from_pdf, content, "document.pdf").strip()
+
+
+@pytest.mark.parametrize("size", DOCX_PARAGRAPHS)
+def bench_extract_from_docx(benchmark, processor, size):
+    content = make_docx(DOCX_PARAGRAPHS[size])
+    assert benchmark(processor._extract_from_docx, content, "document.docx").strip()
+
+
+@pytest.mark.parametrize("size", RECORD_COUNTS)
+def bench_question_from_dict(benchmark, size):
+    rng = random.Random(0)
+    records = [_question_record(rng) for _ in range(RECORD_COUNTS[size])]
+    questions = benchmark(lambda: [Question.from_dict(record) for record in records])
+    assert isinstance(questions[0].question_id, UUID)
+
+
+@pytest.mark.parametrize("size", RECORD_COUNTS)
+def bench_question_to_dict(benchmark, size):
+    rng = random.Random(0)
+    questions = [Question.from_dict(_question_record(rng)) for _ in range(RECORD_COUNTS[size])]
+    records = benchmark(lambda: [question.to_dict() for question in questions])
+    assert isinstance(records[0]["question_id"], str)
+
+
+@pytest.mark.parametrize("size", RECORD_COUNTS)
+def bench_attempt_from_dict(benchmark, size):
+    records, _ = generate_data(RECORD_COUNTS[size], num_questions=100)
+    attempts = benchmark(lambda: [Attempt.from_dict(record) for record in records])
+    assert isinstance(attempts[0].attempt_id, UUID)
+
+
+@pytest.mark.parametrize("size", QUESTION_COUNTS)
+def bench_parse_questions(benchmark, llm_parser, size):
+    response = _llm_questions_response(QUESTION_COUNTS[size])
+    questions = benchmark(llm_parser._parse_questions, response, "mcq")
+    assert len(questions) == QUESTION_COUNTS[size]
+
+
+def bench_parse_evaluation(benchmark, llm_parser):
+    response = (
+        "Evaluation:\n```json\n"
+        + json.dumps({"is_correct": True, "score": 0.85, "feedback": generate_text(120)})
+        + "\n```"
+    )
+    assert benchmark(llm_parser._parse_evaluation, response)["is_correct"] is True
+
+
+@pytest.mark.parametrize("size", ATTEMPT_COUNTS)
+def bench_compute_analytics(benchmark, size):
+    records, questions = generate_data(ATTEMPT_COUNTS[size])
+    result = benchmark(lambda: compute_analytics(AttemptColumns.from_records(records, questions)))
+    assert result.total_attempts == ATTEMPT_COUNTS[size]
+
+
+@pytest.mark.parametrize("size", ATTEMPT_COUNTS)
+def bench_build_aggregates(benchmark, size):
+    records, question_records = generate_data(ATTEMPT_COUNTS[size])
+    attempts = [Attempt.from_dict(record) for record in records]
+    questions = {q_id: Question.from_dict(record) for q_id, record in question_records.items()}
+    aggregates = benchmark(build_aggregates, attempts, questions)
+    assert aggregates
@@ -0,0 +1,130 @@
+"""Fixtures and baseline comparison for the microbenchmarks (bench_*.py).
+
+Run from the backend directory:
+    python -m pytest benchmarks                      # compare with benchmarks/baseline.json
+    python -m pytest benchmarks --save-baseline      # record a new baseline
+    python -m pytest benchmarks --max-regression 25  # allowed slowdown in percent
+
+Each benchmark runs warmed up for at least 10 rounds (see pytest.ini) and
+its minimum, the timing least disturbed by other load, is compared with
+the baseline. The run fails if any is slower by more than --max-regression
+percent (default 20, or the BENCHMARK_MAX_REGRESSION environment variable)
+and by more than the interquartile range of either run. Benchmarks whose
+baseline is under --gate-min-time microseconds (default 50) are too short
+to time reliably and are only reported. Baselines are only comparable on
+the machine that recorded them.
+"""
+import json
+import os
+import pytest
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+@pytest.fixture(scope="session")
+def chunker():
+    from app.services.text_chunker import TextChunker
+    try:
+        return TextChunker()
+    except RuntimeError as e:
+        pytest.skip(f"Tokenizer not available: {e}")
+
+
+@pytest.fixture(scope="session")
+def processor():
+    """A DocumentProcessor for the pure extraction and cleaning methods (no services)."""
+    from app.services.document_processor import DocumentProcessor
+    return DocumentProcessor.__new__(DocumentProcessor)
+
+
+@pytest.fixture(scope="session")
+def llm_parser():
+    """An LLMService for the response parsers (no provider client)."""
+    from app.services.llm_service import LLMService
+    return LLMService.__new__(LLMService)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("baseline", "benchmark baseline")
+    group.addoption("--baseline", default=BASELINE_PATH, help="Baseline JSON file (benchmark name -> min and IQR seconds)")
+    group.addoption("--save-baseline", action="store_true", help="Write this run's timings as the new baseline")
+    group.addoption(
+        "--max-regression",
+        type=float,
+        default=float(os.environ.get("BENCHMARK_MAX_REGRESSION", 20)),
+        help="Fail if a benchmark's minimum is this many percent slower than the baseline",
+    )
+    group.addoption(
+        "--gate-min-time",
+        type=float,
+        default=float(os.environ.get("BENCHMARK_GATE_MIN_TIME", 50)),
+        help="Benchmarks faster than this many microseconds are reported but never fail the run",
+    )
+
+
+def _regressed(current, baseline: dict, limit: float) -> bool:
+    """Slower than the baseline by more than ``limit`` percent and by more than either run's noise."""
+    slowdown = current.min - baseline["min"]
+    noise = max(current.iqr, baseline.get("iqr", 0.0))
+    return slowdown > baseline["min"] * limit / 100 and slowdown > noise
+
+
+def pytest_sessionfinish(session, exitstatus):
+    benchmark_session = getattr(session.config, "_benchmarksession", None)
+    if benchmark_session is None or exitstatus != 0:
+        return
+    timings = {
+        bench.name: bench.stats
+        for bench in benchmark_session.benchmarks
+        if not bench.has_error and bench.stats is not None
+    }
+    if not timings:
+        return
+    config = session.config
+    reporter = config.pluginmanager.get_plugin("terminalreporter")
+    path = config.getoption("baseline")
+
+    if config.getoption("save_baseline"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    name: {"min": round(stats.min, 9), "iqr": round(stats.iqr, 9)}
+                    for name, stats in sorted(timings.items())
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        reporter.write_line(f"Saved baseline for {len(timings)} benchmarks to {path}")
+        return
+
+    if not os.path.exists(path):
+        reporter.write_line(f"No baseline at {path}; run with --save-baseline to record one")
+        return
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    limit = config.getoption("max_regression")
+    gate_min_time = config.getoption("gate_min_time") / 1e6
+    regressions = []
+    reporter.write_line(
+        f"\nMinimum vs baseline (fail above +{limit:.0f}% and the IQR; "
+        f"not gated below {gate_min_time * 1e6:.0f} us):"
+    )
+    for name, stats in sorted(timings.items()):
+        line = f"  {name:<60} {stats.min * 1000:10.3f} ms"
+        if not isinstance(baseline.get(name), dict):
+            reporter.write_line(f"{line}  (new)")
+            continue
+        change = (stats.min / baseline[name]["min"] - 1) * 100
+        if baseline[name]["min"] < gate_min_time:
+            flag = "  (not gated)"
+        elif _regressed(stats, baseline[name], limit):
+            flag = "  REGRESSION"
+            regressions.append(name)
+        else:
+            flag = ""
+        reporter.write_line(f"{line}  {change:+7.1f}%{flag}")
+    if regressions:
+        reporter.write_line(f"{len(regressions)} benchmark(s) regressed more than {limit:.0f}%", red=True)
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
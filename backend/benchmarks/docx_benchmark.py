@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Benchmark streaming DOCX extraction against python-docx on large documents.
+
+``python-docx`` is the original extractor: it loads the whole document
+through python-docx and concatenates body paragraphs, then the text is
+cleaned and chunked. ``streaming`` is DocumentProcessor._extract_chunks,
+which parses word/document.xml incrementally and feeds paragraphs and
+table cells to the streaming chunker as they are read. Both chunk with the
+same TextChunker, so the difference is extraction.
+
+Each case runs in a fresh interpreter. Reported: best wall time of
+``--repeat`` runs, peak RSS above the RSS before the run (python-docx's
+lxml tree is outside tracemalloc's view), and the characters and chunks
+produced; python-docx skips table text, so it yields fewer characters.
+
+Run from the backend directory (needs the seeded tokenizer):
+    python -m benchmarks.docx_benchmark [--paragraphs 2000 10000 40000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_extract_from_docx(content: bytes) -> str:
+    """The original extractor."""
+    import io
+    from docx import Document as DocxDocument
+    doc = DocxDocument(io.BytesIO(content))
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+
+def _run_case(impl: str, path: str, repeat: int) -> dict:
+    import gc
+    import threading
+    import time
+    from app.services.document_processor import DocumentProcessor
+    from app.services.text_chunker import TextChunker
+    from benchmarks.upload_memory_benchmark import rss_bytes
+    import docx  # noqa: F401 - loaded before the baseline
+
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    processor.chunker = TextChunker()
+    with open(path, "rb") as f:
+        content = f.read()
+
+    def extract_and_chunk():
+        if impl == "python-docx":
+            text = processor._clean_text(legacy_extract_from_docx(content))
+            return text, processor.chunker.chunk_text(text)
+        _, text, chunks = processor._extract_chunks(content, "document.docx")
+        return text, chunks
+
+    gc.collect()
+    baseline = rss_bytes()
+    peak = baseline
+    sampling = True
+
+    def sample() -> None:
+        nonlocal peak
+        while sampling:
+            peak = max(peak, rss_bytes())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    text, chunks = extract_and_chunk()
+    sampling = False
+    sampler.join()
+    peak = max(peak, rss_bytes())
+    del text, chunks
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        text, chunks = extract_and_chunk()
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "peak_bytes": peak - baseline, "chars": len(text), "chunks": len(chunks)}
+
+
+def run(impl: str, path: str, repeat: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.docx_benchmark", "--child", impl, path, str(repeat)],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "TRACE_FILE": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print("RESULT " + json.dumps(_run_case(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[2000, 10000, 40000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from benchmarks.synthetic import make_large_docx
+
+    with tempfile.TemporaryDirectory(prefix="learnlens-docx-") as directory:
+        print(
+            f"{'paragraphs':>10} {'file MB':>8} {'impl':<12} {'seconds':>8} {'MB/s':>7} "
+            f"{'peak RSS MB':>12} {'chars':>11} {'chunks':>7}"
+        )
+        for paragraphs in args.paragraphs:
+            path = os.path.join(directory, f"document-{paragraphs}.docx")
+            with open(path, "wb") as f:
+                f.write(make_large_docx(paragraphs))
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            results = {}
+            for impl in ("python-docx", "streaming"):
+                result = results[impl] = run(impl, path, args.repeat)
+                print(
+                    f"{paragraphs:>10} {size_mb:>8.1f} {impl:<12} {result['seconds']:>8.3f} "
+                    f"{size_mb / result['seconds']:>7.1f} {result['peak_bytes'] / (1024 * 1024):>12.1f} "
+                    f"{result['chars']:>11,} {result['chunks']:>7}"
+                )
+            legacy, streaming = results["python-docx"], results["streaming"]
+            print(
+                f"{'':>10} {'':>8} {'speedup':<12} {legacy['seconds'] / streaming['seconds']:>7.2f}x "
+                f"{'':>7} {streaming['peak_bytes'] / max(legacy['peak_bytes'], 1):>11.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Measure event-loop lag while serving concurrent requests.
+
+Runs the FastAPI app in-process and fires concurrent read requests as one
+user (authentication is bypassed) while a probe task measures how late the
+event loop wakes up.
+
+By default the app reads the configured Firestore project. With
+``--simulate-latency MS`` it reads a seeded in-memory stand-in instead,
+where every round trip takes MS milliseconds: slept on the calling thread
+for the synchronous client API, awaited for the async one, whichever the
+app's revision uses. The script only needs the app's routers and models,
+so it runs unchanged on revisions before and after the switch to the
+async client and the two can be compared.
+
+Run from the backend directory:
+    python -m benchmarks.event_loop_lag --user USER_ID [--concurrency 50] [--requests 500]
+    python -m benchmarks.event_loop_lag --simulate-latency 20 [--concurrency 50] [--requests 500]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from app.config import settings
+from app.main import app
+from app.routers.auth import get_current_user
+
+ENDPOINTS = [
+    "/documents",
+    "/analytics/performance",
+    "/attempts",
+]
+
+SIMULATED_USER = "bench-user"
+
+
+class LagProbe:
+    """Record how late the event loop wakes up a task sleeping ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.samples) or [0.0]
+        return ordered[int((len(ordered) - 1) * fraction)] * 1000
+
+
+class _Snapshot:
+    def __init__(self, reference: "_DocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class _DocumentReference:
+    def __init__(self, client: "SimulatedFirestore", collection: str, document_id: str):
+        self._client = client
+        self._collection = collection
+        self.id = document_id
+
+    def _snapshot(self) -> _Snapshot:
+        return _Snapshot(self, self._client.collections.get(self._collection, {}).get(self.id))
+
+    def get(self, *args, **kwargs):
+        return self._client.round_trip(self._snapshot())
+
+    def _write(self, data: Dict[str, Any]):
+        self._client.collections.setdefault(self._collection, {})[self.id] = dict(data)
+        return self._client.round_trip(None)
+
+    def set(self, data: Dict[str, Any], *args, **kwargs):
+        return self._write(data)
+
+    def create(self, data: Dict[str, Any], *args, **kwargs):
+        return self._write(data)
+
+    def update(self, data: Dict[str, Any], *args, **kwargs):
+        return self._write({**self._snapshot().to_dict(), **data})
+
+
+class _Query:
+    def __init__(self, client: "SimulatedFirestore", collection: str, filters: tuple = (), limit: Optional[int] = None):
+        self._client = client
+        self._collection = collection
+        self._filters = filters
+        self._limit = limit
+
+    def where(self, field: str, op: str, value: Any) -> "_Query":
+        if op not in ("==", "in"):
+            raise NotImplementedError(f"Simulated Firestore does not support '{op}' filters")
+        return _Query(self._client, self._collection, self._filters + ((field, op, value),), self._limit)
+
+    def limit(self, count: int) -> "_Query":
+        return _Query(self._client, self._collection, self._filters, count)
+
+    def select(self, field_paths) -> "_Query":
+        return self
+
+    def order_by(self, *args, **kwargs) -> "_Query":
+        return self
+
+    def document(self, document_id: str) -> _DocumentReference:
+        return _DocumentReference(self._client, self._collection, document_id)
+
+    def _matches(self) -> List[_Snapshot]:
+        matches = []
+        for document_id, data in self._client.collections.get(self._collection, {}).items():
+            if all(
+                data.get(field) == value if op == "==" else data.get(field) in value
+                for field, op, value in self._filters
+            ):
+                matches.append(_Snapshot(self.document(document_id), data))
+        return matches[:self._limit]
+
+    def get(self, *args, **kwargs):
+        return self._client.round_trip(self._matches())
+
+    def stream(self, *args, **kwargs):
+        return self._client.round_trip_stream(self._matches())
+
+
+class SimulatedFirestore:
+    """In-memory Firestore client whose round trips take ``latency`` seconds.
+
+    ``blocking`` serves the synchronous client API (round trips block the
+    calling thread, like google-cloud-firestore's Client); otherwise the
+    async one.
+    """
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def round_trip(self, result: Any):
+        if self.blocking:
+            time.sleep(self.latency)
+            return result
+
+        async def wait() -> Any:
+            await asyncio.sleep(self.latency)
+            return result
+
+        return wait()
+
+    def round_trip_stream(self, results: List[Any]):
+        if self.blocking:
+            time.sleep(self.latency)
+            return iter(results)
+
+        async def stream():
+            await asyncio.sleep(self.latency)
+            for result in results:
+                yield result
+
+        return stream()
+
+    def collection(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def get_all(self, references, *args, **kwargs):
+        return self.round_trip_stream([reference._snapshot() for reference in references])
+
+    def write_option(self, **kwargs) -> None:
+        return None
+
+
+def simulate_firestore(latency: float, documents: int, attempts: int) -> str:
+    """Serve the app from a seeded SimulatedFirestore; returns whether its API is sync or async."""
+    import app.database as database
+    from app.models import Attempt, Document, DocumentStatus, Question
+
+    # Revisions that still use the synchronous client import firebase_admin.firestore only
+    blocking = not hasattr(database, "firestore_async")
+    client = SimulatedFirestore(latency, blocking)
+    questions = []
+    for i in range(documents):
+        document = Document(user_id=SIMULATED_USER, title=f"Document {i}", status=DocumentStatus.PROCESSED)
+        client.collections.setdefault(Document.collection_name(), {})[str(document.document_id)] = document.to_dict()
+        for _ in range(5):
+            question = Question(document_id=document.document_id, question_text="Q?", correct_answer="a", options=["a", "b"])
+            client.collections.setdefault(Question.collection_name(), {})[str(question.question_id)] = question.to_dict()
+            questions.append(question)
+    for i in range(attempts):
+        question = questions[i % len(questions)]
+        attempt = Attempt(
+            user_id=SIMULATED_USER,
+            question_id=question.question_id,
+            document_id=question.document_id,
+            user_answer="a",
+            is_correct=i % 3 != 0,
+            time_taken=5.0,
+        )
+        client.collections.setdefault(Attempt.collection_name(), {})[str(attempt.attempt_id)] = attempt.to_dict()
+
+    if hasattr(database, "use_firestore_client"):
+        database.use_firestore_client(client)
+    else:
+        database.db = client
+    return "sync" if blocking else "async"
+
+
+async def run(user_id: str, concurrency: int, total_requests: int) -> None:
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": user_id, "email": None}
+    probe = LagProbe(interval=0.01)
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url=f"http://bench{settings.API_PREFIX}") as client:
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        probe.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - start
+        await probe.stop()
+
+    latencies.sort()
+    print(f"requests:      {total_requests} ({errors} errors) at concurrency {concurrency}")
+    print(f"throughput:    {total_requests / elapsed:.1f} req/s")
+    print(f"latency p50:   {latencies[len(latencies) // 2] * 1000:.1f} ms")
+    print(f"latency p99:   {latencies[int((len(latencies) - 1) * 0.99)] * 1000:.1f} ms")
+    print(f"loop lag p50:  {probe.percentile(0.50):.1f} ms")
+    print(f"loop lag p99:  {probe.percentile(0.99):.1f} ms")
+    print(f"loop lag max:  {probe.percentile(1.0):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", help="User ID whose data is read (required unless simulating)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--simulate-latency", type=float, metavar="MS",
+                        help="Read a seeded in-memory Firestore with this round-trip latency instead")
+    parser.add_argument("--documents", type=int, default=10, help="Documents seeded when simulating")
+    parser.add_argument("--attempts", type=int, default=200, help="Attempts seeded when simulating")
+    args = parser.parse_args()
+
+    user_id = args.user
+    if args.simulate_latency is not None:
+        api = simulate_firestore(args.simulate_latency / 1000, args.documents, args.attempts)
+        print(f"Simulated Firestore ({api} client API), {args.simulate_latency:g} ms per round trip")
+        user_id = user_id or SIMULATED_USER
+    elif not user_id:
+        parser.error("--user is required unless --simulate-latency is given")
+    asyncio.run(run(user_id, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
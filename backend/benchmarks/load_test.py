@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Load-test one worker with scripted user journeys, without cloud services.
+
+Each virtual user runs journeys back to back: upload a document, generate
+questions, answer every question, then read analytics and the document
+list. The FastAPI app runs in-process with Firestore replaced by
+LocalFirestore, Pinecone by an in-memory vector index, and the embedding
+and LLM providers by mocks with log-normal latency (see local_services.py).
+Authentication is bypassed; each virtual user is a separate app user.
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint, plus
+event-loop lag.
+
+Run from the backend directory (needs the seeded tokenizer):
+    python -m benchmarks.load_test [--users 20] [--journeys 3] [--words 2000]
+        [--llm-latency 800] [--embedding-latency 40] [--firestore-latency 5]
+        [--question-types mcq short_answer] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+ENDPOINTS = [
+    "POST /documents/upload",
+    "POST /documents/{id}/questions/generate",
+    "POST /attempts",
+    "GET /analytics/performance",
+    "GET /documents",
+]
+
+
+class Results:
+    """Latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+        self.journeys = 0
+
+    def record(self, endpoint: str, seconds: float, status_code: int, body: str) -> None:
+        self.latencies[endpoint].append(seconds)
+        if status_code >= 400:
+            self.errors[endpoint] += 1
+            self.error_samples.setdefault(endpoint, f"{status_code} {body[:200]}")
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        rows = {}
+        for endpoint in ENDPOINTS:
+            values = sorted(self.latencies.get(endpoint, []))
+            if not values:
+                continue
+            last = len(values) - 1
+            rows[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "error_rate": self.errors.get(endpoint, 0) / len(values),
+                "throughput": len(values) / elapsed,
+                "p50_ms": values[int(last * 0.50)] * 1000,
+                "p95_ms": values[int(last * 0.95)] * 1000,
+                "p99_ms": values[int(last * 0.99)] * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return rows
+
+
+async def call(client, results: Results, endpoint: str, method: str, url: str, user: str, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, headers={"X-Load-User": user}, **kwargs)
+    results.record(endpoint, time.perf_counter() - start, response.status_code, response.text)
+    return response
+
+
+async def journey(client, results: Results, user: str, args, rng: random.Random) -> None:
+    from benchmarks.synthetic import generate_text
+
+    text = generate_text(args.words, seed=rng.randrange(1 << 30))
+    response = await call(
+        client, results, "POST /documents/upload", "POST", "/documents/upload", user,
+        files={"file": (f"notes-{rng.randrange(1 << 30)}.txt", text.encode("utf-8"), "text/plain")},
+    )
+    if response.status_code != 201:
+        return
+    document_id = response.json()["document_id"]
+
+    question_type = rng.choice(args.question_types)
+    response = await call(
+        client, results, "POST /documents/{id}/questions/generate", "POST",
+        f"/documents/{document_id}/questions/generate", user,
+        params={"question_type": question_type, "difficulty": rng.choice(["easy", "medium", "hard"]), "num_questions": args.questions},
+    )
+    if response.status_code != 201:
+        return
+
+    for question in response.json():
+        answer = rng.choice("ABCD") if question_type == "mcq" else "An answer written by the user."
+        await call(
+            client, results, "POST /attempts", "POST", "/attempts", user,
+            json={"question_id": question["question_id"], "user_answer": answer, "time_taken": rng.uniform(5, 60)},
+        )
+
+    await call(client, results, "GET /analytics/performance", "GET", "/analytics/performance", user)
+    await call(client, results, "GET /documents", "GET", "/documents", user)
+    results.journeys += 1
+
+
+async def run(args) -> Dict:
+    import httpx
+    from fastapi import Request
+    from app import container
+    from app.config import settings
+    from app.database import use_firestore_client
+    from app.local_firestore import LocalFirestore
+    from app.main import app
+    from app.routers.auth import get_current_user
+    from app.services.loop_monitor import EventLoopLagMonitor
+    from benchmarks.local_services import Latency, LocalVectorStore, MockEmbeddingService, MockLLMService
+
+    # Stand-ins for the external services
+    use_firestore_client(LocalFirestore(latency=args.firestore_latency / 1000))
+    embedding_latency = Latency(args.embedding_latency / 1000, args.latency_sigma, seed=args.seed)
+    llm_latency = Latency(args.llm_latency / 1000, args.latency_sigma, seed=args.seed + 1)
+    container.COMPONENTS.update(
+        vector_store=LocalVectorStore,
+        embeddings=lambda: MockEmbeddingService(embedding_latency),
+        llm=lambda: MockLLMService(llm_latency),
+    )
+
+    def load_test_user(request: Request) -> dict:
+        return {"user_id": request.headers.get("X-Load-User", "load-user"), "email": None}
+
+    app.dependency_overrides[get_current_user] = load_test_user
+
+    services = container.ServiceContainer(warm_ocr=False)
+    await services.start()
+    if not services.ready:
+        raise SystemExit(f"Services failed to start: {services.readiness()}")
+    app.state.services = services
+
+    results = Results()
+    monitor = EventLoopLagMonitor(interval=0.01, window=1_000_000)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=f"http://load{settings.API_PREFIX}", timeout=None
+    ) as client:
+
+        async def virtual_user(index: int) -> None:
+            rng = random.Random(args.seed * 1000 + index)
+            for _ in range(args.journeys):
+                await journey(client, results, f"load-user-{index}", args, rng)
+
+        monitor.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - start
+        await monitor.stop()
+
+    return {
+        "users": args.users,
+        "journeys": results.journeys,
+        "seconds": elapsed,
+        "journeys_per_second": results.journeys / elapsed,
+        "endpoints": results.summary(elapsed),
+        "errors": results.error_samples,
+        "event_loop_lag": monitor.stats(),
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"{report['users']} users, {report['journeys']} journeys in {report['seconds']:.1f} s "
+        f"({report['journeys_per_second']:.2f} journeys/s)\n"
+    )
+    print(f"{'endpoint':<42}{'requests':>9}{'errors':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for endpoint, row in report["endpoints"].items():
+        print(
+            f"{endpoint:<42}{row['requests']:>9}{row['error_rate']:>8.1%}{row['throughput']:>8.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+        )
+    lag = report["event_loop_lag"]
+    print(f"\nevent-loop lag: p50 {lag['p50_ms']:.1f} ms, p99 {lag['p99_ms']:.1f} ms, max {lag['max_ms']:.1f} ms")
+    for endpoint, sample in report["errors"].items():
+        print(f"first error on {endpoint}: {sample}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--journeys", type=int, default=3, help="Journeys per user")
+    parser.add_argument("--words", type=int, default=2000, help="Words per uploaded document")
+    parser.add_argument("--questions", type=int, default=5, help="Questions generated per journey")
+    parser.add_argument("--question-types", nargs="+", default=["mcq", "short_answer"])
+    parser.add_argument("--llm-latency", type=float, default=800, help="Median LLM call latency (ms)")
+    parser.add_argument("--embedding-latency", type=float, default=40, help="Median embedding call latency (ms)")
+    parser.add_argument("--firestore-latency", type=float, default=5, help="Firestore round-trip time (ms)")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Log-normal spread of provider latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # Keep extracted text and traces out of the working tree
+    os.environ.setdefault("TEXT_STORAGE_PATH", tempfile.mkdtemp(prefix="learnlens-load-"))
+    os.environ.setdefault("TRACE_FILE", "")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(row["errors"] for row in report["endpoints"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Local stand-ins for the external services, for load tests.
+
+- LocalVectorStore: in-memory vector index with the VectorStore interface
+- MockEmbeddingService / MockLLMService: providers that wait a simulated
+  latency and return deterministic embeddings and well-formed LLM JSON, so
+  the app's own parsing and storage paths still run
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+import numpy as np
+from app.services.embedding_service import EmbeddingService
+from app.services.llm_service import LLMService
+
+EMBEDDING_DIMENSION = 768
+
+
+class Latency:
+    """Log-normally distributed latency: ``median`` seconds, spread ``sigma``."""
+
+    def __init__(self, median: float, sigma: float = 0.3, seed: Optional[int] = None):
+        self.median = median
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(self._rng.gauss(0, self.sigma))
+
+    async def wait(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class LocalVectorStore:
+    """Brute-force cosine search over vectors kept in memory."""
+
+    def __init__(self):
+        # chunk_id -> (document_id, unit vector, metadata)
+        self._vectors: Dict[str, tuple] = {}
+
+    async def add_chunk(
+        self,
+        document_id: UUID,
+        chunk_id: Optional[UUID],
+        text: str,
+        embedding: List[float],
+        metadata: Dict[str, Any] = None,
+    ) -> UUID:
+        chunk_id = chunk_id or uuid4()
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        self._vectors[str(chunk_id)] = (
+            str(document_id),
+            vector,
+            {**(metadata or {}), "document_id": str(document_id), "text": text, "chunk_id": str(chunk_id)},
+        )
+        return chunk_id
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        query_text: Optional[str] = None,
+        document_id: Optional[UUID] = None,
+        top_k: int = 5,
+    ) -> List[Dict[str, Any]]:
+        candidates = [
+            (chunk_id, vector, metadata)
+            for chunk_id, (doc_id, vector, metadata) in self._vectors.items()
+            if document_id is None or doc_id == str(document_id)
+        ]
+        if not candidates:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = np.stack([vector for _, vector, _ in candidates]) @ query
+        best = np.argsort(-scores)[:top_k]
+        return [
+            {
+                "chunk_id": UUID(candidates[i][0]),
+                "text": candidates[i][2]["text"],
+                "metadata": candidates[i][2],
+                "distance": float(scores[i]),
+            }
+            for i in best
+        ]
+
+    async def delete_document(self, document_id: UUID):
+        self._vectors = {
+            chunk_id: entry for chunk_id, entry in self._vectors.items() if entry[0] != str(document_id)
+        }
+
+    async def delete_chunks(self, chunk_ids: List[UUID]):
+        for chunk_id in chunk_ids:
+            self._vectors.pop(str(chunk_id), None)
+
+    async def update_metadata(self, chunk_id: UUID, metadata: Dict[str, Any]):
+        entry = self._vectors.get(str(chunk_id))
+        if entry is not None:
+            entry[2].update(metadata)
+
+
+class MockEmbeddingService(EmbeddingService):
+    """Embeddings derived from a hash of the text, after a simulated latency."""
+
+    def __init__(self, latency: Latency, dimension: int = EMBEDDING_DIMENSION):
+        self.provider = "mock"
+        self.model = "mock-embedding"
+        self.latency = latency
+        self.dimension = dimension
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+        return np.random.default_rng(seed).standard_normal(self.dimension).tolist()
+
+    async def _embed_text(self, text: str) -> List[float]:
+        await self.latency.wait()
+        return self._vector(text)
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        await self.latency.wait()
+        return [self._vector(text) for text in texts]
+
+
+class MockLLMService(LLMService):
+    """Answers question-generation and evaluation prompts with valid JSON."""
+
+    def __init__(self, latency: Latency):
+        self.provider = "mock"
+        self.model = "mock-llm"
+        self.latency = latency
+
+    async def _call_provider(self, prompt: str) -> str:
+        await self.latency.wait()
+        if prompt.startswith("Evaluate"):
+            return json.dumps({"is_correct": True, "score": 0.8, "feedback": "Mostly correct."})
+        match = re.search(r"Generate (\d+)", prompt)
+        count = int(match.group(1)) if match else 1
+        multiple_choice = "multiple-choice" in prompt
+        questions = []
+        for i in range(count):
+            question = {
+                "question_text": f"Question {i + 1} about the text?",
+                "correct_answer": "A" if multiple_choice else "A short reference answer.",
+                "explanation": "Explained by the passage.",
+            }
+            if multiple_choice:
+                question["options"] = ["A) first", "B) second", "C) third", "D) fourth"]
+            questions.append(question)
+        return json.dumps(questions)
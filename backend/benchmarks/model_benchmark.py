@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Benchmark the slot-based models against the original __dict__ models.
+
+For each model, measures from_dict and to_dict throughput (objects per
+second) and the memory held per loaded object. The original FirestoreModel
+serializers are kept below as the baseline.
+
+Run from the backend directory:
+    python -m benchmarks.model_benchmark [--count 20000] [--repeat 5]
+"""
+import argparse
+import enum
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+from app.models import Attempt, Chunk, Document, DocumentStatus, Difficulty, Question, QuestionType
+from benchmarks.analytics_benchmark import generate_data
+from benchmarks.synthetic import generate_text
+
+
+class LegacyFirestoreModel:
+    """The original per-field type-sniffing serializers."""
+
+    def to_dict(self) -> dict:
+        data = {}
+        for key, value in self.__dict__.items():
+            if not key.startswith('_'):
+                if isinstance(value, UUID):
+                    data[key] = str(value)
+                elif isinstance(value, datetime):
+                    data[key] = value
+                elif isinstance(value, enum.Enum):
+                    data[key] = value.value
+                elif isinstance(value, list):
+                    data[key] = [str(v) if isinstance(v, UUID) else v for v in value]
+                else:
+                    data[key] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        instance = cls.__new__(cls)
+        for key, value in data.items():
+            if not key.startswith('_'):
+                if key.endswith('_id') and isinstance(value, str):
+                    try:
+                        setattr(instance, key, UUID(value))
+                    except (ValueError, AttributeError):
+                        setattr(instance, key, value)
+                elif isinstance(value, datetime):
+                    setattr(instance, key, value)
+                elif hasattr(value, 'timestamp') or (hasattr(value, 'seconds') and hasattr(value, 'nanoseconds')):
+                    try:
+                        if hasattr(value, 'seconds'):
+                            setattr(instance, key, datetime.fromtimestamp(value.seconds, tz=timezone.utc))
+                        else:
+                            setattr(instance, key, datetime.utcnow())
+                    except Exception:
+                        setattr(instance, key, datetime.utcnow())
+                elif key in ['status', 'question_type', 'difficulty']:
+                    if key == 'status':
+                        from app.models import DocumentStatus
+                        setattr(instance, key, DocumentStatus(value))
+                    elif key == 'question_type':
+                        from app.models import QuestionType
+                        setattr(instance, key, QuestionType(value))
+                    elif key == 'difficulty':
+                        from app.models import Difficulty
+                        setattr(instance, key, Difficulty(value))
+                else:
+                    setattr(instance, key, value)
+        return instance
+
+
+def _legacy(model_cls):
+    return type(f"Legacy{model_cls.__name__}", (LegacyFirestoreModel,), {})
+
+
+def generate_records(count: int):
+    """Stored records of each model, as Firestore returns them."""
+    attempts, question_map = generate_data(count, num_questions=count)
+    text = generate_text(200)
+    now = datetime.now(timezone.utc)
+    documents = [
+        {
+            "document_id": str(uuid4()),
+            "user_id": "bench-user",
+            "title": f"notes-{i}.pdf",
+            "language": "en",
+            "uploaded_at": now,
+            "status": DocumentStatus.PROCESSED.value,
+            "text_ref": f"bench/{i}.txt.gz",
+            "text_size": 12_000,
+            "text_sha256": "0" * 64,
+        }
+        for i in range(count)
+    ]
+    chunks = [
+        {
+            "chunk_id": str(uuid4()),
+            "document_id": documents[i % len(documents)]["document_id"],
+            "chunk_index": i,
+            "start_char": i * 1000,
+            "end_char": i * 1000 + len(text),
+            "chunk_text": text,
+            "topic": None,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+    questions = list(question_map.values())
+    for question in questions:
+        question["user_id"] = "bench-user"
+        question["question_type"] = QuestionType.MCQ.value
+        question["difficulty"] = question.get("difficulty", Difficulty.MEDIUM.value)
+    return {Document: documents, Chunk: chunks, Question: questions, Attempt: attempts}
+
+
+def _best(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _bytes_per_object(model_cls, records) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [model_cls.from_dict(record) for record in records]
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # The list itself is not part of the objects
+    held -= objects.__sizeof__()
+    return held / len(objects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20_000, help="Records per model")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = generate_records(args.count)
+    print(
+        f"{'model':<10} {'impl':<8} {'from_dict obj/s':>16} {'to_dict obj/s':>14} {'bytes/obj':>10}"
+    )
+    for model_cls, rows in records.items():
+        results = {}
+        for label, impl in (("legacy", _legacy(model_cls)), ("slots", model_cls)):
+            objects = [impl.from_dict(row) for row in rows]
+            load = _best(lambda: [impl.from_dict(row) for row in rows], args.repeat)
+            dump = _best(lambda: [obj.to_dict() for obj in objects], args.repeat)
+            size = _bytes_per_object(impl, rows)
+            results[label] = (load, dump, size)
+            print(
+                f"{model_cls.__name__:<10} {label:<8} {len(rows) / load:>16,.0f} {len(rows) / dump:>14,.0f} {size:>10.0f}"
+            )
+        (old_load, old_dump, old_size), (new_load, new_dump, new_size) = results["legacy"], results["slots"]
+        print(
+            f"{'':<10} {'speedup':<8} {old_load / new_load:>15.2f}x {old_dump / new_dump:>13.2f}x "
+            f"{new_size / old_size:>9.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
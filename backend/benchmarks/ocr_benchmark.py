@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Compare image OCR preprocessing: whole-image RGB decoding vs app.services.image_ocr.
+
+Each image is recognized in a fresh interpreter by one of two paths:
+
+- ``legacy``: what DocumentProcessor did before image_ocr: decode the
+  whole image in RGB, rotate it per EXIF, resize it to 2000 px with LANCZOS
+  and recognize it in one readtext call
+- ``tiled``: recognize_image; grayscale, reduced JPEG decoding, and
+  overlapping tiles recognized in batches when the text is small
+
+and the script reports decoding and recognition time, peak RSS above the
+RSS before the image was opened, and the tiles recognized. The images are
+generated (see synthetic.make_image): a phone photo of a slide (rotated
+by EXIF), a phone photo of a page of small print, an A4 scan at 300 dpi
+and a screenshot.
+
+With EasyOCR installed the real reader is used (its models are loaded
+before the baseline) and the share of the drawn words that were
+recognized is reported. Without it a reader that finds no text stands
+in, so only decoding and tiling are measured.
+
+Run from the backend directory:
+    python -m benchmarks.ocr_benchmark [--images photo-slide photo-page] [--modes legacy tiled]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Image name -> (width, height, font size, format, rotated)
+IMAGES = {
+    "photo-slide": (4000, 3000, 64, "JPEG", True),
+    "photo-page": (4000, 3000, 24, "JPEG", False),
+    "scan-a4": (2480, 3508, 40, "PNG", False),
+    "screenshot": (1280, 800, 16, "PNG", False),
+}
+
+
+class NullReader:
+    """Stands in for easyocr.Reader when it is not installed; finds no text."""
+
+    def readtext(self, image):
+        return []
+
+    def readtext_batched(self, images, batch_size=1):
+        return [[] for _ in images]
+
+
+def _reader():
+    from app.services.document_processor import EASYOCR_AVAILABLE, create_ocr_reader
+    if EASYOCR_AVAILABLE:
+        return create_ocr_reader()
+    return NullReader()
+
+
+def _legacy(reader, stream):
+    import time
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    start = time.perf_counter()
+    image = Image.open(stream)
+    try:
+        image = ImageOps.exif_transpose(image)
+    except Exception:
+        pass
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if max(image.size) > 2000:
+        ratio = 2000 / max(image.size)
+        image = image.resize((int(image.size[0] * ratio), int(image.size[1] * ratio)), Image.Resampling.LANCZOS)
+    image_array = np.array(image)
+    decoded = time.perf_counter()
+    results = reader.readtext(image_array)
+    lines = [text.strip() for _, text, confidence in results if confidence > 0.5]
+    return lines, {"decode_seconds": decoded - start, "ocr_seconds": time.perf_counter() - decoded, "tiles": 1}
+
+
+def _tiled(reader, stream):
+    from app.config import settings
+    from app.services.image_ocr import recognize_image
+    from app.tracing import get_trace_sink
+
+    lines = recognize_image(reader, stream)
+    get_trace_sink().flush()
+    with open(settings.TRACE_FILE) as trace:
+        spans = {record["name"]: record for record in map(json.loads, trace)}
+    return lines, {
+        "decode_seconds": spans["ocr_decode"]["duration_ms"] / 1000,
+        "ocr_seconds": spans["ocr"]["duration_ms"] / 1000,
+        "tiles": spans["ocr"]["attributes"]["tiles"],
+        "dense": spans["ocr_decode"]["attributes"]["dense"],
+    }
+
+
+def child(mode: str, path: str) -> None:
+    import gc
+    import threading
+    import time
+    from benchmarks.upload_memory_benchmark import rss_bytes
+    import app.services.image_ocr  # noqa: F401 - loaded before the baseline
+
+    reader = _reader()
+    recognize = _legacy if mode == "legacy" else _tiled
+    gc.collect()
+    baseline = rss_bytes()
+    peak = baseline
+    sampling = True
+
+    def sample() -> None:
+        nonlocal peak
+        while sampling:
+            peak = max(peak, rss_bytes())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    with open(path, "rb") as stream:
+        lines, result = recognize(reader, stream)
+    sampling = False
+    sampler.join()
+    peak = max(peak, rss_bytes())
+    result.update(peak_bytes=peak - baseline, text="\n".join(lines), real_reader=not isinstance(reader, NullReader))
+    print("RESULT " + json.dumps(result))
+
+
+def run(mode: str, path: str, trace_file: str) -> dict:
+    if os.path.exists(trace_file):
+        os.remove(trace_file)
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.ocr_benchmark", "--child", mode, path],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "TRACE_FILE": trace_file, "TRACING_ENABLED": "true", "TRACE_OTEL": "false"},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def word_recall(expected: str, recognized: str) -> float:
+    expected_words = Counter(expected.lower().split())
+    matched = sum((expected_words & Counter(recognized.lower().split())).values())
+    return matched / max(sum(expected_words.values()), 1)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="+", choices=list(IMAGES), default=list(IMAGES))
+    parser.add_argument("--modes", nargs="+", choices=["legacy", "tiled"], default=["legacy", "tiled"])
+    args = parser.parse_args()
+
+    from benchmarks.synthetic import make_image
+
+    with tempfile.TemporaryDirectory(prefix="learnlens-ocr-") as directory:
+        print(
+            f"{'image':<12} {'pixels':>11} {'KB':>6} {'mode':<7} {'decode s':>9} {'ocr s':>7} "
+            f"{'peak RSS MB':>12} {'tiles':>6} {'recall':>7}"
+        )
+        for name in args.images:
+            width, height, font_size, image_format, rotated = IMAGES[name]
+            content, text = make_image(width, height, font_size, format=image_format, rotated=rotated)
+            path = os.path.join(directory, f"{name}.{image_format.lower()}")
+            with open(path, "wb") as f:
+                f.write(content)
+            for mode in args.modes:
+                result = run(mode, path, os.path.join(directory, "trace.jsonl"))
+                recall = f"{word_recall(text, result['text']):>7.1%}" if result["real_reader"] else f"{'-':>7}"
+                print(
+                    f"{name:<12} {f'{width}x{height}':>11} {len(content) // 1024:>6} {mode:<7} "
+                    f"{result['decode_seconds']:>9.3f} {result['ocr_seconds']:>7.3f} "
+                    f"{result['peak_bytes'] / (1024 * 1024):>12.1f} {result['tiles']:>6} {recall}"
+                )
+        if not result["real_reader"]:
+            print("EasyOCR is not installed: no text was recognized; times and memory are preprocessing only")
+
+
+if __name__ == "__main__":
+    main()
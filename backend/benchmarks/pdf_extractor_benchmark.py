@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compare the PDF_EXTRACTOR backends on a fixed corpus of generated PDFs.
+
+The corpus is single-column prose of 1, 10 and 40 pages, the same text
+typeset with kerning (TJ arrays, as most typesetting software writes it)
+and 10 pages in two columns; the text on every page is known (see
+synthetic.make_pdf).
+
+For each backend the script reports the best wall time of ``--repeat``
+extractions, pages per second, and the quality of the text against the
+known page text, word by word after splitting on whitespace:
+
+- recall: share of the page's words that were extracted
+- precision: share of the extracted words that are on the page
+- order: share of the page's adjacent word pairs that were extracted
+  adjacent; low when lines are merged out of reading order (columns)
+
+Backends whose library is not installed are skipped.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_extractor_benchmark [--backends pypdf2 pypdfium2 pdfminer] [--repeat 3]
+"""
+import argparse
+import time
+from collections import Counter
+from typing import Dict, List
+from app.services.extractors import PDF_BACKENDS, extract_pdf_pages
+from benchmarks.synthetic import generate_text, make_pdf
+
+WORDS_PER_PAGE = 500
+
+# Document name -> (pages, columns, kerned)
+CORPUS = {
+    "prose-1p": (1, 1, False),
+    "prose-10p": (10, 1, False),
+    "prose-40p": (40, 1, False),
+    "kerned-10p": (10, 1, True),
+    "kerned-40p": (40, 1, True),
+    "two-column-10p": (10, 2, False),
+}
+
+
+def _pairs(words: List[str]) -> Counter:
+    return Counter(zip(words, words[1:]))
+
+
+def text_quality(expected: str, extracted: str) -> Dict[str, float]:
+    expected_words, extracted_words = expected.split(), extracted.split()
+    matched = sum((Counter(expected_words) & Counter(extracted_words)).values())
+    expected_pairs = _pairs(expected_words)
+    ordered = sum((expected_pairs & _pairs(extracted_words)).values())
+    return {
+        "recall": matched / max(len(expected_words), 1),
+        "precision": matched / max(len(extracted_words), 1),
+        "order": ordered / max(sum(expected_pairs.values()), 1),
+    }
+
+
+def run(backend: str, content: bytes, pages: int, repeat: int) -> Dict[str, float]:
+    expected = "\n".join(generate_text(WORDS_PER_PAGE, seed=page) for page in range(pages))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extracted = extract_pdf_pages(content, backend)
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "pages": len(extracted), **text_quality(expected, "\n".join(extracted))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=list(PDF_BACKENDS), default=list(PDF_BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = {
+        name: (pages, make_pdf(pages, WORDS_PER_PAGE, columns=columns, kerned=kerned))
+        for name, (pages, columns, kerned) in CORPUS.items()
+    }
+    print(
+        f"{'document':<16} {'backend':<10} {'seconds':>8} {'pages/s':>8} "
+        f"{'recall':>7} {'precision':>9} {'order':>7}"
+    )
+    for name, (pages, content) in corpus.items():
+        for backend in args.backends:
+            try:
+                result = run(backend, content, pages, args.repeat)
+            except ImportError as e:
+                print(f"{name:<16} {backend:<10} not installed ({e.name})")
+                continue
+            print(
+                f"{name:<16} {backend:<10} {result['seconds']:>8.3f} {result['pages'] / result['seconds']:>8.0f} "
+                f"{result['recall']:>7.1%} {result['precision']:>9.1%} {result['order']:>7.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
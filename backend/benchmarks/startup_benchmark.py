@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Measure worker startup cost: import time and resident memory of the app.
+
+Imports the app in fresh interpreters with ``-X importtime`` and reports the
+median wall time, resident memory after import, module count and the
+top-level packages with the largest cumulative import time.
+
+Run from the backend directory:
+    python -m benchmarks.startup_benchmark [--runs 5] [--top 15] [--eager]
+
+``--eager`` also imports the SDKs that are now loaded on first use
+(EasyOCR, PyPDF2, python-docx, Pillow, OpenAI, Anthropic, Google GenAI,
+Pinecone), which reproduces the startup cost from before they were deferred.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported only when first used by the app
+DEFERRED_MODULES = [
+    "easyocr",
+    "PyPDF2",
+    "docx",
+    "PIL.Image",
+    "openai",
+    "anthropic",
+    "google.genai",
+    "pinecone",
+]
+
+# Runs in the child interpreter: import the modules, then report wall time and RSS
+CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+elapsed = time.perf_counter() - start
+rss_kb = 0
+try:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("STARTUP " + json.dumps({"seconds": elapsed, "rss_kb": rss_kb, "modules": len(sys.modules)}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Cumulative import time (seconds) per top-level package from -X importtime output.
+
+    A package is charged where it is first imported by a different package,
+    including the dependencies it pulls in.
+    """
+    lines = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        lines.append((depth, int(cumulative), name.strip().split(".")[0]))
+
+    totals: Dict[str, float] = defaultdict(float)
+    parents: Dict[int, str] = {}
+    # Children are printed before their parent, so walk the output backwards
+    for depth, cumulative, package in reversed(lines):
+        parents[depth] = package
+        if depth == 0 or parents.get(depth - 1) != package:
+            totals[package] += cumulative / 1e6
+    return totals
+
+
+def measure(modules: List[str]) -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, *modules],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    line = next(l for l in reversed(result.stdout.splitlines()) if l.startswith("STARTUP "))
+    stats = json.loads(line[len("STARTUP "):])
+    stats["packages"] = parse_importtime(result.stderr)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    parser.add_argument("--eager", action="store_true", help="Also import the deferred SDKs")
+    args = parser.parse_args()
+
+    modules = [args.module] + (DEFERRED_MODULES if args.eager else [])
+    runs = [measure(modules) for _ in range(args.runs)]
+    seconds = statistics.median(run["seconds"] for run in runs)
+    rss_mb = statistics.median(run["rss_kb"] for run in runs) / 1024
+
+    print(f"import {' + '.join(modules)}")
+    print(f"  import time (median of {args.runs}): {seconds * 1000:8.1f} ms")
+    print(f"  resident memory:              {rss_mb:8.1f} MB")
+    print(f"  modules loaded:               {runs[0]['modules']:8d}")
+
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for run in runs:
+        for name, value in run["packages"].items():
+            packages[name].append(value)
+    slowest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    print(f"  slowest top-level imports:")
+    for name, values in slowest[:args.top]:
+        print(f"    {name:<28} {statistics.median(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
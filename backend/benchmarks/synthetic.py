@@ -0,0 +1,226 @@
+"""Synthetic documents for benchmarks and load tests (deterministic per seed)."""
+import io
+import random
+from typing import Tuple
+
+WORDS = (
+    "the of and to in is that for it as was with be by on not he this are or his from at which but have an "
+    "they you were her she there been one all we their has would when if so no what up can more out other "
+    "photosynthesis mitochondria equation theorem derivative integral velocity momentum economy protocol "
+    "algorithm variable function molecule enzyme chapter history revolution government literature analysis"
+).split()
+
+
+def generate_text(words: int, seed: int = 0) -> str:
+    """Deterministic English-like text with sentences, paragraphs and ragged whitespace."""
+    rng = random.Random(seed)
+    paragraphs = []
+    remaining = words
+    while remaining > 0:
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            length = min(remaining, rng.randint(6, 24))
+            if length <= 0:
+                break
+            remaining -= length
+            sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+            sentences.append(sentence.capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+        # Extracted text has irregular spacing and short header/footer lines
+        paragraphs.append("  ".join(sentences) + rng.choice(["", "   ", "\t"]))
+        if rng.random() < 0.2:
+            paragraphs.append(f"Page {len(paragraphs)}")
+    return "\n\n".join(paragraphs)
+
+
+def _pdf_string(text: str) -> str:
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def make_pdf(
+    pages: int, words_per_page: int = 500, seed: int = 0, image_bytes: int = 0, columns: int = 1, kerned: bool = False
+) -> bytes:
+    """A PDF with one Helvetica text block per page and column.
+
+    Page ``n`` holds ``generate_text(words_per_page, seed=seed + n)``,
+    filling ``columns`` side-by-side columns in order. ``kerned`` writes each
+line as a TJ array with a kerning adjustment every few characters, the way
+typesetting software does, instead of one string. ``image_bytes`` adds
+    an incompressible grayscale image of about that size to the first
+    page's resources, as in scanned or photo-heavy files.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    image = b""
+    if image_bytes:
+        width = 1024
+        height = max(1, image_bytes // width)
+        pixels = random.Random(seed).randbytes(width * height)
+        objects.append(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+            b"/BitsPerComponent 8 /Length %d >>\nstream\n" % (width, height, len(pixels)) + pixels + b"\nendstream"
+        )
+        image = b" /XObject << /Im1 %d 0 R >>" % len(objects)
+    page_ids = []
+    for page in range(pages):
+        lines = []
+        line = []
+        for word in generate_text(words_per_page, seed=seed + page).split():
+            line.append(word)
+            if len(line) == 12 // columns:
+                lines.append(" ".join(line))
+                line = []
+        lines.append(" ".join(line))
+        per_column = -(-len(lines) // columns)
+        blocks = []
+        for column in range(columns):
+            if kerned:
+                shown = [
+                    "[" + " -12 ".join(_pdf_string(l[i:i + 3]) for i in range(0, len(l), 3)) + "] TJ"
+                    for l in lines[column * per_column:(column + 1) * per_column]
+                ]
+            else:
+                shown = [_pdf_string(l) + " Tj" for l in lines[column * per_column:(column + 1) * per_column]]
+            text = " T* ".join(shown)
+            blocks.append(f"BT /F1 10 Tf 12 TL {40 + column * 540 // columns} 800 Td {text} ET")
+        stream = " ".join(blocks).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >>%s >> /Contents %d 0 R >>" % (image if page == 0 else b"", len(objects))
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(paragraphs: int, seed: int = 0, image_bytes: int = 0) -> bytes:
+    """A DOCX with the given number of paragraphs and a table every 20 paragraphs.
+
+    ``image_bytes`` adds an incompressible grayscale PNG of about that size.
+    """
+    from docx import Document
+    rng = random.Random(seed)
+    document = Document()
+    if image_bytes:
+        from PIL import Image
+        width = 1024
+        height = max(1, image_bytes // width)
+        png = io.BytesIO()
+        Image.frombytes("L", (width, height), rng.randbytes(width * height)).save(png, format="PNG")
+        png.seek(0)
+        document.add_picture(png)
+    for index in range(paragraphs):
+        document.add_paragraph(generate_text(rng.randint(20, 80), seed=seed + index))
+        if index % 20 == 19:
+            table = document.add_table(rows=4, cols=3)
+            for cell in table._cells:
+                cell.text = rng.choice(WORDS)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+
+
+def make_large_docx(paragraphs: int, seed: int = 0) -> bytes:
+    """Like make_docx, but writes the package directly (python-docx slows down on long documents)."""
+    import zipfile
+    from xml.sax.saxutils import escape
+    rng = random.Random(seed)
+
+    def paragraph(text: str) -> str:
+        return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+    body = []
+    for index in range(paragraphs):
+        body.append(paragraph(generate_text(rng.randint(20, 80), seed=seed + index)))
+        if index % 20 == 19:
+            rows = "".join(
+                "<w:tr>" + "".join(f"<w:tc>{paragraph(rng.choice(WORDS))}</w:tc>" for _ in range(3)) + "</w:tr>"
+                for _ in range(4)
+            )
+            body.append(f"<w:tbl>{rows}</w:tbl>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{"".join(body)}<w:sectPr/></w:body></w:document>'
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        package.writestr("_rels/.rels", DOCX_RELS)
+        package.writestr("word/document.xml", document)
+    return out.getvalue()
+
+
+def make_image(
+    width: int, height: int, font_size: int, seed: int = 0, format: str = "PNG", rotated: bool = False
+) -> Tuple[bytes, str]:
+    """An image of lines of black text on a light background; returns it and the text drawn.
+
+    JPEGs get mild noise, like a photographed page. ``rotated`` stores the
+    pixels turned a quarter turn with an EXIF orientation tag to undo it,
+    as phone cameras do.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        # Pillow < 10.1 has a single bitmap font size
+        font = ImageFont.load_default()
+    image = Image.new("L", (width, height), 235)
+    draw = ImageDraw.Draw(image)
+    margin = font_size * 2
+    lines = []
+    widths = {word: draw.textlength(" " + word, font=font) for word in WORDS}
+    for y in range(margin, height - margin - font_size, int(font_size * 1.6)):
+        words, line_width = [], 0.0
+        while True:
+            word = rng.choice(WORDS)
+            line_width += widths[word]
+            if line_width > width - 2 * margin:
+                break
+            words.append(word)
+        line = " ".join(words)
+        draw.text((margin, y), line, fill=20, font=font)
+        lines.append(line)
+    if format == "JPEG":
+        noise = Image.effect_noise((width, height), 12)
+        image = Image.blend(image, noise, 0.08)
+    exif = Image.Exif()
+    if rotated:
+        # Orientation 6: displayed after a clockwise quarter turn
+        image = image.rotate(90, expand=True)
+        exif[0x0112] = 6
+    out = io.BytesIO()
+    image.convert("RGB").save(out, format=format, exif=exif.tobytes(), **({"quality": 90} if format == "JPEG" else {}))
+    return out.getvalue(), "\n".join(lines)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Compare approx_token_count with exact tiktoken counts.
+
+Splits sample texts into random 250-4000 character windows, counts tokens
+both ways and reports the relative error per kind of text, plus the time
+taken by each counter. Samples come from the Python installation: the
+language reference (English prose), installed packages' READMEs (Markdown),
+standard library sources (Python) and the CJK codec test files.
+
+Run from the backend directory (needs the seeded tokenizer):
+    python -m benchmarks.token_count_accuracy [--seed 0]
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import sysconfig
+import time
+from typing import Dict, List
+from app.services.tokenizer import approx_token_count, get_encoding
+
+
+def load_samples() -> Dict[str, List[str]]:
+    stdlib = sysconfig.get_paths()["stdlib"]
+    site_packages = sysconfig.get_paths()["purelib"]
+    samples = {}
+    try:
+        from pydoc_data.topics import topics
+        samples["English prose"] = list(topics.values())
+    except ImportError:
+        pass
+    readmes = []
+    for path in glob.glob(os.path.join(site_packages, "*.dist-info", "METADATA")):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            body = f.read().split("\n\n", 1)[-1]
+        if len(body) > 2000:
+            readmes.append(body)
+    samples["Markdown"] = readmes
+    sources = []
+    for path in sorted(glob.glob(os.path.join(stdlib, "*.py")))[:200]:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            sources.append(f.read())
+    samples["Python source"] = sources
+    cjk = []
+    for path in glob.glob(os.path.join(stdlib, "test", "cjkencodings", "*-utf8.txt")):
+        with open(path, encoding="utf-8") as f:
+            cjk.append(f.read())
+    samples["CJK"] = cjk
+    return {kind: texts for kind, texts in samples.items() if texts}
+
+
+def windows(texts: List[str], rng: random.Random) -> List[str]:
+    out = []
+    for text in texts:
+        i = 0
+        while i < len(text):
+            size = rng.randint(250, 4000)
+            window = text[i:i + size]
+            i += size
+            if len(window) >= 100:
+                out.append(window)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    encoding = get_encoding()
+    rng = random.Random(args.seed)
+    print(f"{'text':<16}{'windows':>8}{'mean':>8}{'p5':>8}{'p95':>8}{'min':>8}{'max':>8}")
+    exact_seconds = approx_seconds = 0.0
+    for kind, texts in load_samples().items():
+        errors = []
+        for window in windows(texts, rng):
+            start = time.perf_counter()
+            exact = len(encoding.encode(window, disallowed_special=()))
+            exact_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            approx = approx_token_count(window)
+            approx_seconds += time.perf_counter() - start
+            if exact:
+                errors.append(approx / exact - 1)
+        errors.sort()
+        n = len(errors)
+        print(
+            f"{kind:<16}{n:>8}{sum(errors) / n:>+8.0%}{errors[int(n * 0.05)]:>+8.0%}"
+            f"{errors[int(n * 0.95)]:>+8.0%}{errors[0]:>+8.0%}{errors[-1]:>+8.0%}"
+        )
+    print(f"\nexact: {exact_seconds * 1000:.1f} ms, approximate: {approx_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
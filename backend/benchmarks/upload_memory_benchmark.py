@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Measure peak resident memory per upload: spooled files vs whole-file reads.
+
+Each run processes ``--concurrency`` uploads of a generated file at once in
+a fresh interpreter, with the uploads already spooled the way Starlette
+receives them. ``bytes`` reads each upload into memory first, as the
+upload handler did before; ``spooled`` passes the spooled file to
+DocumentProcessor, which reads it in place. RSS is sampled every
+millisecond while the uploads are processed and reported above the RSS
+before they started.
+
+Files carry an incompressible image of about ``--size-mb`` MB next to a
+fixed amount of text, so the raw upload size dominates. Firestore, Pinecone
+and the embedding provider are in-memory stand-ins (see local_services.py);
+embedding calls wait ``--embedding-latency`` ms, so concurrent uploads
+overlap as they do in a worker.
+
+Run from the backend directory (needs the seeded tokenizer):
+    python -m benchmarks.upload_memory_benchmark [--size-mb 50] [--concurrency 1 4]
+        [--kinds pdf docx] [--modes bytes spooled] [--embedding-latency 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak so far where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def make_file(kind: str, size_mb: float, directory: str) -> str:
+    from benchmarks.synthetic import make_docx, make_pdf
+
+    image_bytes = int(size_mb * 1024 * 1024)
+    if kind == "pdf":
+        content = make_pdf(20, image_bytes=image_bytes)
+    else:
+        content = make_docx(200, image_bytes=image_bytes)
+    path = os.path.join(directory, f"upload.{kind}")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+async def _process(mode: str, path: str, concurrency: int, embedding_latency: float) -> dict:
+    import asyncio
+    import gc
+    import shutil
+    import threading
+    import time
+    from tempfile import SpooledTemporaryFile
+    from uuid import uuid4
+    from app.config import settings
+    from app.local_firestore import LocalFirestore
+    from app.services.document_processor import DocumentProcessor
+    from app.services.text_chunker import TextChunker
+    from benchmarks.local_services import Latency, LocalVectorStore, MockEmbeddingService
+    import docx  # noqa: F401 - loaded before the baseline
+    import PyPDF2  # noqa: F401
+
+    processor = DocumentProcessor(
+        chunker=TextChunker(),
+        vector_store=LocalVectorStore(),
+        embedding_service=MockEmbeddingService(Latency(embedding_latency, seed=0)),
+        db=LocalFirestore(),
+    )
+    uploads = []
+    for _ in range(concurrency):
+        spool = SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_BYTES)
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, spool, 1024 * 1024)
+        spool.seek(0)
+        uploads.append(spool)
+
+    async def upload(index: int, spool) -> int:
+        content = spool.read() if mode == "bytes" else spool
+        result = await processor.process_document(content, os.path.basename(path), str(uuid4()), f"user-{index}")
+        return len(result["chunks"])
+
+    gc.collect()
+    baseline = rss_bytes()
+    peak = baseline
+    sampling = True
+
+    def sample() -> None:
+        nonlocal peak
+        while sampling:
+            peak = max(peak, rss_bytes())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    chunks = await asyncio.gather(*(upload(i, spool) for i, spool in enumerate(uploads)))
+    elapsed = time.perf_counter() - start
+    sampling = False
+    sampler.join()
+    peak = max(peak, rss_bytes())
+    return {"peak_bytes": peak - baseline, "seconds": elapsed, "chunks": sum(chunks)}
+
+
+def child(mode: str, path: str, concurrency: int, embedding_latency: float) -> None:
+    import asyncio
+    result = asyncio.run(_process(mode, path, concurrency, embedding_latency))
+    print("RESULT " + json.dumps(result))
+
+
+def run(mode: str, path: str, concurrency: int, embedding_latency: float) -> dict:
+    env = {**os.environ, "INGEST_DEDUP_ENABLED": "false", "TRACE_FILE": ""}
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.upload_memory_benchmark", "--child", mode, path, str(concurrency), str(embedding_latency)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]), float(sys.argv[5]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=50, help="Approximate size of each uploaded file")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Uploads processed at once")
+    parser.add_argument("--kinds", nargs="+", choices=["pdf", "docx"], default=["pdf", "docx"])
+    parser.add_argument("--modes", nargs="+", choices=["bytes", "spooled"], default=["bytes", "spooled"])
+    parser.add_argument("--embedding-latency", type=float, default=5, help="Median embedding call latency (ms)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="learnlens-upload-") as directory:
+        print(f"{'file':<6} {'size MB':>8} {'uploads':>8} {'mode':<8} {'peak RSS MB':>12} {'MB/upload':>10} {'seconds':>8}")
+        for kind in args.kinds:
+            path = make_file(kind, args.size_mb, directory)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            for concurrency in args.concurrency:
+                for mode in args.modes:
+                    result = run(mode, path, concurrency, args.embedding_latency / 1000)
+                    peak_mb = result["peak_bytes"] / (1024 * 1024)
+                    print(
+                        f"{kind:<6} {size_mb:>8.1f} {concurrency:>8} {mode:<8} {peak_mb:>12.1f} "
+                        f"{peak_mb / concurrency:>10.1f} {result['seconds']:>8.2f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""Rebuild analytics aggregates from raw attempts."""
+import argparse
+import asyncio
+from app.database import get_firestore
+from app.services.analytics_aggregates import rebuild_aggregates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", help="Only rebuild aggregates for this user ID")
+    args = parser.parse_args()
+
+    written = asyncio.run(rebuild_aggregates(get_firestore(), user_id=args.user))
+    print(f"Rebuilt {written} analytics aggregate(s).")
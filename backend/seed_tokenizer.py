@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Seed the tokenizer cache so workers never download the BPE file.
+
+Run once at image build time (or commit the resulting directory):
+    python seed_tokenizer.py                      # download into TOKENIZER_CACHE_DIR
+    python seed_tokenizer.py --from-file FILE     # copy an already downloaded .tiktoken file
+"""
+import argparse
+import hashlib
+import os
+import shutil
+from app.config import settings
+from app.services.tokenizer import ENCODING_FILES, cache_path, get_encoding
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-file", help="Local copy of the encoding's .tiktoken file")
+    args = parser.parse_args()
+
+    name = settings.TOKENIZER_ENCODING
+    target = cache_path(name)
+    if args.from_file:
+        _, expected_sha256 = ENCODING_FILES[name]
+        with open(args.from_file, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+        if sha256 != expected_sha256:
+            raise SystemExit(f"{args.from_file} is not the {name} BPE file (sha256 {sha256})")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(args.from_file, target)
+
+    # Loads from the cache, downloading into it if the file is missing
+    encoding = get_encoding()
+    print(f"Tokenizer '{name}' ready in {target} ({encoding.n_vocab} tokens).")
@@ -0,0 +1,95 @@
+"""Analytics served from aggregates must match analytics computed from raw attempts.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import asyncio
+from app.local_firestore import LocalFirestore
+from app.models import Attempt, Difficulty, Document, DocumentStatus, Question
+from app.repository import Repository
+from app.routers.analytics import _compute_performance_analytics
+from app.services.analytics_aggregates import AGGREGATES_COLLECTION, aggregate_id
+from app.services.maintenance import backfill_attempt_document_ids
+
+USER_ID = "user-1"
+
+
+async def _seed_document(db: LocalFirestore) -> Document:
+    document = Document(user_id=USER_ID, title="Doc", status=DocumentStatus.PROCESSED)
+    await db.collection(Document.collection_name()).document(str(document.document_id)).set(document.to_dict())
+    return document
+
+
+async def _seed_question(db: LocalFirestore, document: Document, **kwargs) -> Question:
+    question = Question(document_id=document.document_id, question_text="Q?", correct_answer="a", options=["a", "b"], **kwargs)
+    await db.collection(Question.collection_name()).document(str(question.question_id)).set(question.to_dict())
+    return question
+
+
+async def _seed_attempts(db: LocalFirestore, question: Question, count: int, legacy: bool = False, correct_every: int = 1):
+    """Attempts at a question; legacy ones predate the denormalized document_id."""
+    for i in range(count):
+        attempt = Attempt(
+            user_id=USER_ID,
+            question_id=question.question_id,
+            document_id=question.document_id,
+            user_answer="a",
+            is_correct=i % correct_every == 0,
+            time_taken=float(i + 1),
+        )
+        data = attempt.to_dict()
+        if legacy:
+            data.pop("document_id")
+        await db.collection(Attempt.collection_name()).document(str(attempt.attempt_id)).set(data)
+
+
+async def _read(db: LocalFirestore, document_id=None):
+    # A new Repository per read, as each request gets one
+    return await _compute_performance_analytics(Repository(db), USER_ID, document_id)
+
+
+def test_deleted_question_counted_alike_from_attempts_and_aggregate():
+    async def run():
+        db = LocalFirestore()
+        document = await _seed_document(db)
+        kept = await _seed_question(db, document, difficulty=Difficulty.EASY)
+        deleted = await _seed_question(db, document, difficulty=Difficulty.HARD)
+        await _seed_attempts(db, kept, 4, correct_every=2)
+        await _seed_attempts(db, deleted, 3)
+        await db.collection(Question.collection_name()).document(str(deleted.question_id)).delete()
+
+        for document_id in (None, document.document_id):
+            # The first read computes from raw attempts, the second is served from the aggregate
+            raw = await _read(db, document_id)
+            served = await _read(db, document_id)
+            aggregate = await db.collection(AGGREGATES_COLLECTION).document(aggregate_id(USER_ID, document_id)).get()
+            assert aggregate.to_dict()["complete"] is True
+            assert raw.total_attempts == 7
+            assert served.model_dump() == raw.model_dump()
+
+    asyncio.run(run())
+
+
+def test_backfill_invalidates_document_aggregate():
+    async def run():
+        db = LocalFirestore()
+        document = await _seed_document(db)
+        question = await _seed_question(db, document)
+        await _seed_attempts(db, question, 3, legacy=True)
+        await _seed_attempts(db, question, 1)
+
+        # Before the backfill the document-scoped read only sees the scoped attempt
+        before = await _read(db, document.document_id)
+        assert before.total_attempts == 1
+
+        assert await backfill_attempt_document_ids(db) == 3
+        aggregate = await db.collection(AGGREGATES_COLLECTION).document(aggregate_id(USER_ID, document.document_id)).get()
+        assert aggregate.to_dict()["complete"] is False
+
+        after = await _read(db, document.document_id)
+        assert after.total_attempts == 4
+        # Served from the rebuilt aggregate
+        served = await _read(db, document.document_id)
+        assert served.total_attempts == 4
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Summarize recorded spans (TRACE_FILE) per stage, and show the slowest traces.
+
+Usage:
+    python trace_report.py                    # per-stage count, total, p50, p99, max
+    python trace_report.py --slowest 3        # also print the 3 slowest traces as trees
+    python trace_report.py --file other.jsonl
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+from app.config import settings
+
+
+def load_spans(path: str) -> List[Dict]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[int((len(ordered) - 1) * fraction)]
+
+
+def print_tree(span: Dict, children: Dict[str, List[Dict]], depth: int = 0) -> None:
+    attributes = ", ".join(f"{key}={value}" for key, value in span["attributes"].items())
+    error = f"  ERROR {span['error']}" if span.get("error") else ""
+    print(f"{'  ' * depth}{span['name']:<{32 - 2 * depth}} {span['duration_ms']:10.1f} ms  {attributes}{error}")
+    for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start"]):
+        print_tree(child, children, depth + 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=settings.TRACE_FILE)
+    parser.add_argument("--slowest", type=int, default=0, help="Number of slowest traces to print")
+    args = parser.parse_args()
+
+    spans = load_spans(args.file)
+    durations = defaultdict(list)
+    for span in spans:
+        durations[span["name"]].append(span["duration_ms"])
+
+    print(f"{'span':<24}{'count':>8}{'total ms':>12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: sum(item[1]), reverse=True):
+        values.sort()
+        print(
+            f"{name:<24}{len(values):>8}{sum(values):>12.1f}"
+            f"{percentile(values, 0.5):>10.1f}{percentile(values, 0.99):>10.1f}{values[-1]:>10.1f}"
+        )
+
+    if args.slowest:
+        children = defaultdict(list)
+        roots = []
+        for span in spans:
+            if span["parent_id"] is None:
+                roots.append(span)
+            else:
+                children[span["parent_id"]].append(span)
+        for root in sorted(roots, key=lambda s: s["duration_ms"], reverse=True)[:args.slowest]:
+            print(f"\ntrace {root['trace_id']}")
+            print_tree(root, children)